@@ -1,10 +1,20 @@
 from .device import api as device_api
+from .events import api as events_api
 from .election import api as election_api
 from .jobs import api as jobs_api
+from .metrics import api as metrics_api
+from .profiler import api as profiler_api
+from .replica import api as replica_api
+from .storage import api as storage_api
 from .worker import api as worker_api
 
 def register_blueprints(app):
     app.register_blueprint(device_api, url_prefix="/api")
     app.register_blueprint(election_api, url_prefix="/api")
+    app.register_blueprint(events_api, url_prefix="/api")
     app.register_blueprint(jobs_api, url_prefix="/api")
+    app.register_blueprint(metrics_api, url_prefix="/api")
+    app.register_blueprint(profiler_api, url_prefix="/api")
+    app.register_blueprint(replica_api, url_prefix="/api")
+    app.register_blueprint(storage_api, url_prefix="/api")
     app.register_blueprint(worker_api, url_prefix="/api")
@@ -1,7 +1,7 @@
 import os
 from flask import Blueprint, jsonify, request, json
-import psutil, shutil
-from backend.shared.state import blender, discovery
+import shutil
+from backend.shared.state import blender, discovery, sampler
 import requests
 import time
 
@@ -14,9 +14,7 @@ def is_installed(cmd: str) -> bool:
 
 @api.get("/my_device")
 def my_device():
-    cpu_usage = psutil.cpu_percent(interval=1)
-    memory = psutil.virtual_memory()
-    disk = psutil.disk_usage('/')
+    snapshot = sampler.snapshot()
 
     blender_installed = is_installed("blender")
     ffmpeg_installed = is_installed("ffmpeg")
@@ -24,17 +22,19 @@ def my_device():
     return jsonify({
         "pc_name": discovery.pc_name,
         "local_ip": discovery.local_ip,
-        "cpu_usage": cpu_usage,
-        "memory_total": memory.total,
-        "memory_used": memory.used,
-        "memory_usage": (memory.used / memory.total) * 100,
-        "disk_usage": disk.percent,
+        "cpu_usage": snapshot["cpu_usage"],
+        "memory_total": snapshot["memory_total"],
+        "memory_used": snapshot["memory_used"],
+        "memory_usage": snapshot["memory_usage"],
+        "disk_usage": snapshot["disk_usage"],
+        "load_1m": snapshot["load_1m"],
+        "sampled_at": snapshot["sampled_at"],
         "resource_score": discovery.current_score,
         "checks": {
             "blender_installed": blender_installed,
             "ffmpeg_installed": ffmpeg_installed,
-            "memory_sufficient": memory.total >= 8 * (1024 ** 3),
-            "disk_sufficient": disk.free >= 20 * (1024 ** 3)
+            "memory_sufficient": snapshot["memory_total"] >= 8 * (1024 ** 3),
+            "disk_sufficient": snapshot["disk_free"] >= 20 * (1024 ** 3)
         }
     })
 
@@ -91,6 +91,10 @@ def leader_is_down_flag():
                     # Start leader election again
                     leader_ip = metadata.get("leader_ip")
                     discovery.pop_leader(leader_ip)
+                    # Stop uploading to the lost leader until the job is resumed
+                    metadata["status"] = "awaiting_leader"
+                    with open(metadata_path, "w", encoding="utf-8") as f:
+                        json.dump(metadata, f, indent=2)
                     print("Election start requested as current leader disconnected")
                     print("Current discovered devices:", discovery.get_devices())
 
@@ -98,12 +102,9 @@ def leader_is_down_flag():
                     time.sleep(2)
                     discovery.initiate_election()
 
-                    #print("Election Active. Waiting to be done")
-                    while(discovery.election_active == True):
-                        print("Election Active. Waiting to be done")
-                        time.sleep(1)
-
-                    
+                    # Block on the election's completion event instead of polling
+                    print("Election Active. Waiting to be done")
+                    discovery.wait_for_election(timeout=30)
 
                     election_status = discovery.get_election_status()
                     new_leader_ip = election_status.get("current_leader")
@@ -113,6 +114,14 @@ def leader_is_down_flag():
                     
                     print("Election Finished. Passing job to new leader ", new_leader_ip)
 
+                    # The new leader carries on from the replicated state and the
+                    # frames the workers kept; re-uploading is the fallback
+                    blend_file_path = os.path.join(job_path, metadata.get("filename"))
+                    if _resume_job(new_leader_ip, job_id, leader_ip, blend_file_path):
+                        print(f"Job {job_id} resumed by new leader {new_leader_ip}")
+                        return jsonify({"leader_is_down": True, "resumed": True, "leader": new_leader_ip})
+                    print(f"Job {job_id} could not be resumed. Uploading it again")
+
                     new_job_url = f"http://{client_ip}:5050/api/jobs/upload"
 
                     filename = metadata.get("filename")
@@ -153,6 +162,13 @@ def leader_is_down_flag():
                     except requests.RequestException as e:
                         return jsonify({"error": str(e)}), 502
 
+                else:
+                    # Workers wait for the new leader to resume the job (JOB_RESUME)
+                    metadata["status"] = "awaiting_leader"
+                    with open(metadata_path, "w", encoding="utf-8") as f:
+                        json.dump(metadata, f, indent=2)
+                    return jsonify({"leader_is_down": True, "awaiting_leader": True})
+
             # Cancelling job
             metadata["status"] = "canceled"
             crashed_leader_ip = True
@@ -161,4 +177,21 @@ def leader_is_down_flag():
         except Exception as e:
             print(f"[WARN] Failed processing {metadata_path}: {e}")
             
-    return jsonify({"leader_is_down": crashed_leader_ip})
\ No newline at end of file
+    return jsonify({"leader_is_down": crashed_leader_ip})
+
+def _resume_job(new_leader_ip, job_id, old_leader_ip, blend_file_path):
+    """Ask the new leader to take the job over; sends the blend only if it has none."""
+    resume_url = f"http://{new_leader_ip}:5050/api/jobs/{job_id}/resume"
+    data = {"old_leader": old_leader_ip}
+    try:
+        response = requests.post(resume_url, data=data, timeout=30)
+        if response.status_code == 409 and response.json().get("need_blend"):
+            with open(blend_file_path, "rb") as f:
+                files = {"file": (os.path.basename(blend_file_path), f, "application/octet-stream")}
+                response = requests.post(resume_url, data=data, files=files, timeout=60)
+        if response.status_code != 200:
+            print(f"New leader could not resume job {job_id}: {response.text}")
+        return response.status_code == 200
+    except (requests.RequestException, ValueError, OSError) as e:
+        print(f"Resuming job {job_id} on {new_leader_ip} failed: {e}")
+        return False
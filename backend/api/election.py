@@ -1,8 +1,8 @@
 import os
-import shutil
-import requests
 from flask import Blueprint, json, jsonify, request
-from backend.shared.state import discovery
+from backend.shared.state import discovery, progress
+from backend.api.jobs import _announce, _job_lock, _replicate
+from backend.services.reassignment import plan_reassignment
 import datetime
 
 api = Blueprint("election_api", __name__)
@@ -32,9 +32,27 @@ def status():
         "local_ip": discovery.local_ip
     }), 200
 
+@api.get("/failure_detector")
+def failure_detector_metrics():
+    return jsonify(discovery.get_failure_detector_metrics())
+
+@api.get("/control_channel")
+def control_channel():
+    return jsonify(discovery.get_control_channel_status())
+
+@api.get("/membership")
+def membership():
+    return jsonify({
+        "mode": discovery.membership,
+        "version": discovery.members.version,
+        "seed_peers": discovery.seed_peers,
+        "gossip": discovery.gossip.stats() if discovery.membership == "gossip" else None,
+        "members": discovery.gossip.members() if discovery.membership == "gossip" else discovery.get_devices(),
+    })
+
 @api.post("/clear")
 def clear():
-    discovery.discovered_devices.clear()
+    discovery.members.clear()
     if discovery.running:
         discovery.add_device(discovery.pc_name, discovery.local_ip, discovery.current_score, role=discovery.my_role)
     return jsonify({"success": True})
@@ -101,77 +119,22 @@ def notify_node_disconnection():
                     affected_jobs.append(job_id)
                     
                     # discovery.send_client_disconnection()
-                    devices = discovery.discovered_devices
-                    devices.pop(ip, None)
+                    discovery.members.remove(ip)
                     print("*"*50)
-                    print(devices)
+                    print(discovery.get_devices())
                     print("*"*50)
                     discovery.broadcast_control_message("STOP_RENDER", { 'job_id' : job_id})
 
                 # WORKER CASE
                 else:
                     print(f"Reassigning frames for job {job_id} due to worker node disconnection.")
-                    frames_to_reassign = []
-                    devices = discovery.discovered_devices
-                    devices.pop(ip, None)
+                    discovery.members.remove(ip)
                     print("*"*50)
-                    print(devices)
+                    print(discovery.get_devices())
                     print("*"*50)
-                    if metadata['jobs'][ip]:
-                        print(f"Reassigning frames from disconnected node {ip} for job {job_id}.")
-                        frames_to_reassign = metadata['jobs'][ip]
-                    else:
-                        print(f"No frames to reassign from disconnected node {ip} for job {job_id}.")
-                        return jsonify({"message": f"No frames to reassign from disconnected node {ip} for job {job_id}."})
-                    
-                    print(f"Frames to reassign: {frames_to_reassign}")
-                    new_job_id = job_id + "_reassign"
-                    job_dir = os.path.join(JOBS_DIR, new_job_id)
-                    os.makedirs(job_dir, exist_ok=True)
-
-                    # Copy blend file to new job directory
-                    blend_file_src = os.path.join(job_path, metadata['filename'])
-                    blend_file_dst = os.path.join(job_dir, metadata['filename'])
-                    shutil.copy2(blend_file_src, blend_file_dst)
-
-                    new_metadata_path = os.path.join(job_dir, "metadata.json")
-                    
-                    no_of_other_workers = len(metadata['jobs']) - 1
-                    if no_of_other_workers > 0 and frames_to_reassign:
-                        frames_per_worker = len(frames_to_reassign) // no_of_other_workers
-                        extra_frames = len(frames_to_reassign) % no_of_other_workers
-
-                        frame_index = 0
-                        for worker_ip in metadata['jobs']:
-                            if worker_ip == ip:
-                                continue
-                            assigned_frames = frames_to_reassign[frame_index:frame_index + frames_per_worker]
-                            if extra_frames > 0:
-                                assigned_frames.append(frames_to_reassign[frame_index + frames_per_worker])
-                                extra_frames -= 1
-                            frame_index += len(assigned_frames)
-
-                            metadata['jobs'][worker_ip] = assigned_frames
-                        
-                        metadata['jobs'].pop(ip, None)
-                        metadata["status"] = "in_progress"
-                        metadata["total_no_frames"] = sum(len(frames) for frames in metadata['jobs'].values())
-                        metadata["remaining_frames"] = sum(len(frames) for frames in metadata['jobs'].values())
-                        metadata["no_of_nodes"] = len(metadata['jobs'])
-                        metadata["job_id"] = new_job_id
-                        metadata["created_at"] = datetime.datetime.now().isoformat()
-                        with open(new_metadata_path, "w", encoding="utf-8") as f:
-                            json.dump(metadata, f, indent=2)
-                        
-                        # Using broadcast-to-workers API to send job to workers
-                        requests.post(f"http://localhost:5050/api/jobs/broadcast-to-workers", json={
-                            "uuid": new_job_id,
-                        })
-
-                        affected_jobs.append(new_job_id)
-                    else:
-                        print(f"No other workers available to reassign frames for job {job_id}.")
-
+                    generation = reassign_frames(job_id, ip)
+                    if generation is not None:
+                        affected_jobs.append(job_id)
 
         except Exception as e:
             print(f"[WARN] Failed processing {metadata_path}: {e}")
@@ -181,3 +144,64 @@ def notify_node_disconnection():
         "message": f"Node {ip} disconnected.",
         "jobs_reset": affected_jobs
     })
+
+
+def reassign_frames(job_id, lost_ip):
+    """
+    Hand a lost worker's frames to the job's surviving workers, inside the
+    same job:
+    - only the frames the leader has not received move (received_frames),
+      to the survivors with the least outstanding work
+    - the job's metadata.json gets a new assignment generation; frames
+      already received stay in renders/ and are counted once
+    - survivors learn their new lists through an ordered JOB_REASSIGN (or
+      /worker/reassign when the control channel is down) and render the
+      added frames from the blend they already hold
+    Returns the new generation, or None if nothing was reassigned.
+    """
+    metadata_path = os.path.join(JOBS_DIR, job_id, "metadata.json")
+    with _job_lock(job_id):
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        if metadata.get("status") != "in_progress":
+            return None
+
+        jobs = metadata.get("jobs", {})
+        received = metadata.get("received_frames", [])
+        if not any(worker_ip != lost_ip for worker_ip in jobs):
+            print(f"No other workers available to reassign frames for job {job_id}.")
+            return None
+        jobs, added = plan_reassignment(jobs, lost_ip, received)
+        if not added:
+            print(f"No frames to reassign from disconnected node {lost_ip} for job {job_id}.")
+            return None
+        print(f"Frames to reassign: {added}")
+
+        generation = metadata.get("generation", 0) + 1
+        metadata["jobs"] = jobs
+        metadata["generation"] = generation
+        metadata["no_of_nodes"] = len(jobs)
+        metadata.setdefault("assignment_history", []).append({
+            "generation": generation,
+            "at": datetime.datetime.now().isoformat(),
+            "lost_worker": lost_ip,
+            "frames": {worker_ip: frames for worker_ip, frames in added.items() if frames},
+        })
+
+        # Replace atomically: workers and the job watcher read it without the lock
+        tmp_path = metadata_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(tmp_path, metadata_path)
+        _replicate(job_id, metadata)
+
+    progress.reassign(job_id, lost_ip, {worker_ip: len(frames) for worker_ip, frames in added.items()})
+
+    _announce("JOB_REASSIGN", {
+        "job_id": job_id,
+        "term": metadata.get("leader_term", 0),
+        "generation": generation,
+        "jobs": jobs,
+    }, "/api/worker/reassign")
+    print(f"Job {job_id} reassigned in place (generation {generation}): {added}")
+    return generation
@@ -0,0 +1,62 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from backend.services.event_bus import format_sse
+from backend.shared.state import discovery, events, job_watcher
+
+api = Blueprint("events_api", __name__)
+
+HEARTBEAT_INTERVAL = 5.0
+RETRY_MS = 2000
+
+
+def _snapshot():
+    return {
+        "running": discovery.running,
+        "local_pc_name": discovery.pc_name,
+        "local_ip": discovery.local_ip,
+        "membership_version": discovery.members.version,
+        "devices": discovery.get_devices(),
+        "role": discovery.role_status(),
+        "jobs": job_watcher.jobs(),
+    }
+
+
+@api.get("/events")
+def stream_events():
+    """
+    Server-Sent Events. A new stream starts with a "snapshot" event, then
+    carries deltas: "membership", "role", "job" and "frame". A reconnecting
+    EventSource sends Last-Event-ID and only gets what it missed (or a new
+    snapshot if that is no longer available).
+    """
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    subscription = events.subscribe(last_event_id)
+    if subscription is None:
+        return jsonify({"error": "Too many open event streams"}), 503
+
+    def generate():
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            while True:
+                if subscription.needs_snapshot:
+                    subscription.needs_snapshot = False
+                    # Taken after the cursor, so deltas that follow may repeat it but never miss anything
+                    yield format_sse("snapshot", _snapshot(), subscription.last_id)
+                batch = subscription.next_batch(HEARTBEAT_INTERVAL)
+                if batch:
+                    yield "".join(format_sse(event_type, data, event_id) for event_id, event_type, data in batch)
+                elif not subscription.needs_snapshot:
+                    # Comment line: keeps proxies from timing out and detects closed clients
+                    yield ": keepalive\n\n"
+        finally:
+            subscription.close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@api.get("/events/stats")
+def event_stats():
+    return jsonify(events.stats())
@@ -1,15 +1,88 @@
 from flask import Blueprint, request, jsonify
 import tempfile, uuid, os, requests, datetime
 from werkzeug.utils import secure_filename
-from backend.shared.state import blender, discovery
+from backend.shared.state import blender, discovery, events, progress, replica, storage, tracer
+from backend.services.tracing import ship
+from backend.services.blender_service import BlendServiceError
+from backend.services.reassignment import plan_reassignment
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import json
+import threading
+import functools
+import time
+import weakref
+from backend.services import metrics
 
 JOBS_DIR = "jobs"
+ANALYSIS_FILENAME = "analysis.json"
 os.makedirs(JOBS_DIR, exist_ok=True)
 
 api = Blueprint("jobs_api", __name__)
 
+class _JobLock:
+    """threading.Lock cannot be weakly referenced; this wrapper can."""
+    __slots__ = ("_lock", "__weakref__")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+
+# A job's entry lives only while some request holds or waits on its lock
+_job_locks = weakref.WeakValueDictionary()
+_job_locks_guard = threading.Lock()
+
+
+def _job_lock(job_id):
+    with _job_locks_guard:
+        return _job_locks.setdefault(job_id, _JobLock())
+
+
+def _replicate(job_id, metadata):
+    """Send the leader's view of a job to the standby (see LeaderReplica)."""
+    if metadata.get("leader_ip") == discovery.local_ip:
+        replica.publish(job_id, metadata)
+
+
+def _announce(msg_type, payload, fallback_path):
+    """
+    Ordered control message to every worker; when the control channel is
+    down, POST the payload to `fallback_path` on each ring member instead.
+    """
+    ok, _seq, _msg = discovery.broadcast_control_message(msg_type, payload)
+    if ok:
+        return
+    for worker_ip in [w["ip"] for w in discovery.ring_topology]:
+        if worker_ip == discovery.local_ip:
+            continue
+        try:
+            requests.post(f"http://{worker_ip}:5050{fallback_path}", json=payload, timeout=5)
+        except requests.RequestException as e:
+            print(f"[WARN] Could not send {msg_type} for job {payload.get('job_id')} to {worker_ip}: {e}")
+
+_SUBMIT_SECONDS = metrics.histogram("renderfarm_submit_frames_seconds", "Leader time to handle one submit-frames request", ("status",))
+_FRAME_BYTES = metrics.histogram("renderfarm_frame_received_bytes", "Size of frames received by the leader", buckets=metrics.SIZE_BUCKETS)
+
+def _timed(histogram):
+    """Observe a view's handling time, labelled with its response status."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            response = view(*args, **kwargs)
+            status = response[1] if isinstance(response, tuple) else 200
+            histogram.labels(status).observe(time.perf_counter() - start)
+            return response
+        return wrapper
+    return decorator
+
 @api.post("/jobs/analyze")
 def analyze_blend():
     if "file" not in request.files:
@@ -33,11 +106,19 @@ def analyze_blend():
         file.save(tmp.name)
         blend_file_path = tmp.name
 
-    analysis_result = blender.analyze(blend_file_path)
+    # ?detail=full: the full scene analysis in Blender (seconds, not milliseconds)
+    detailed = request.args.get("detail") == "full"
+    try:
+        analysis_result = blender.analyze(blend_file_path, detailed=detailed)
+    except BlendServiceError as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        os.unlink(blend_file_path)
     return jsonify(analysis_result), 201
 
 @api.post("/jobs/upload")
 def upload_file():
+    started = time.time()
     if "file" not in request.files:
         return jsonify({"error": "No file provided"}), 400
 
@@ -87,9 +168,16 @@ def upload_file():
                 "details": response.text
             }), 502
 
+        job_id = response.json().get("job_id")
+        if job_id:
+            tracer.record(job_id, "upload", started, time.time(), filename=filename)
+            if leader_ip != discovery.local_ip:
+                threading.Thread(target=ship, args=(leader_ip, job_id, tracer.drain(job_id)), daemon=True).start()
+
         return jsonify({
             "message": "Job successfully forwarded to leader",
-            "leader": leader_ip
+            "leader": leader_ip,
+            "job_id": job_id
         }), 201
 
     except requests.RequestException as e:
@@ -100,8 +188,27 @@ def upload_file():
 
 # -- Leader Endpoints --
 
+def _nodes_short_on_disk(incoming):
+    """Ring members reporting (GET /api/storage) that `incoming` more bytes would not fit."""
+    def short_on_disk(ip):
+        if ip == discovery.local_ip:
+            return not storage.can_accept(incoming)
+        try:
+            response = requests.get(f"http://{ip}:5050/api/storage", params={"bytes": incoming}, timeout=2)
+            # Nodes that cannot answer keep getting work, as before
+            return response.ok and response.json().get("accepting") is False
+        except (requests.RequestException, ValueError):
+            return False
+
+    ips = [w["ip"] for w in discovery.ring_topology]
+    with ThreadPoolExecutor(max_workers=max(1, len(ips))) as pool:
+        flags = list(pool.map(short_on_disk, ips))
+    return [ip for ip, short in zip(ips, flags) if short]
+
+
 @api.post("/jobs/create")
 def create_job():
+    started = time.time()
     # 1. Validate file
     if "file" not in request.files:
         return jsonify({"error": "No file provided"}), 400
@@ -117,6 +224,10 @@ def create_job():
 
     # 2. Read metadata
     metadata = request.form.to_dict()
+    try:
+        analysis = json.loads(metadata.pop("analysis", "null"))
+    except ValueError:
+        analysis = None
 
     no_of_nodes = len(discovery.ring_topology)
     if metadata.get('initiator_is_participant') == 'undefined':
@@ -124,16 +235,29 @@ def create_job():
         metadata['initiator_is_participant'] = False
     else:
         metadata["initiator_is_participant"] = True
+
+    # Nodes short on disk get no frames (and no copy of the job)
+    excluded = _nodes_short_on_disk(request.content_length or 0)
+    if not metadata["initiator_is_participant"]:
+        no_of_nodes -= len([ip for ip in excluded if ip != metadata.get("initiator_client_ip")])
+    else:
+        no_of_nodes -= len(excluded)
+    if excluded and no_of_nodes <= 0:
+        return jsonify({"error": "No node has enough free storage for this job", "excluded": excluded}), 507
     # 3. Generate JOB ID
     job_id = str(uuid.uuid4())
 
-    # 4. Create job directory
-    job_dir = os.path.join(JOBS_DIR, job_id)
-    os.makedirs(job_dir, exist_ok=True)
+    with storage.reserve(request.content_length or 0) as admitted:
+        if not admitted:
+            return jsonify({"error": "Insufficient storage on the leader"}), 507
+
+        # 4. Create job directory
+        job_dir = os.path.join(JOBS_DIR, job_id)
+        os.makedirs(job_dir, exist_ok=True)
 
-    # 5. Save file
-    file_path = os.path.join(job_dir, filename)
-    file.save(file_path)
+        # 5. Save file
+        file_path = os.path.join(job_dir, filename)
+        file.save(file_path)
 
     # 6. Persist metadata (optional but highly recommended)
     print(discovery.discovered_devices)
@@ -149,12 +273,18 @@ def create_job():
         "status": "created",
         "no_of_nodes": no_of_nodes,
         "leader_ip": discovery.local_ip,
-        "scores": scores
+        "scores": scores,
+        "excluded_workers": excluded
     }
 
     metadata_path = os.path.join(job_dir, "metadata.json")
     with open(metadata_path, "w") as f:
         json.dump(metadata_payload, f, indent=2)
+    _replicate(job_id, metadata_payload)
+    if analysis is None:
+        threading.Thread(target=_analyze_job, args=(job_id, file_path), daemon=True).start()
+    else:
+        _write_analysis(job_dir, analysis)
 
     # 7. Print metadata (as requested)
     print("📦 New Render Job Created")
@@ -171,14 +301,35 @@ def create_job():
     except:
         pass
 
+    tracer.record(job_id, "create_job", started, time.time(), filename=filename)
     return jsonify({
         "message": "Job created successfully",
         "job_id": job_id,
         "job_dir": job_dir
     }), 201
 
+def _analyze_job(job_id, blend_file_path):
+    """Full scene analysis of a new job, stored in its analysis.json once Blender is done."""
+    try:
+        analysis = blender.analyze(blend_file_path, detailed=True)
+    except (BlendServiceError, OSError) as e:
+        print(f"Scene analysis unavailable for job {job_id}: {e}")
+        return
+    _write_analysis(os.path.join(JOBS_DIR, job_id), analysis)
+
+def _write_analysis(job_dir, analysis):
+    # A file of its own: metadata.json is also rewritten by worker.py, which shares no lock with us
+    if not os.path.isdir(job_dir):
+        return
+    analysis_path = os.path.join(job_dir, ANALYSIS_FILENAME)
+    tmp_path = analysis_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(analysis, f, indent=2)
+    os.replace(tmp_path, analysis_path)
+
 @api.post("/jobs/broadcast-to-workers")
 def broadcast_job_to_workers():
+    started = time.time()
     data = request.get_json(silent=True)
     job_id = data.get("uuid") if data else None
     
@@ -198,18 +349,19 @@ def broadcast_job_to_workers():
     for f in job_path.iterdir():
         if f.suffix == ".blend":
             blend_file = f
-        elif f.suffix == ".json":
+        elif f.name == "metadata.json":
             json_file = f
 
     if not blend_file or not json_file:
         return jsonify(
-            {"error": "Job folder must contain one .blend and one .json file"}
+            {"error": "Job folder must contain one .blend file and metadata.json"}
         ), 400
 
     # --- Update jobs keys with IPs ---
     with open(json_file, "r+") as jf:
         metadata = json.load(jf)
         initiator_client_ip = metadata.get("metadata", {}).get("initiator_client_ip")
+        excluded = set(metadata.get("excluded_workers", []))
         old_jobs = metadata.get("jobs", {})
 
         # Map old numeric keys to IPs from discovery.ring_topology
@@ -223,6 +375,8 @@ def broadcast_job_to_workers():
         for ip in worker_ips:
             if initiator_client_ip == ip and not metadata["metadata"].get("initiator_is_participant", False):
                 continue
+            if ip in excluded:
+                continue
             old_key = str(idx + 1)  # old keys are "1", "2", ...
             if old_key in old_jobs:
                 new_jobs[ip] = old_jobs[old_key]
@@ -237,6 +391,9 @@ def broadcast_job_to_workers():
         json.dump(metadata, jf, indent=4)
         jf.truncate()
     # --- Done updating jobs ---
+    _replicate(job_id, metadata)
+
+    progress.start_job(job_id, new_jobs)
 
     # RELIABLE ORDERING: announce broadcast start in global sequence
     try:
@@ -245,9 +402,23 @@ def broadcast_job_to_workers():
     except:
         pass
 
-    results = []
-    
-    for worker in discovery.ring_topology:
+    # RELIABLE ORDERING: commit the job globally up front, with acks. Each worker
+    # applies it (and starts rendering) the moment its own files land, instead
+    # of after the whole fan-out.
+    commit_seq = None
+    try:
+        if discovery.my_role == "Leader":
+            _ok, commit_seq, _msg = discovery.broadcast_control_message("JOB_COMMIT", {"job_id": job_id}, ack=True)
+    except:
+        pass
+
+    def send_to_worker(worker):
+        with tracer.span(job_id, "send_to_worker", worker=worker['ip']) as span:
+            result = _send_to_worker(worker)
+            span["status"] = result.get("status") or result.get("error")
+        return result
+
+    def _send_to_worker(worker):
         worker_ip = worker['ip']
         print(f"Sending job to worker at {worker_ip}")
         worker_url = f"http://{worker_ip}:5050/api/worker/submit-job"
@@ -259,10 +430,6 @@ def broadcast_job_to_workers():
                     files={"blend_file": bf, "metadata": jf},
                     timeout=30
                 )
-            results.append({
-                "worker": worker,
-                "status": response.status_code,
-            })
 
             # RELIABLE ORDERING: per-worker "sent" marker in global sequence
             try:
@@ -271,11 +438,19 @@ def broadcast_job_to_workers():
             except:
                 pass
 
+            return {
+                "worker": worker,
+                "status": response.status_code,
+            }
         except Exception as e:
-            results.append({
+            return {
                 "worker": worker,
                 "error": str(e),
-            })
+            }
+
+    workers = [w for w in discovery.ring_topology if w["ip"] not in excluded]
+    with ThreadPoolExecutor(max_workers=max(1, len(workers))) as pool:
+        results = list(pool.map(send_to_worker, workers))
 
     # RELIABLE ORDERING: announce broadcast completion in global sequence
     try:
@@ -284,21 +459,40 @@ def broadcast_job_to_workers():
     except:
         pass
 
-
-    # RELIABLE ORDERING: commit the job globally (workers will process this in strict sequence)
-    try:
-        if discovery.my_role == "Leader":
-            discovery.broadcast_control_message("JOB_COMMIT", {"job_id": job_id})
-    except:
-        pass
+    # Readiness: workers that hold both the files and the commit. The leader's
+    # own copy is live as soon as it is written.
+    remote_ips = [
+        r["worker"]["ip"] for r in results
+        if r.get("status") == 201 and r["worker"]["ip"] != discovery.local_ip
+    ]
+    quorum = data.get("quorum")
+    with tracer.span(job_id, "wait_ready", workers=len(remote_ips)):
+        ready = discovery.wait_for_control_acks(
+            commit_seq,
+            remote_ips,
+            stage="applied",
+            timeout=float(data.get("ready_timeout", 3.0)),
+            quorum=int(quorum) if quorum is not None else None,
+        )
+    readiness = {
+        "commit_seq": commit_seq,
+        "quorum": len(remote_ips) if quorum is None else min(int(quorum), len(remote_ips)),
+        "ready": {ip: round(latency, 4) for ip, latency in ready.items()},
+        "pending": [ip for ip in remote_ips if ip not in ready],
+    }
+    readiness["quorum_reached"] = len(ready) >= readiness["quorum"]
+    tracer.record(job_id, "broadcast", started, time.time(), workers=len(workers))
 
     return jsonify({
         "job_id": job_id,
         "broadcast_results": results,
+        "readiness": readiness,
     }), 200
 
 @api.post("/jobs/submit-frames")
+@_timed(_SUBMIT_SECONDS)
 def submit_frames():
+    started = time.time()
     # 1. Validate input
     job_id = request.form.get("uuid")
     image = request.files.get("image")
@@ -341,34 +535,84 @@ def submit_frames():
 
     image_path = renders_dir / filename
     image.save(image_path)
+    _FRAME_BYTES.observe(image_path.stat().st_size)
 
     # count number of files in renders directory
     no_of_frames = 0
     renders_dir = job_path / "renders"
     if renders_dir.is_dir():
-        no_of_frames = len(list(renders_dir.glob("*.*")))
+        # Same files as glob("*.*"), without building a Path per entry
+        with os.scandir(renders_dir) as entries:
+            no_of_frames = sum(1 for e in entries if "." in e.name and not e.name.startswith("."))
 
     
     print("Number of frames in folder : ", no_of_frames)
     
-    # 7. Update remaining_frames
-    remaining = metadata.get("remaining_frames")
+    # 7. Update remaining_frames (frames of one job arrive concurrently,
+    # so the metadata read-modify-write is serialized per job). A frame that
+    # arrives twice (a reassigned frame its first worker also delivered)
+    # overwrites the file but is counted once.
+    frame_no = _frame_number(request.form.get("frame_no"), filename)
+    with _job_lock(job_id):
+        with metadata_path.open("r") as f:
+            metadata = json.load(f)
+
+        received = set(metadata.get("received_frames", []))
+        if frame_no is not None and frame_no in received:
+            return jsonify({
+                "job_id": job_id,
+                "saved_as": filename,
+                "remaining_frames": metadata.get("remaining_frames"),
+                "duplicate": True
+            }), 200
 
-    if not isinstance(remaining, int) or remaining <= 0:
-        return jsonify({"error": "Invalid remaining_frames value"}), 400
+        remaining = metadata.get("remaining_frames")
 
-    
-    metadata["remaining_frames"] = remaining - 1
-    
-    # Optional: auto-finish job
-    if metadata["remaining_frames"] == 0:
-        metadata["status"] = "completed_frames"
-        
-    if metadata["total_no_frames"] == no_of_frames:
-        metadata["status"] = "completed_frames"
+        if not isinstance(remaining, int) or remaining <= 0:
+            return jsonify({"error": "Invalid remaining_frames value"}), 400
+
+        metadata["remaining_frames"] = remaining - 1
+        if frame_no is not None:
+            received.add(frame_no)
+            metadata["received_frames"] = sorted(received)
+
+        # Optional: auto-finish job
+        if metadata["remaining_frames"] == 0:
+            metadata["status"] = "completed_frames"
+
+        if metadata["total_no_frames"] == no_of_frames:
+            metadata["status"] = "completed_frames"
+
+        # Replace atomically: other requests read metadata.json without the lock
+        tmp_path = metadata_path.with_suffix(".json.tmp")
+        with tmp_path.open("w") as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(tmp_path, metadata_path)
+        _replicate(job_id, metadata)
 
-    with metadata_path.open("w") as f:
-        json.dump(metadata, f, indent=2)
+    worker_remaining = progress.record_frame(job_id, request.remote_addr, filename, total=metadata.get("total_no_frames"))
+
+    # Spans the worker recorded since its previous frame ride along with this one
+    shipped = request.form.get("trace")
+    if shipped:
+        try:
+            tracer.add(job_id, json.loads(shipped))
+        except (ValueError, TypeError):
+            pass
+    tracer.record(job_id, "submit_frames", started, time.time(), worker=request.remote_addr, frame=filename)
+    if worker_remaining == 0:
+        tracer.instant(job_id, "worker_done", worker=request.remote_addr)
+    if metadata["status"] == "completed_frames":
+        # From the first worker finishing its share to the last frame arriving
+        first_done = tracer.first(job_id, "worker_done")
+        if first_done:
+            tracer.record(job_id, "stragglers", first_done["ts"] / 1e6, time.time())
+    events.publish("frame", {
+        "job_id": job_id,
+        "filename": filename,
+        "remaining_frames": metadata["remaining_frames"],
+        "total_no_frames": metadata.get("total_no_frames"),
+    })
 
     # 8. Success response
     return jsonify({
@@ -377,6 +621,248 @@ def submit_frames():
         "remaining_frames": metadata["remaining_frames"]
     }), 200
 
+def _frame_number(frame_no, filename):
+    """Frame number from the upload's frame_no field, else from a "<frame>.png" filename."""
+    for candidate in (frame_no, os.path.splitext(filename or "")[0]):
+        try:
+            return int(candidate)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+def _read_job_metadata(job_id):
+    """jobs/<id>/metadata.json, or None if this node does not hold the job."""
+    metadata_path = Path(JOBS_DIR) / secure_filename(job_id) / "metadata.json"
+    if not metadata_path.is_file():
+        return None
+    try:
+        with metadata_path.open("r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _forward_to_leader(job_id, resource, metadata):
+    """
+    GET /jobs/<id>/<resource> from the job's leader when that is another
+    node; None when this node should answer itself.
+    """
+    leader_ip = (metadata or {}).get("leader_ip") or discovery.current_leader
+    if not leader_ip or leader_ip == discovery.local_ip or request.args.get("local"):
+        return None
+    try:
+        response = requests.get(
+            f"http://{leader_ip}:5050/api/jobs/{job_id}/{resource}",
+            params={"local": 1},
+            timeout=3
+        )
+        return response.content, response.status_code, {"Content-Type": "application/json"}
+    except requests.RequestException as e:
+        return jsonify({"error": f"Leader unreachable: {e}"}), 502
+
+@api.get("/jobs/<job_id>/progress")
+def job_progress(job_id):
+    """
+    Live progress of a job: frames done, per-worker mean / p95 frame time
+    and rate, and the cluster ETA. Only the leader receives the frames, so
+    any other node forwards the request to it.
+    """
+    metadata = _read_job_metadata(job_id)
+
+    summary = progress.summary(job_id)
+    if summary is None:
+        forwarded = _forward_to_leader(job_id, "progress", metadata)
+        if forwarded is not None:
+            return forwarded
+        if metadata is None:
+            return jsonify({"error": "Job not found"}), 404
+        # Known job without live counters (e.g. started before this leader)
+        total = metadata.get("total_no_frames")
+        remaining = metadata.get("remaining_frames")
+        summary = {
+            "job_id": job_id,
+            "started_at": None,
+            "elapsed_s": None,
+            "frames_total": total,
+            "frames_done": total - remaining if isinstance(total, int) and isinstance(remaining, int) else None,
+            "frames_remaining": remaining,
+            "rate_fps": None,
+            "eta_s": 0.0 if remaining == 0 else None,
+            "workers": {},
+        }
+
+    if metadata is not None:
+        summary["status"] = metadata.get("status")
+        summary["frames_remaining"] = metadata.get("remaining_frames", summary["frames_remaining"])
+    return jsonify(summary), 200
+
+@api.get("/jobs/<job_id>/trace")
+def job_trace(job_id):
+    """
+    Spans of a job from every node, as Chrome trace-event JSON (open it in
+    Perfetto or chrome://tracing). The leader collects them, so any other
+    node forwards the request to it.
+    """
+    if not tracer.events(job_id):
+        forwarded = _forward_to_leader(job_id, "trace", _read_job_metadata(job_id))
+        if forwarded is not None:
+            return forwarded
+        return jsonify({"error": "No trace for this job"}), 404
+    return jsonify(tracer.chrome_trace(job_id)), 200
+
+@api.post("/jobs/<job_id>/trace")
+def collect_trace(job_id):
+    """Spans shipped by other nodes ({"events": [...]}), merged into the job's trace."""
+    data = request.get_json(silent=True) or {}
+    shipped = data.get("events")
+    if not isinstance(shipped, list):
+        return jsonify({"error": "events must be a list"}), 400
+    return jsonify({"job_id": job_id, "accepted": tracer.add(job_id, shipped)}), 200
+
+# Job states a new leader can take over (a job still being created has no assignment yet)
+RESUMABLE_STATUSES = ("in_progress", "completed", "completed_frames", "awaiting_leader")
+
+def _newest_job_state(job_id, old_leader):
+    """
+    The newest state of a job: replicas held by this node and the ring
+    members (GET /api/replica/<id>) and this node's own copy, by leader
+    term. Within a term a replica beats a worker's copy, and a copy this
+    node wrote as leader beats both. Returns (metadata, source).
+    """
+    def fetch(ip):
+        if ip == discovery.local_ip:
+            return replica.load(job_id)
+        try:
+            response = requests.get(f"http://{ip}:5050/api/replica/{job_id}", timeout=2)
+            return response.json() if response.status_code == 200 else None
+        except (requests.RequestException, ValueError):
+            return None
+
+    ips = [w["ip"] for w in discovery.ring_topology if w["ip"] != old_leader]
+    if discovery.local_ip not in ips:
+        ips.append(discovery.local_ip)
+    with ThreadPoolExecutor(max_workers=len(ips)) as pool:
+        candidates = [
+            ((payload.get("term", 0), payload.get("seq", 0)), payload["state"], f"replica:{payload.get('leader')}")
+            for payload in pool.map(fetch, ips)
+            if payload and isinstance(payload.get("state"), dict)
+        ]
+    local = _read_job_metadata(job_id)
+    if local:
+        own = local.get("leader_ip") == discovery.local_ip
+        candidates.append(((local.get("leader_term", 0), float("inf") if own else -1), local, "local"))
+    if not candidates:
+        return None, None
+    _version, state, source = max(candidates, key=lambda candidate: candidate[0])
+    return state, source
+
+@api.post("/jobs/<job_id>/resume")
+def resume_job(job_id):
+    """
+    Take over a running job whose leader was lost, from the newest state
+    the old leader replicated (or this node's copy of the job):
+    - frames of nodes that left the ring, the old leader included, go to
+      the remaining workers
+    - frames already in this node's renders/ count as received. Workers
+      upload again every frame they still hold, since the old leader's
+      renders/ is gone
+    - workers learn the new leader through an ordered JOB_RESUME, or
+      /worker/resume when the control channel is down
+    Answers 409 with need_blend when this node has no copy of the blend;
+    the client then sends it along.
+    """
+    job_id = secure_filename(job_id)
+    old_leader = request.form.get("old_leader")
+
+    metadata, source = _newest_job_state(job_id, old_leader)
+    if metadata is None:
+        return jsonify({"error": "No state of this job found in the ring"}), 404
+    if metadata.get("status") not in RESUMABLE_STATUSES or not metadata.get("jobs"):
+        return jsonify({"error": f"Job cannot be resumed (status {metadata.get('status')})"}), 409
+
+    job_dir = Path(JOBS_DIR) / job_id
+    blend_path = job_dir / secure_filename(metadata.get("filename") or "")
+    if not blend_path.is_file():
+        file = request.files.get("file")
+        if not file:
+            return jsonify({"error": "Blend file required", "need_blend": True}), 409
+        job_dir.mkdir(parents=True, exist_ok=True)
+        file.save(blend_path)
+
+    old_leader = old_leader or metadata.get("leader_ip")
+    members = {w["ip"] for w in discovery.ring_topology}
+    acknowledged = set(metadata.get("received_frames", []))
+    jobs = metadata["jobs"]
+    for ip in [ip for ip in jobs if ip == old_leader or ip not in members]:
+        # Whatever the lost node rendered is gone with it
+        jobs, _added = plan_reassignment(jobs, ip, acknowledged - set(jobs[ip]))
+    if not jobs:
+        return jsonify({"error": "No workers left for this job"}), 409
+    moved = {ip: frames[len(metadata["jobs"].get(ip, [])):] for ip, frames in jobs.items()}
+
+    received = set()
+    renders_dir = job_dir / "renders"
+    if renders_dir.is_dir():
+        received = {frame for frame in (_frame_number(None, name) for name in os.listdir(renders_dir)) if frame is not None}
+
+    term = metadata.get("leader_term", 0) + 1
+    generation = metadata.get("generation", 0) + 1
+    total = metadata.get("total_no_frames") or 0
+    metadata.update({
+        "jobs": jobs,
+        "leader_ip": discovery.local_ip,
+        "leader_term": term,
+        "generation": generation,
+        "status": "in_progress",
+        "no_of_nodes": len(jobs),
+        "received_frames": sorted(received),
+        "remaining_frames": total - len(received),
+    })
+    metadata.setdefault("failovers", []).append({
+        "term": term,
+        "at": datetime.datetime.now().isoformat(),
+        "old_leader": old_leader,
+        "source": source,
+        "frames_acknowledged": len(acknowledged),
+        "frames": {ip: frames for ip, frames in moved.items() if frames},
+    })
+
+    metadata_path = job_dir / "metadata.json"
+    with _job_lock(job_id):
+        tmp_path = metadata_path.with_suffix(".json.tmp")
+        with tmp_path.open("w") as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(tmp_path, metadata_path)
+        _replicate(job_id, metadata)
+
+    progress.start_job(job_id, jobs)
+    _announce("JOB_RESUME", {
+        "job_id": job_id,
+        "leader_ip": discovery.local_ip,
+        "term": term,
+        "generation": generation,
+        "jobs": jobs,
+    }, "/api/worker/resume")
+    print(f"Job {job_id} resumed as leader (term {term}, state from {source}): {len(acknowledged)} frames were acknowledged by {old_leader}")
+
+    return jsonify({
+        "job_id": job_id,
+        "leader": discovery.local_ip,
+        "term": term,
+        "generation": generation,
+        "source": source,
+        "frames_acknowledged": len(acknowledged),
+        "remaining_frames": metadata["remaining_frames"],
+    }), 200
+
+@api.post("/jobs/<job_id>/release")
+def release_job(job_id):
+    """The client has the final video: workers drop the frames they kept for a failover."""
+    job_id = secure_filename(job_id)
+    from backend.api.worker import release_job_local
+    release_job_local(job_id)
+    _announce("JOB_RELEASE", {"job_id": job_id}, "/api/worker/release")
+    return jsonify({"job_id": job_id, "released": True}), 200
+
 @api.post("/jobs/send-video-to-client")
 def send_video_to_client():
     job_id = request.form.get("uuid")
@@ -409,6 +895,11 @@ def send_video_to_client():
     video_path = job_path / "output_video.mp4"
     video.save(video_path)
 
+    # Workers keep their frames until now, in case the leader had to be replaced
+    leader_ip = metadata.get("leader_ip")
+    if leader_ip:
+        threading.Thread(target=_request_release, args=(leader_ip, job_id), daemon=True).start()
+
     print(f"[+] Received video for job {job_id}")
     print(f"    Status     : {status}")
     print(f"    From IP    : {client_ip}")
@@ -419,3 +910,9 @@ def send_video_to_client():
         "job_id": job_id,
         "path": str(video_path)
     }), 200
+
+def _request_release(leader_ip, job_id):
+    try:
+        requests.post(f"http://{leader_ip}:5050/api/jobs/{job_id}/release", timeout=10)
+    except requests.RequestException as e:
+        print(f"[WARN] Could not release the frames of job {job_id}: {e}")
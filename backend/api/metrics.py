@@ -0,0 +1,29 @@
+import glob
+import os
+import time
+from flask import Blueprint, Response
+from backend.services import metrics
+
+api = Blueprint("metrics_api", __name__)
+
+# A textfile not rewritten for this long belongs to a process that has stopped
+TEXTFILE_MAX_AGE = 120.0
+
+
+@api.get("/metrics")
+def prometheus_metrics():
+    """
+    Prometheus text exposition of this process' registry, followed by the
+    metrics worker.py exports to metrics/*.prom.
+    """
+    parts = [metrics.REGISTRY.expose()]
+    now = time.time()
+    for path in sorted(glob.glob(os.path.join(metrics.TEXTFILE_DIR, "*.prom"))):
+        try:
+            if now - os.path.getmtime(path) > TEXTFILE_MAX_AGE:
+                continue
+            with open(path, "r") as f:
+                parts.append(f.read())
+        except OSError:
+            continue
+    return Response("".join(parts), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,75 @@
+import json
+import os
+import time
+from flask import Blueprint, Response, jsonify, request
+from backend.services.profiler import CONTROL_FILENAME, PROFILE_DIR, profiler
+from backend.shared.state import discovery, profiler_enabled
+
+api = Blueprint("profiler_api", __name__)
+
+WORKER_STACKS = os.path.join(PROFILE_DIR, "worker.folded")
+
+
+def _write_control(action, **fields):
+    # worker.py polls this file (SamplingProfiler.follow)
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, CONTROL_FILENAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(dict(fields, action=action, requested_at=time.time()), f)
+    os.replace(path + ".tmp", path)
+
+
+def _worker_stacks():
+    """worker.py's stacks from the current session, if it wrote any."""
+    try:
+        if profiler.started_at and os.path.getmtime(WORKER_STACKS) >= profiler.started_at:
+            with open(WORKER_STACKS, "r") as f:
+                return f.read()
+    except OSError:
+        pass
+    return ""
+
+
+@api.get("/admin/profiler")
+def profiler_status():
+    status = profiler.status()
+    status["enabled"] = profiler_enabled
+    status["worker_stacks"] = len(_worker_stacks().splitlines())
+    return jsonify(status)
+
+
+@api.post("/admin/profiler/start")
+def start_profiler():
+    """
+    Sample for `duration` seconds (capped) every `interval_ms`. scope is
+    "tracked" (request handlers and marked loops) or "all" threads. The
+    local worker.py process is profiled too unless include_worker is false.
+    """
+    if not profiler_enabled:
+        return jsonify({"error": "Profiler is disabled (set PROFILER_ENABLED=1)"}), 403
+    data = request.get_json(silent=True) or {}
+    try:
+        duration = float(data.get("duration", 30))
+        interval = float(data.get("interval_ms", 5)) / 1000
+        status = profiler.start(duration, interval, data.get("scope", "tracked"))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    if data.get("include_worker", True):
+        _write_control("start", until=status["until"], interval=status["interval"], scope=status["scope"])
+    return jsonify(status), 200
+
+
+@api.post("/admin/profiler/stop")
+def stop_profiler():
+    _write_control("stop")
+    return jsonify(profiler.stop()), 200
+
+
+@api.get("/admin/profiler/stacks")
+def download_stacks():
+    """Collapsed stacks of the last session (api;... and worker;...), for flamegraph tools."""
+    body = profiler.collapsed(prefix="api") + "".join(
+        f"worker;{line}\n" for line in _worker_stacks().splitlines() if line
+    )
+    filename = f"profile-{discovery.local_ip}-{int(profiler.started_at or time.time())}.folded"
+    return Response(body, mimetype="text/plain", headers={"Content-Disposition": f'attachment; filename="{filename}"'})
@@ -0,0 +1,29 @@
+from flask import Blueprint, jsonify, request
+from backend.shared.state import replica
+
+api = Blueprint("replica_api", __name__)
+
+
+@api.post("/replica")
+def store_replica():
+    """The leader's latest job states, kept here as its standby."""
+    data = request.get_json(silent=True) or {}
+    replicas = data.get("replicas")
+    if not isinstance(replicas, list):
+        return jsonify({"error": "replicas must be a list"}), 400
+    return jsonify({"stored": replica.store(replicas)})
+
+
+@api.get("/replica")
+def replica_status():
+    """What this node replicates as leader and holds as standby."""
+    return jsonify(replica.status())
+
+
+@api.get("/replica/<job_id>")
+def get_replica(job_id):
+    """A job's replicated state, for a new leader taking over."""
+    payload = replica.load(job_id)
+    if payload is None:
+        return jsonify({"error": "No replica of this job"}), 404
+    return jsonify(payload)
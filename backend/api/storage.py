@@ -0,0 +1,23 @@
+from flask import Blueprint, jsonify, request
+from backend.shared.state import storage
+
+api = Blueprint("storage_api", __name__)
+
+
+@api.get("/storage")
+def storage_status():
+    """
+    This node's disk budget. `?bytes=N` asks whether a job of N more bytes
+    would fit ("accepting"); the leader polls it before assigning frames.
+    """
+    try:
+        incoming = int(request.args.get("bytes", 0))
+    except ValueError:
+        return jsonify({"error": "bytes must be an integer"}), 400
+    return jsonify(storage.status(incoming))
+
+
+@api.post("/storage/gc")
+def collect_storage():
+    """Run a collection now; returns what was removed and the space reclaimed."""
+    return jsonify(storage.collect())
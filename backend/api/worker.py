@@ -1,10 +1,9 @@
 from flask import Blueprint, request, jsonify, json
 import tempfile, uuid, os, requests, datetime
 from werkzeug.utils import secure_filename
-from backend.shared.state import blender, discovery
+from backend.shared.state import blender, discovery, replica, storage
 import json
 from pathlib import Path
-import shutil
 
 JOBS_DIR = "jobs"
 os.makedirs(JOBS_DIR, exist_ok=True)
@@ -43,17 +42,36 @@ def submit_job():
     if not job_id:
         return jsonify({"error": "uuid missing"}), 400
 
-    # 4. Create job directory
-    job_dir = os.path.join(JOBS_DIR, job_id)
-    os.makedirs(job_dir, exist_ok=True)
+    with storage.reserve(request.content_length or 0) as admitted:
+        if not admitted:
+            return jsonify({"error": "Insufficient storage on this node"}), 507
 
-    # 5. Save blend file
-    blend_path = os.path.join(job_dir, blend_filename)
-    blend_file.save(blend_path)
+        # 4. Create job directory
+        job_dir = os.path.join(JOBS_DIR, job_id)
+        os.makedirs(job_dir, exist_ok=True)
 
-    # 6. Save metadata file exactly as sent
+        # 5. Save blend file
+        blend_path = os.path.join(job_dir, blend_filename)
+        blend_file.save(blend_path)
+
+    # 6. Save metadata file. A running job is held as "awaiting_commit" until the
+    #    ordered JOB_COMMIT arrives (only when the control channel is up; the
+    #    leader's own copy is never held)
     metadata_path = os.path.join(job_dir, "metadata.json")
-    metadata_file.save(metadata_path)
+    try:
+        metadata = json.load(metadata_file.stream)
+    except Exception:
+        return jsonify({"error": "Invalid metadata file"}), 400
+
+    if (
+        metadata.get("status") == "in_progress"
+        and metadata.get("leader_ip") != discovery.local_ip
+        and discovery.control_channel_connected()
+    ):
+        metadata["status"] = "awaiting_commit"
+
+    with open(metadata_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=4)
 
     # 7. If an ordered commit already arrived, finalize it now
     try:
@@ -90,6 +108,43 @@ def stop_render():
 
     return jsonify({"success": True, "result": result})
 
+@api.post("/worker/reassign")
+def reassign_job():
+    """Fallback for the ordered JOB_REASSIGN when the control channel is down."""
+    data = request.get_json() or {}
+    job_id = data.get("job_id")
+    generation = data.get("generation")
+    jobs = data.get("jobs")
+
+    if not job_id or generation is None or not isinstance(jobs, dict):
+        return jsonify({"success": False, "message": "job_id, generation and jobs are required."}), 400
+
+    result = reassign_job_local(job_id, int(generation), jobs, term=int(data.get("term", 0)))
+    return jsonify({"success": result.get("status") != "error", "result": result})
+
+@api.post("/worker/resume")
+def resume_job():
+    """Fallback for the ordered JOB_RESUME when the control channel is down."""
+    data = request.get_json() or {}
+    job_id = data.get("job_id")
+    leader_ip = data.get("leader_ip")
+    jobs = data.get("jobs")
+
+    if not job_id or not leader_ip or not isinstance(jobs, dict):
+        return jsonify({"success": False, "message": "job_id, leader_ip and jobs are required."}), 400
+
+    result = resume_job_local(job_id, leader_ip, int(data.get("term", 0)), int(data.get("generation", 0)), jobs)
+    return jsonify({"success": result.get("status") != "error", "result": result})
+
+@api.post("/worker/release")
+def release_job():
+    """Fallback for the ordered JOB_RELEASE when the control channel is down."""
+    data = request.get_json() or {}
+    job_id = data.get("job_id")
+    if not job_id:
+        return jsonify({"success": False, "message": "job_id is required."}), 400
+    return jsonify({"success": True, "result": release_job_local(job_id)})
+
 def commit_job_local(job_id, assigned_worker_ip):
     """
     Apply the ordered 'JOB_COMMIT' decision locally.
@@ -109,8 +164,11 @@ def commit_job_local(job_id, assigned_worker_ip):
 
     metadata["assigned_worker"] = assigned_worker_ip
 
-    # Don't override a running job, but mark it ready if not started yet
-    if metadata.get("status") not in ("in_progress", "completed", "completed_frames"):
+    # A job held for the commit starts rendering now; otherwise don't override
+    # a running job, but mark it ready if not started yet
+    if metadata.get("status") == "awaiting_commit":
+        metadata["status"] = "in_progress"
+    elif metadata.get("status") not in ("in_progress", "completed", "completed_frames"):
         metadata["status"] = "ready"
 
     with open(job_meta_path, "w", encoding="utf-8") as f:
@@ -118,6 +176,89 @@ def commit_job_local(job_id, assigned_worker_ip):
 
     return {"status": "ok", "message": "Job committed"}
 
+def _write_metadata(job_meta_path, metadata):
+    tmp_path = job_meta_path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(tmp_path, job_meta_path)
+
+def reassign_job_local(job_id, generation, jobs, term=0):
+    """
+    Apply a new frame assignment for a running job (ordered 'JOB_REASSIGN').
+
+    Assignments only move forward (leader term, then generation), so a late
+    or repeated message is ignored. The blend and the frames already
+    rendered stay where they are; worker.py sees the new generation and
+    renders only the frames it has not done yet.
+    """
+    job_meta_path = Path(JOBS_DIR) / job_id / "metadata.json"
+    if not job_meta_path.exists():
+        return {"status": "ignored", "message": "Job not on this node"}
+
+    with open(job_meta_path, "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+
+    if (term, generation) <= (metadata.get("leader_term", 0), metadata.get("generation", 0)):
+        return {"status": "ignored", "message": "Generation already applied"}
+    if metadata.get("status") in ("canceled", "completed_frames"):
+        return {"status": "ignored", "message": "Job no longer running"}
+
+    metadata["jobs"] = jobs
+    metadata["leader_term"] = term
+    metadata["generation"] = generation
+    metadata["no_of_nodes"] = len(jobs)
+    # A worker that already finished its share picks the job up again
+    if metadata.get("status") == "completed" and jobs.get(discovery.local_ip):
+        metadata["status"] = "in_progress"
+
+    _write_metadata(job_meta_path, metadata)
+    return {"status": "ok", "message": f"Generation {generation} applied"}
+
+def resume_job_local(job_id, leader_ip, term, generation, jobs):
+    """
+    Follow a job to its new leader after a failover (ordered 'JOB_RESUME').
+
+    The job runs again under the new term: worker.py uploads every frame it
+    kept in render_output/<job_id> to the new leader, then renders whatever
+    of its assignment is still missing.
+    """
+    job_meta_path = Path(JOBS_DIR) / job_id / "metadata.json"
+    if not job_meta_path.exists():
+        return {"status": "ignored", "message": "Job not on this node"}
+
+    with open(job_meta_path, "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+
+    if term <= metadata.get("leader_term", 0):
+        return {"status": "ignored", "message": "Term already applied"}
+    if metadata.get("status") == "canceled":
+        return {"status": "ignored", "message": "Job canceled"}
+
+    metadata["leader_ip"] = leader_ip
+    metadata["leader_term"] = term
+    metadata["generation"] = generation
+    metadata["jobs"] = jobs
+    metadata["no_of_nodes"] = len(jobs)
+    metadata["status"] = "in_progress"
+
+    _write_metadata(job_meta_path, metadata)
+    return {"status": "ok", "message": f"Following leader {leader_ip} (term {term})"}
+
+def release_job_local(job_id):
+    """The job is delivered: drop the frames kept for a failover and any replica of its state."""
+    replica.forget(job_id)
+    freed = storage.cleanup_output(job_id, reason="released")
+
+    # A worker's finished share may now be evicted like any finished job
+    job_meta_path = Path(JOBS_DIR) / job_id / "metadata.json"
+    if job_meta_path.exists():
+        with open(job_meta_path, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        if metadata.get("status") == "completed":
+            metadata["status"] = "released"
+            _write_metadata(job_meta_path, metadata)
+    return {"status": "ok", "reclaimed_bytes": freed}
+
 def stop_render_local(job_id, worker_ip=None):
     """
     Stop rendering a job locally by marking it as canceled.
@@ -147,18 +288,15 @@ def stop_render_local(job_id, worker_ip=None):
     return {"status": "ignored", "message": "Job not running"}
 
 def cancel_job_local(job_id):
-    """Delete a specific job folder locally (ordered control action)."""
+    """Delete a specific job folder and its render output locally (ordered control action)."""
     job_path = Path(JOBS_DIR) / job_id
     if not job_path.exists():
         return {"status": "ignored", "message": "Job folder not found"}
 
     try:
-        if job_path.is_dir():
-            shutil.rmtree(job_path)
-
-        else:
-            job_path.unlink(missing_ok=True)
-        return {"status": "ok", "message": "Job deleted"}
+        replica.forget(job_id)
+        freed = storage.remove_job(job_id, reason="canceled")
+        return {"status": "ok", "message": "Job deleted", "reclaimed_bytes": freed}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
@@ -169,12 +307,14 @@ def cancel_all_local():
         return {"status": "ignored", "message": "Jobs dir not found"}
 
     deleted = 0
+    freed = 0
     for p in jobs_dir.iterdir():
         try:
             if p.is_dir():
-                shutil.rmtree(p)
+                replica.forget(p.name)
+                freed += storage.remove_job(p.name, reason="canceled")
                 deleted += 1
         except Exception:
             continue
 
-    return {"status": "ok", "deleted": deleted}
+    return {"status": "ok", "deleted": deleted, "reclaimed_bytes": freed}
@@ -1,6 +1,8 @@
 import os
-from flask import Flask, send_from_directory
+from flask import Flask, g, request, send_from_directory
 from flask_cors import CORS
+from backend.services.profiler import profiler
+from backend.shared.state import replica, storage
 
 # from backend.routes.api_routes import api
 # from backend.routes.jobs import jobs_api
@@ -13,6 +15,23 @@ def create_app():
     # Register API routes
     register_blueprints(app)
 
+    # Retention / disk-pressure collection of jobs/ and render_output/ (worker.py shares the folders)
+    storage.start()
+    # Leader state for failover goes to the ring successor
+    replica.start()
+
+    # Every request thread is sampled under its endpoint while the profiler runs
+    @app.before_request
+    def profile_request():
+        if profiler.active:
+            g.profiler_previous = profiler.track(f"{request.method} {request.endpoint}")
+            g.profiler_tracked = True
+
+    @app.teardown_request
+    def unprofile_request(exc):
+        if g.pop("profiler_tracked", False):
+            profiler.untrack(g.pop("profiler_previous", None))
+
     @app.errorhandler(404)
     def not_found(e):
         # This catches any route that isn't an API or a real static file
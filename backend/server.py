@@ -0,0 +1,152 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from flask import Flask
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler, make_server
+
+SERVER_MODES = ("waitress", "threaded", "dev")
+
+# waitress rejects bodies over 1 GiB by default; .blend uploads can be larger
+_UNLIMITED_BODY = 1 << 50
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    Werkzeug server that hands each connection to a fixed pool of threads:
+    - `threads` bounds concurrent requests (the dev server starts one
+      thread per connection, without limit)
+    - `timeout` closes a connection whose client stops sending
+    - `backlog` is the listen queue for connections waiting on the pool
+
+    Werkzeug closes the connection after every response, so this mode has
+    no keep-alive; it is the fallback when waitress is not installed.
+    """
+
+    mode = "threaded"
+    multithread = True
+
+    def __init__(self, host: str, port: int, app: Any, threads: int = 16,
+                 timeout: float = 15.0, backlog: int = 128):
+        self.request_queue_size = backlog
+        handler = type("PooledRequestHandler", (WSGIRequestHandler,), {"timeout": timeout})
+        super().__init__(host, port, app, handler=handler)
+        self.threads = threads
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="http")
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process_request_thread, request, client_address)
+
+    def _process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False)
+
+
+class _WaitressServer:
+    """waitress behind the same serve_forever / shutdown / server_close interface."""
+
+    mode = "waitress"
+
+    def __init__(self, host: str, port: int, app: Any, threads: int, keepalive_timeout: float,
+                 backlog: int, max_content_length: Optional[int]):
+        from waitress import create_server
+
+        self._server = create_server(
+            app,
+            host=host,
+            port=port,
+            threads=threads,
+            channel_timeout=keepalive_timeout,
+            backlog=backlog,
+            max_request_body_size=max_content_length or _UNLIMITED_BODY,
+            asyncore_use_poll=True,
+        )
+
+    def serve_forever(self):
+        self._server.run()
+
+    def shutdown(self):
+        self._server.close()
+
+    def server_close(self):
+        self._server.close()
+
+
+def build_server(
+    app: Flask,
+    host: str = "0.0.0.0",
+    port: int = 5050,
+    mode: str = "waitress",
+    threads: int = 16,
+    keepalive_timeout: float = 15.0,
+    backlog: int = 128,
+    max_content_length: Optional[int] = None,
+):
+    """
+    Create (but do not start) the HTTP server for `app`. Modes:
+    - waitress: `threads` request threads, HTTP/1.1 keep-alive, request
+      bodies buffered before a thread picks them up (slow uploads do not
+      hold a thread); falls back to threaded if waitress is missing
+    - threaded: PooledWSGIServer, no extra dependency
+    - dev: Flask's development server with the debugger
+
+    Multi-process servers are deliberately not offered: each process would
+    start its own discovery, sequencer and election state.
+    """
+    if mode not in SERVER_MODES:
+        raise ValueError(f"mode must be one of {SERVER_MODES}")
+    if threads < 1:
+        raise ValueError("threads must be at least 1")
+    if max_content_length:
+        app.config["MAX_CONTENT_LENGTH"] = max_content_length
+
+    if mode == "dev":
+        return _dev_server(app, host, port)
+    if mode == "waitress":
+        try:
+            return _WaitressServer(host, port, app, threads, keepalive_timeout, backlog, max_content_length)
+        except ImportError:
+            print("[Server] waitress is not installed, using the threaded server")
+    return PooledWSGIServer(host, port, app, threads, keepalive_timeout, backlog)
+
+
+def _dev_server(app: Flask, host: str, port: int):
+    # What app.run(debug=True) builds, minus the blocking call
+    from werkzeug.debug import DebuggedApplication
+
+    app.debug = True
+    server = make_server(host, port, DebuggedApplication(app, evalex=True), threaded=True)
+    server.mode = "dev"
+    return server
+
+
+def serve(app: Flask, host: str = "0.0.0.0", port: int = 5050, **options: Any) -> None:
+    """Build the server from `options` (see build_server) and block serving requests."""
+    server = build_server(app, host=host, port=port, **options)
+    print(f"Server running: http://localhost:{port} ({server.mode})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def options_from_env() -> dict:
+    """Server options from SERVER_MODE / HTTP_THREADS / HTTP_KEEPALIVE / HTTP_BACKLOG / MAX_UPLOAD_MB."""
+    max_upload_mb = float(os.getenv("MAX_UPLOAD_MB") or 0)
+    return {
+        "mode": os.getenv("SERVER_MODE") or "waitress",
+        "threads": int(os.getenv("HTTP_THREADS") or 16),
+        "keepalive_timeout": float(os.getenv("HTTP_KEEPALIVE") or 15.0),
+        "backlog": int(os.getenv("HTTP_BACKLOG") or 128),
+        "max_content_length": int(max_upload_mb * 1024 * 1024) or None,
+    }
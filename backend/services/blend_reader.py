@@ -0,0 +1,415 @@
+import gzip
+import io
+import re
+import struct
+import zlib
+from collections import namedtuple
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+MAGIC = b"BLENDER"
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# File versions the scene fields below were checked against; anything else goes to Blender
+MIN_VERSION = 280
+MAX_VERSION = 500
+
+# Payloads of small DATA blocks are kept while streaming a compressed file,
+# since that stream cannot be re-read cheaply (ID properties live in them)
+SMALL_BLOCK = 1024
+
+_PRIMITIVES = {
+    "char": "b", "uchar": "B", "int8_t": "b", "uint8_t": "B",
+    "short": "h", "ushort": "H", "int16_t": "h", "uint16_t": "H",
+    "int": "i", "uint": "I", "int32_t": "i", "uint32_t": "I",
+    "int64_t": "q", "uint64_t": "Q", "float": "f", "double": "d",
+}
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_DIMENSION = re.compile(r"\[(\d+)\]")
+
+# IDProperty.type values (DNA_ID.h)
+IDP_STRING = 0
+IDP_INT = 1
+IDP_FLOAT = 2
+IDP_GROUP = 6
+IDP_DOUBLE = 8
+IDP_BOOLEAN = 10
+
+Block = namedtuple("Block", "code sdna_index address length count offset")
+Field = namedtuple("Field", "type offset size pointer count")
+
+
+class BlendFileError(Exception):
+    pass
+
+
+class UnsupportedBlendFile(BlendFileError):
+    """A valid .blend this reader does not handle (version, compression); Blender can."""
+
+
+class DNAStruct:
+    __slots__ = ("name", "size", "fields")
+
+    def __init__(self, name: str, size: int, fields: Dict[str, Field]):
+        self.name = name
+        self.size = size
+        self.fields = fields
+
+
+class BlendFile:
+    """
+    Reads the .blend container without Blender:
+    - the header (pointer size, endianness, file version), in both the
+      12-byte layout and the 17-byte one Blender 5.0 introduced
+    - the file block index: code, SDNA struct, old memory address, size
+    - the SDNA catalogue, which describes every struct's fields and
+      offsets as they were when the file was written
+
+    Only the payloads needed to answer questions (GLOB, SC, DNA1 and, for
+    compressed files, small DATA blocks) are kept in memory; the rest of an
+    uncompressed file is read on demand by seeking.
+    """
+
+    def __init__(self, stream: BinaryIO, compression: Optional[str] = None, path: Optional[str] = None):
+        self.path = path
+        self.compression = compression
+        self._stream = stream
+        self._payloads: Dict[int, bytes] = {}
+        self.blocks: List[Block] = []
+        self._by_address: Dict[int, Block] = {}
+        self._read_header()
+        self._read_blocks()
+        dna = self.find_blocks(b"DNA1")
+        if not dna:
+            raise BlendFileError("no DNA1 block")
+        self._read_sdna(self.data(dna[0]))
+
+    @classmethod
+    def open(cls, path: str) -> "BlendFile":
+        f = open(path, "rb")
+        try:
+            magic = f.read(4)
+            f.seek(0)
+            if magic[:2] == GZIP_MAGIC:
+                return cls(gzip.GzipFile(fileobj=f), "gzip", path)
+            if magic == ZSTD_MAGIC:
+                return cls(_zstd_reader(f), "zstd", path)
+            return cls(f, None, path)
+        except Exception:
+            f.close()
+            raise
+
+    def close(self) -> None:
+        self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # --- container ---
+
+    def _read_header(self) -> None:
+        head = self._stream.read(12)
+        if len(head) < 12 or not head.startswith(MAGIC):
+            raise BlendFileError("not a .blend file")
+        if head[7:8] in (b"_", b"-"):
+            # BLENDER_v402: pointer size, endianness, version
+            self.pointer_size = 4 if head[7:8] == b"_" else 8
+            endian, version = head[8:9], head[9:12]
+            bhead = "4siIii" if self.pointer_size == 4 else "4siQii"
+        else:
+            # BLENDER17-01v0500: header size, file format version, endianness, version
+            head += self._stream.read(5)
+            if head[7:9] != b"17" or head[10:12] != b"01":
+                raise UnsupportedBlendFile(f"unknown .blend header {head[:17]!r}")
+            self.pointer_size = 8
+            endian, version = head[12:13], head[13:17]
+            bhead = "4siQqq"
+        if endian not in (b"v", b"V") or not version.isdigit():
+            raise BlendFileError(f"malformed .blend header {head!r}")
+        self.endian = "<" if endian == b"v" else ">"
+        self.version = int(version)
+        self._large_bhead = len(head) == 17
+        self._bhead = struct.Struct(self.endian + bhead)
+        self._offset = len(head)
+
+    def _read_blocks(self) -> None:
+        keep_small = self.compression is not None
+        size = self._bhead.size
+        while True:
+            raw = self._stream.read(size)
+            if len(raw) < size:
+                raise BlendFileError("truncated .blend (no ENDB block)")
+            if self._large_bhead:
+                code, sdna_index, address, length, count = self._bhead.unpack(raw)
+            else:
+                code, length, address, sdna_index, count = self._bhead.unpack(raw)
+            self._offset += size
+            if code == b"ENDB":
+                break
+            block = Block(code, sdna_index, address, length, count, self._offset)
+            self.blocks.append(block)
+            if address:
+                self._by_address[address] = block
+            if code in (b"GLOB", b"SC\x00\x00", b"DNA1") or (keep_small and length <= SMALL_BLOCK):
+                payload = self._stream.read(length)
+                if len(payload) < length:
+                    raise BlendFileError("truncated .blend block")
+                self._payloads[block.offset] = payload
+            else:
+                self._skip(length)
+            self._offset += length
+
+    def _skip(self, length: int) -> None:
+        if self.compression is None:
+            self._stream.seek(length, io.SEEK_CUR)
+            return
+        while length > 0:
+            chunk = self._stream.read(min(length, 1 << 20))
+            if not chunk:
+                raise BlendFileError("truncated .blend block")
+            length -= len(chunk)
+
+    def find_blocks(self, code: bytes) -> List[Block]:
+        code = code.ljust(4, b"\x00")
+        return [block for block in self.blocks if block.code == code]
+
+    def block_at(self, address: int) -> Optional[Block]:
+        return self._by_address.get(address) if address else None
+
+    def data(self, block: Block) -> bytes:
+        payload = self._payloads.get(block.offset)
+        if payload is None:
+            if self.compression is not None:
+                raise UnsupportedBlendFile("block payload was not kept while reading a compressed file")
+            self._stream.seek(block.offset)
+            payload = self._stream.read(block.length)
+        return payload
+
+    # --- SDNA ---
+
+    def _read_sdna(self, data: bytes) -> None:
+        if data[:4] != b"SDNA":
+            raise BlendFileError("DNA1 block does not start with SDNA")
+        pos = 4
+        names, pos = self._read_strings(data, pos, b"NAME")
+        types, pos = self._read_strings(data, pos, b"TYPE")
+
+        pos = self._expect(data, pos, b"TLEN")
+        lengths = struct.unpack_from(f"{self.endian}{len(types)}H", data, pos)
+        pos = _align4(pos + 2 * len(types))
+
+        pos = self._expect(data, pos, b"STRC")
+        (count,) = struct.unpack_from(self.endian + "i", data, pos)
+        pos += 4
+        self.types = types
+        self.type_sizes = dict(zip(types, lengths))
+        # Field lists are decoded the first time a struct is used; a file
+        # describes ~1000 structs and a scene lookup touches a handful
+        self._sdna = data
+        self._names = names
+        self._struct_positions: List[int] = []
+        self._structs: Dict[int, DNAStruct] = {}
+        self._struct_indexes: Dict[str, int] = {}
+        for index in range(count):
+            type_index, field_count = struct.unpack_from(self.endian + "hh", data, pos)
+            self._struct_positions.append(pos)
+            self._struct_indexes.setdefault(types[type_index], index)
+            pos += 4 + 4 * field_count
+
+    def _struct_at(self, index: int) -> DNAStruct:
+        dna_struct = self._structs.get(index)
+        if dna_struct is None:
+            pair = struct.Struct(self.endian + "hh")
+            pos = self._struct_positions[index]
+            type_index, field_count = pair.unpack_from(self._sdna, pos)
+            fields: Dict[str, Field] = {}
+            offset = 0
+            for field_type, name_index in pair.iter_unpack(self._sdna[pos + 4:pos + 4 + 4 * field_count]):
+                name = self._names[name_index]
+                field = self._field(self.types[field_type], name, self.type_sizes[self.types[field_type]], offset)
+                fields.setdefault(_IDENTIFIER.search(name).group(0), field)
+                offset += field.size
+            type_name = self.types[type_index]
+            dna_struct = self._structs[index] = DNAStruct(type_name, self.type_sizes[type_name], fields)
+        return dna_struct
+
+    def _read_strings(self, data: bytes, pos: int, tag: bytes) -> Tuple[List[str], int]:
+        pos = self._expect(data, pos, tag)
+        (count,) = struct.unpack_from(self.endian + "i", data, pos)
+        pos += 4
+        strings = []
+        for _ in range(count):
+            end = data.index(b"\x00", pos)
+            strings.append(data[pos:end].decode("ascii", "replace"))
+            pos = end + 1
+        return strings, _align4(pos)
+
+    @staticmethod
+    def _expect(data: bytes, pos: int, tag: bytes) -> int:
+        if data[pos:pos + 4] != tag:
+            raise BlendFileError(f"SDNA: expected {tag!r} at {pos}")
+        return pos + 4
+
+    def _field(self, type_name: str, name: str, type_size: int, offset: int) -> Field:
+        pointer = name.startswith("*") or name.startswith("(*")
+        count = 1
+        for dimension in _DIMENSION.findall(name):
+            count *= int(dimension)
+        size = (self.pointer_size if pointer else type_size) * count
+        return Field(type_name, offset, size, pointer, count)
+
+    def struct(self, name: str) -> Optional[DNAStruct]:
+        index = self._struct_indexes.get(name)
+        return self._struct_at(index) if index is not None else None
+
+    # --- values ---
+
+    def get(self, block: Block, path: str, default: Any = None) -> Any:
+        """
+        Value of a dotted field path ("r.frs_sec") in the block's first
+        struct: numbers, strings for char arrays, tuples for other arrays and
+        addresses for pointers. `default` when a field does not exist.
+        """
+        dna_struct = self._struct_at(block.sdna_index)
+        offset = 0
+        parts = path.split(".")
+        for i, part in enumerate(parts):
+            field = dna_struct.fields.get(part)
+            if field is None:
+                return default
+            if i == len(parts) - 1:
+                return self._value(self.data(block), offset + field.offset, field)
+            dna_struct = self.struct(field.type)
+            if dna_struct is None or field.pointer:
+                return default
+            offset += field.offset
+        return default
+
+    def _value(self, data: bytes, offset: int, field: Field) -> Any:
+        if field.pointer:
+            fmt = "I" if self.pointer_size == 4 else "Q"
+            values = struct.unpack_from(f"{self.endian}{field.count}{fmt}", data, offset)
+            return values[0] if field.count == 1 else values
+        if field.type == "char" and field.count > 1:
+            return data[offset:offset + field.count].split(b"\x00", 1)[0].decode("utf-8", "replace")
+        fmt = _PRIMITIVES.get(field.type)
+        if fmt is None:
+            return None
+        values = struct.unpack_from(f"{self.endian}{field.count}{fmt}", data, offset)
+        return values[0] if field.count == 1 else values
+
+    def id_properties(self, block: Block, field: str = "id.properties") -> Dict[str, Any]:
+        """An ID's custom properties (IDProperty groups) as nested dicts of ints, floats and strings."""
+        return self._id_property_group(self.get(block, field), depth=0)
+
+    def _id_property_group(self, address: Optional[int], depth: int) -> Dict[str, Any]:
+        group = self.block_at(address)
+        if group is None or depth > 8 or self.get(group, "type") != IDP_GROUP:
+            return {}
+        values: Dict[str, Any] = {}
+        child = self.block_at(self.get(group, "data.group.first"))
+        seen = set()
+        while child is not None and child.address not in seen:
+            seen.add(child.address)
+            value = self._id_property(child, depth)
+            if value is not None:
+                values[self.get(child, "name")] = value
+            child = self.block_at(self.get(child, "next"))
+        return values
+
+    def _id_property(self, block: Block, depth: int) -> Any:
+        kind = self.get(block, "type")
+        if kind in (IDP_INT, IDP_BOOLEAN):
+            return self.get(block, "data.val")
+        if kind == IDP_FLOAT:
+            # Stored in the bits of data.val
+            return struct.unpack(self.endian + "f", struct.pack(self.endian + "i", self.get(block, "data.val")))[0]
+        if kind == IDP_DOUBLE:
+            low, high = self.get(block, "data.val"), self.get(block, "data.val2")
+            return struct.unpack(self.endian + "d", struct.pack(self.endian + "ii", *(
+                (low, high) if self.endian == "<" else (high, low))))[0]
+        if kind == IDP_STRING:
+            target = self.block_at(self.get(block, "data.pointer"))
+            return self.data(target).split(b"\x00", 1)[0].decode("utf-8", "replace") if target else None
+        if kind == IDP_GROUP:
+            return self._id_property_group(block.address, depth + 1)
+        return None
+
+    def active_scene(self) -> Optional[Block]:
+        scenes = self.find_blocks(b"SC")
+        for glob in self.find_blocks(b"GLOB"):
+            scene = self.block_at(self.get(glob, "curscene"))
+            if scene is not None and scene.code == b"SC\x00\x00":
+                return scene
+        return scenes[0] if scenes else None
+
+
+def _align4(pos: int) -> int:
+    return (pos + 3) & ~3
+
+
+def _zstd_reader(f: BinaryIO) -> BinaryIO:
+    try:
+        from compression import zstd  # Python 3.14+
+        return zstd.ZstdFile(f)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise UnsupportedBlendFile("zstd-compressed .blend needs the zstandard package (or Python 3.14+)")
+    return zstandard.ZstdDecompressor().stream_reader(f)
+
+
+def read_scene_settings(path: str) -> Dict[str, Any]:
+    """
+    Render settings of the file's active scene, in the keys
+    BlenderService.analyze returns plus resolution and samples. Raises
+    UnsupportedBlendFile for files outside MIN_VERSION..MAX_VERSION or
+    whose scene lacks an expected field, BlendFileError for damaged ones.
+    """
+    try:
+        with BlendFile.open(path) as blend:
+            if not MIN_VERSION <= blend.version <= MAX_VERSION:
+                raise UnsupportedBlendFile(f"file version {blend.version} is not supported")
+            scene = blend.active_scene()
+            if scene is None:
+                raise BlendFileError("no scene in file")
+            settings = {
+                "fps": blend.get(scene, "r.frs_sec"),
+                "renderer": blend.get(scene, "r.engine"),
+                "frame_start": blend.get(scene, "r.sfra"),
+                "frame_end": blend.get(scene, "r.efra"),
+            }
+            missing = [key for key, value in settings.items() if value in (None, "")]
+            if missing:
+                raise UnsupportedBlendFile(f"scene fields not found: {', '.join(missing)}")
+            settings.update({
+                "fps_base": blend.get(scene, "r.frs_sec_base"),
+                "resolution_x": blend.get(scene, "r.xsch"),
+                "resolution_y": blend.get(scene, "r.ysch"),
+                "resolution_percentage": blend.get(scene, "r.size"),
+                "samples": _samples(blend, scene, settings["renderer"]),
+                "file_version": f"{blend.version // 100}.{blend.version % 100}",
+            })
+            return settings
+    except (struct.error, IndexError, ValueError, EOFError, zlib.error, gzip.BadGzipFile) as e:
+        raise BlendFileError(f"damaged .blend: {e}") from e
+
+
+def _samples(blend: BlendFile, scene: Block, engine: str) -> Optional[int]:
+    if engine == "CYCLES":
+        # Cycles keeps its settings as ID properties (system properties from 5.0);
+        # a value never changed from the default is not stored at all
+        for field in ("id.system_properties", "id.properties"):
+            cycles = blend.id_properties(scene, field).get("cycles")
+            if isinstance(cycles, dict) and isinstance(cycles.get("samples"), int):
+                return cycles["samples"]
+        return None
+    if engine.startswith("BLENDER_EEVEE"):
+        return blend.get(scene, "eevee.taa_render_samples")
+    return None
@@ -1,58 +1,176 @@
+import hashlib
+import json
 import subprocess
 import os
-from typing import Dict, Optional
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from backend.services import metrics
+from backend.services.blend_reader import BlendFileError, read_scene_settings
+
+_ANALYZE_SECONDS = metrics.histogram("renderfarm_blender_analyze_seconds", "Blender subprocess time to analyze an uploaded .blend")
+_ANALYSES = metrics.counter("renderfarm_blender_analysis_total", "Analysis requests by cache result", ("result",))
+_CACHE_HIT = _ANALYSES.labels("hit")
+_CACHE_MISS = _ANALYSES.labels("miss")
+_NATIVE = _ANALYSES.labels("native")
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "extract_blend_file_properties.py")
+
 
 class BlendServiceError(Exception):
     pass
 
-env = os.environ.copy()
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 class BlenderService:
-    def __init__(self, blender_binary: Optional[str] = None):
+    """
+    Analyzes .blend files, without Blender when possible:
+    - files the pure-Python reader (blend_reader) understands are answered
+      from their scene block in milliseconds, with resolution and samples
+      on top; detailed analyses, and files the reader cannot handle, go to
+      a background Blender process
+    - results are cached by (SHA-256 of the file, Blender version) with
+      LRU eviction after `cache_size` entries, so analyzing the same file
+      again costs one hash
+    - at most `max_workers` Blender processes run at once; concurrent
+      requests for the same file share one analysis
+    - every analysis writes to its own temporary output file
+    """
+
+    def __init__(self, blender_binary: Optional[str] = None, max_workers: int = 2, cache_size: int = 128,
+                 native_reader: bool = True):
         self.blender_binary = (
             blender_binary
             or os.getenv("BLENDER_PATH")
             or "blender"
         )
+        self.cache_size = cache_size
+        self.native_reader = native_reader
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="blender-analyze")
+        self._cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+
+    def blender_version(self) -> str:
+        """First line of `blender --version`, read once ("unknown" until it succeeds)."""
+        if self._version is None:
+            try:
+                result = subprocess.run([self.blender_binary, "--version"], capture_output=True, text=True, timeout=60)
+            except (OSError, subprocess.SubprocessError):
+                return "unknown"
+            lines = result.stdout.strip().splitlines()
+            if result.returncode != 0 or not lines:
+                return "unknown"
+            self._version = lines[0].strip()
+        return self._version
+
+    def analyze(self, blend_file_path: str, detailed: bool = False) -> Dict[str, Any]:
+        """
+        Scene settings of the file. `detailed` asks Blender for the full
+        scene analysis (geometry, textures, libraries, caches, frame hints);
+        if Blender cannot provide it, the natively read settings are returned
+        with the reason under "analysis_error".
+        """
+        native = None
+        if self.native_reader:
+            try:
+                native = read_scene_settings(blend_file_path)
+            except (BlendFileError, OSError) as e:
+                print(f"[BlenderService] Reading {os.path.basename(blend_file_path)} natively failed ({e}), using Blender")
+            else:
+                if not detailed:
+                    _NATIVE.inc()
+                    return native
+        try:
+            return self._analyze_with_blender(blend_file_path)
+        except BlendServiceError as e:
+            if native is None:
+                raise
+            _NATIVE.inc()
+            return dict(native, analysis_error=str(e))
+
+    def _analyze_with_blender(self, blend_file_path: str) -> Dict[str, Any]:
+        key = (file_sha256(blend_file_path), self.blender_version())
+        created = False
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                _CACHE_HIT.inc()
+                return dict(cached)
+            future = self._inflight.get(key)
+            if future is None:
+                _CACHE_MISS.inc()
+                future = self._inflight[key] = self._pool.submit(self._run_blender, blend_file_path)
+                created = True
+        if created:
+            # Outside the lock: the callback runs right away if the analysis already finished
+            future.add_done_callback(lambda f: self._store(key, f))
+        return dict(future.result())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "version": self._version,
+                "cached": len(self._cache),
+                "cache_size": self.cache_size,
+                "inflight": len(self._inflight),
+            }
+
+    def _store(self, key: Tuple[str, str], future: Future) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+            if future.exception() is None:
+                self._cache[key] = future.result()
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+    def _run_blender(self, blend_file_path: str) -> Dict[str, Any]:
+        fd, output_path = tempfile.mkstemp(prefix="blend-analysis-", suffix=".json")
+        os.close(fd)
+        try:
+            try:
+                with _ANALYZE_SECONDS.time():
+                    subprocess.run(
+                        [
+                            self.blender_binary,
+                            blend_file_path,
+                            "--background",
+                            "--python",
+                            SCRIPT_PATH,
+                            "--",
+                            output_path,
+                        ],
+                        env=os.environ.copy(),
+                        check=True
+                    )
+            except (OSError, subprocess.CalledProcessError) as e:
+                raise BlendServiceError(f"Blender analysis failed: {e}") from e
+
+            # created by the blender command above
+            with open(output_path, "r") as file:
+                analysis = json.load(file)
+        except ValueError as e:
+            raise BlendServiceError(f"Unreadable analysis output: {e}") from e
+        finally:
+            os.remove(output_path)
 
-    def analyze(self, blend_file_path: str) -> Dict[str, Optional[str]]:
-        blend_details = dict()
-        
-        print("according to param ->:", self.blender_binary)
-
-        python_script_path = "backend/services/extract_blend_file_properties.py"
-        print("according to env ->", os.getenv("BLENDER_PATH") )
-        
-        subprocess.run(
-        [
-            self.blender_binary,
-            blend_file_path,
-            "--background",
-            "--python",
-            python_script_path,
-        ],
-    env=os.environ.copy(),
-    check=True
-)
-
-
-        # created by blender command above
-        with open("blend_file_data.txt", "r") as file:
-            properties = file.readlines()
-
-        # Forming a dictionary where key is property name and value is property value
-        blend_file_properties = dict()
-        for property in properties:
-             property_name, property_value = property.strip().split(":")
-             blend_file_properties[property_name] = property_value
-
-
-        file.close()
-
-        # Deleting the file as its only for temporary purposes
-        os.remove("blend_file_data.txt")
-
-        blend_details["fps"] = int(blend_file_properties["fps"])
-        blend_details["renderer"] = blend_file_properties["renderer"]
-        blend_details["frame_start"] = int(blend_file_properties["frame_start"])
-        blend_details["frame_end"] = int(blend_file_properties["frame_end"])
-        return blend_details
\ No newline at end of file
+        try:
+            for key in ("fps", "frame_start", "frame_end"):
+                analysis[key] = int(analysis[key])
+            analysis["renderer"] = str(analysis["renderer"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise BlendServiceError(f"Incomplete analysis output: {e}") from e
+        return analysis
@@ -1,62 +1,121 @@
+import asyncio
+import json
 import socket
 import threading
 import time
 import platform
+from concurrent.futures import ThreadPoolExecutor
 import netifaces
-import psutil
 import os
 from pathlib import Path
 
 import requests
 from .sequencer_tcp import SequencerServer, SequencedClient
+from .resource_sampler import ResourceSampler
+from .failure_detector import PhiAccrualFailureDetector
+from .election_engine import BullyElection
+from .transport import UdpTransport
+from .event_loop import shared_loop
+from .gossip import SwimMembership
+from .membership import MembershipStore
+from . import metrics
 JOBS_DIR = "jobs"
 os.makedirs(JOBS_DIR, exist_ok=True)
 
+_BEACONS = metrics.counter("renderfarm_discovery_beacons_total", "DISCOVER beacons sent and received", ("direction",))
+_BEACONS_SENT = _BEACONS.labels("sent")
+_BEACONS_RECEIVED = _BEACONS.labels("received")
+
 class NetworkDiscoveryService:
-    def __init__(self):
+    def __init__(self, sampler=None, transport_factory=None, local_ip=None, pc_name=None,
+                 membership="broadcast", seed_peers=None, control_max_queue=1024, control_max_lag=5.0,
+                 control=None):
         self.broadcast_port = 8888
         self.file_transfer_port = 8889
+        self.beacon_interval = 3.0
         self.running = False
         self.socket = None
-        self.discovered_devices = {}
-        self.pc_name = platform.node()
-        self.local_ip = self.get_local_ip()
-        self.broadcast_thread = None
-        self.listen_thread = None
-        self.monitor_thread = None
-        
+        self.transport_factory = transport_factory or UdpTransport
+        # Datagrams, beacons and the stale check run on the control-plane loop
+        self._control = control or shared_loop()
+        self._tasks = []
+        self.members = MembershipStore()
+        self.pc_name = pc_name or platform.node()
+        self.local_ip = local_ip or self.get_local_ip()
+
+        # Membership: "broadcast" beacons every beacon_interval, or "gossip" (SWIM)
+        # seeded from static peers and a few bootstrap broadcasts
+        self.membership = membership
+        self.seed_peers = list(seed_peers or [])
+        self.bootstrap_beacons = 3
+        self.gossip = SwimMembership(
+            local_ip=self.local_ip,
+            send=self._send_datagram,
+            self_info=lambda: {"name": self.pc_name, "score": self.current_score, "role": self.my_role},
+            on_alive=self._on_gossip_alive,
+            on_dead=self._on_gossip_dead,
+        )
+
         # File transfer server
         self.file_server_thread = None
         self.file_server_socket = None
         
+        # Smoothed resource samples (shared with /my_device)
+        self.sampler = sampler or ResourceSampler()
+
         # Initial score calculation
         self.current_score = 0
         self.ring_topology = []
+        self._topology_frozen = False
+        self.members.subscribe(self._on_membership_change)
         self.blend_operation_cancelled = False
         
-        # LCR / Election State
+        # Election State
         self.ring_successor = "Undefined"
         self.current_leader = None
         self.election_active = False
         self.election_results = None
         self.participant = False
         self.my_role = "Undefined"
+        self._status_subscribers = []
+        self.election = BullyElection(
+            local_ip=self.local_ip,
+            send=self._send_datagram,
+            members=self._election_members,
+            on_leader=self._on_election_complete,
+            on_start=self._on_election_start,
+        )
         
         # Sequencer-based control channel (reliable ordered control messages)
         self.control_port = 8890
+        self.control_max_queue = control_max_queue
+        self.control_max_lag = control_max_lag
         self._sequencer_server = None
         self._sequenced_client = None
         self._control_manager_thread = None
         self._control_manager_running = False
+        self._control_wakeup = threading.Event()
         self._last_known_leader_for_control = None
 
-        # Ordered commit tracking (JOB_COMMIT arrives via Sequencer before/after files)
-        self._pending_job_commits = set()
+        # Ordered commit tracking (JOB_COMMIT arrives via Sequencer before/after files):
+        # job_id -> (epoch, seq) of the commit, acked as "applied" once the files are in
+        self._pending_job_commits = {}
         self._pending_job_lock = threading.Lock()
         
         self._last_score_update_ts = 0
         self._score_update_interval = 10  
 
+        # Failure detection (phi-accrual over beacon arrivals + concurrent HTTP confirmation)
+        self.failure_detector = PhiAccrualFailureDetector(expected_interval=self.beacon_interval)
+        self._stale_check_interval = 1.0
+        self._probe_timeout = 1.5
+        self._probe_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="probe")
+
+    @property
+    def discovered_devices(self):
+        """Read-only ip -> device mapping of the current membership version."""
+        return self.members.snapshot().devices
+
     def get_local_ip(self):
         try:
             with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
@@ -66,49 +125,34 @@ class NetworkDiscoveryService:
             return "127.0.0.1"
 
     def get_resource_score(self):
-        """Calculates Composite ID component: Resource_Score"""
+        """Calculates Composite ID component: Resource_Score (from the smoothed sampler snapshot)"""
         try:
-            ram = psutil.virtual_memory()
-            cpu_usage = psutil.cpu_percent(interval=0.1)
-            disk = psutil.disk_usage('/')
-            
-            disk_score = disk.free / (1024**3) * 50  # GB * 50
-            ram_score = ram.available / (1024**3) * 30  # GB * 30
-            cpu_score = (100 - cpu_usage) * 30
-            
-            return int(ram_score + cpu_score + disk_score)
+            return self.sampler.resource_score()
         except:
             return 10
 
     def get_broadcast_addresses(self):
         """Get all broadcast addresses for network interfaces"""
-        broadcast_addresses = ['255.255.255.255']
-        try:
-            for interface in netifaces.interfaces():
-                addrs = netifaces.ifaddresses(interface)
-                if netifaces.AF_INET in addrs:
-                    for link in addrs[netifaces.AF_INET]:
-                        if 'broadcast' in link:
-                            broadcast_addresses.append(link['broadcast'])
-        except:
-            pass
-        return broadcast_addresses
+        return UdpTransport.get_broadcast_addresses()
+
+    def broadcast(self, msg):
+        """Send a datagram to every node: subnet broadcast, or unicast to every member in gossip mode."""
+        if self.membership == "gossip":
+            for ip in list(self.discovered_devices.keys()):
+                if ip != self.local_ip:
+                    self.socket.sendto(msg.encode(), (ip, self.broadcast_port))
+        else:
+            self.socket.broadcast(msg.encode())
 
     def start(self):
         if self.running:
             return True, "Already running"
         
         try:
-            # UDP broadcast socket
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            
-            if platform.system() == 'Darwin':
-                self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
-            
-            self.socket.bind(('', self.broadcast_port))
+            # UDP broadcast socket (or any datagram transport with the same interface)
+            self.socket = self.transport_factory(self.broadcast_port).open(self.handle_datagram, self._control)
             self.running = True
+            self.sampler.start()
             self._start_control_manager()
 
             
@@ -116,15 +160,17 @@ class NetworkDiscoveryService:
             self.current_score = self.get_resource_score()
             self.add_device(self.pc_name, self.local_ip, self.current_score, role="Undefined")
             
-            # Start threads
-            self.broadcast_thread = threading.Thread(target=self.broadcast_loop, daemon=True)
-            self.listen_thread = threading.Thread(target=self.listen_loop, daemon=True)
-            self.monitor_thread = threading.Thread(target=self.check_stale_devices, daemon=True)
-            
-            self.broadcast_thread.start()
-            self.listen_thread.start()
-            self.monitor_thread.start()
-            
+            # Beacons and the stale check are timers on the loop; datagrams arrive there too
+            self._tasks = [self._control.submit(self.broadcast_loop())]
+
+            if self.membership == "gossip":
+                # SWIM does its own failure detection
+                self.gossip.start()
+                self.gossip.seed(self.seed_peers)
+            else:
+                self._tasks.append(self._control.submit(self.check_stale_devices()))
+
+            self._publish_status()
             return True, "Discovery Service Started"
         except Exception as e:
             return False, str(e)
@@ -132,6 +178,9 @@ class NetworkDiscoveryService:
     def stop(self):
         """Stops all services and clears all internal state data."""
         self.running = False
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
 
         # Stop sequencer control channel (TCP ordering) cleanly
         try:
@@ -154,7 +203,11 @@ class NetworkDiscoveryService:
                 pass
             self.file_server_socket = None
 
+        self.gossip.stop()
+
         # 2. Reset Election & Role State
+        self.election.reset()
+        self._topology_frozen = False
         self.election_active = False
         self.current_leader = None
         self.my_role = "Undefined"
@@ -163,116 +216,116 @@ class NetworkDiscoveryService:
         self.election_results = None
         
         # 3. Clear Discovered Data
-        self.discovered_devices = {}
+        self.members.clear()
         self.ring_topology = []
         
+        self._publish_status()
         print(f"[{self.local_ip}] Discovery Service stopped and state cleared.")
 
-    def broadcast_loop(self):
-        """Broadcasts UDP Beacons every 3 seconds"""
+    async def broadcast_loop(self):
+        """Broadcasts UDP Beacons every `beacon_interval` seconds (3 by default)"""
+        beacons_sent = 0
         while self.running:
             try:
                 self.update_resource_score_during_election()
                 
-                msg = f"DISCOVER:{self.pc_name}:{self.local_ip}:{self.current_score}:{self.my_role}"
-                for addr in self.get_broadcast_addresses():
-                    if addr.startswith('255') or addr.startswith('127'):
-                        continue
-                    try:
-                        self.socket.sendto(msg.encode(), (addr, self.broadcast_port))
-                    except:
-                        pass
+                # In gossip mode beacons only bootstrap membership; SWIM takes over once we have peers
+                if self.membership != "gossip" or beacons_sent < self.bootstrap_beacons or len(self.discovered_devices) <= 1:
+                    msg = f"DISCOVER:{self.pc_name}:{self.local_ip}:{self.current_score}:{self.my_role}"
+                    self.socket.broadcast(msg.encode())
+                    beacons_sent += 1
+                    _BEACONS_SENT.inc()
                 
                 # print(f"SENDER => detected {self.pc_name} : {self.local_ip}")
-                time.sleep(3)
-            except:
-                time.sleep(3)
+            except Exception:
+                pass
+            await asyncio.sleep(self.beacon_interval)
 
-    def listen_loop(self):
-        while self.running:
-            try:
-                data, addr = self.socket.recvfrom(4096)
-                msg = data.decode()
-                # print("incoming packet:", msg)
-                
-                if msg.startswith("DISCOVER:"):
-                    parts = msg.split(":")
-                    if len(parts) >= 4:
-                        name = parts[1]
-                        ip = parts[2]
-                        score = int(parts[3])
-                        role = parts[4] if len(parts) >= 5 else "Undefined"
-                        # print(f"LISTENER => detected {name} : {ip}")
+    def handle_datagram(self, data, addr):
+        """One datagram from the discovery port, on the loop thread: nothing here may block."""
+        if not self.running:
+            return
+        try:
+            msg = data.decode()
+            # print("incoming packet:", msg)
+
+            if msg.startswith("DISCOVER:"):
+                _BEACONS_RECEIVED.inc()
+                parts = msg.split(":")
+                if len(parts) >= 4:
+                    name = parts[1]
+                    ip = parts[2]
+                    score = int(parts[3])
+                    role = parts[4] if len(parts) >= 5 else "Undefined"
+                    # print(f"LISTENER => detected {name} : {ip}")
+                    if self.membership == "gossip":
+                        # Join through the beacon's sender; membership then arrives via SWIM
+                        self.gossip.seed([ip], from_beacon=True)
+                    else:
                         self.add_device(name, ip, score, role=role)
-                
-                elif msg.startswith("ELECTION_INIT:"):
-                    print("Election initiation message received .")
-                    print(msg)
-                    parts = msg.split(":")
-                    if len(parts) >= 3:
-                        initiator_ip = parts[1]
-                        
-                        self.participant = False
-                        self.election_active = True
-                        self.current_leader = None
-                        self._control_manager_kick()
-                
-                elif msg.startswith("LCR_TOKEN:"):
-                    print("LCR token message received.")
-                    print(msg)
-                    parts = msg.split(":")
-                    if len(parts) >= 4:
-                        mid_score = int(parts[1])
-                        mid_ip = parts[2]
-                        is_leader = parts[3] == "True"
-                        self.handle_lcr_token(mid_score, mid_ip, is_leader)
-                
-                elif msg.startswith("POP_STALE_LEADER:"):
-                    print("Removing Stale Leader.")
-                    parts = msg.split(":")
-                    if len(parts) >= 2:
-                        stale_ip = parts[1]
-                        if stale_ip in self.discovered_devices:
-                            del self.discovered_devices[stale_ip]
-                            print(f"[{self.local_ip}] Removed stale leader: {stale_ip}")
-                            print("Current discovered devices:", self.get_devices())
-                            self.calculate_ring_topology()
-                            print("Updated ring topology:", self.ring_topology)
-
-                            jobs_path = Path(JOBS_DIR)
-                            if not jobs_path.exists():
-                                return
-
-                            for job_folder in jobs_path.iterdir():
-                                if not job_folder.is_dir():
-                                    continue
-
-                                metadata_file = job_folder / "metadata.json"
-                                if not metadata_file.exists():
-                                    continue
-                                
-                                import json
-
-                                try:
-                                    with open(metadata_file) as f:
-                                        metadata = json.load(f)
-
-                                    if metadata.get("status") == "in_progress":
-                                        metadata['status'] = 'canceled'
-
-                                        with open(metadata_file, "w", encoding="utf-8") as f:
-                                            json.dump(metadata, f, indent=2) 
-                                except Exception as e:
-                                    print(f"Error handling leader down for {job_folder.name}: {e}")
 
-                
-                elif msg.startswith("CLIENT_DISCONNECTED"):
-                    print("Client Disconnected received.")
-                    continue
-                    
-            except:
+            elif msg.startswith(SwimMembership.PREFIX):
+                self.gossip.handle(msg, addr[0])
+
+            elif msg.startswith("ELECTION_INIT:"):
+                print("Election initiation message received .")
+                print(msg)
+                parts = msg.split(":")
+                if len(parts) >= 4:
+                    initiator_ip = parts[1]
+                    epoch = int(parts[3])
+                    if initiator_ip != self.local_ip:
+                        self.election.observe(epoch)
+
+            elif msg.startswith(BullyElection.PREFIX):
+                self.election.handle(msg)
+
+            elif msg.startswith("POP_STALE_LEADER:"):
+                print("Removing Stale Leader.")
+                parts = msg.split(":")
+                if len(parts) >= 2:
+                    stale_ip = parts[1]
+                    if self.members.remove(stale_ip) is not None:
+                        print(f"[{self.local_ip}] Removed stale leader: {stale_ip}")
+                        print("Current discovered devices:", self.get_devices())
+                        self.calculate_ring_topology()
+                        print("Updated ring topology:", self.ring_topology)
+                        # Job files are rewritten off the loop
+                        self._control.loop.run_in_executor(None, self._pause_jobs_led_by, stale_ip)
+
+            elif msg.startswith("CLIENT_DISCONNECTED"):
+                print("Client Disconnected received.")
+
+        except Exception:
+            pass
+
+    def _pause_jobs_led_by(self, stale_ip):
+        jobs_path = Path(JOBS_DIR)
+        if not jobs_path.exists():
+            return
+
+        for job_folder in jobs_path.iterdir():
+            if not job_folder.is_dir():
                 continue
-    
+
+            metadata_file = job_folder / "metadata.json"
+            if not metadata_file.exists():
+                continue
+
+            try:
+                with open(metadata_file) as f:
+                    metadata = json.load(f)
+
+                # Paused, not canceled: a new leader can resume the
+                # job with the frames this node kept (JOB_RESUME)
+                if metadata.get("status") in ("in_progress", "completed") and metadata.get("leader_ip") == stale_ip:
+                    metadata['status'] = 'awaiting_leader'
+
+                    with open(metadata_file, "w", encoding="utf-8") as f:
+                        json.dump(metadata, f, indent=2)
+            except Exception as e:
+                print(f"Error handling leader down for {job_folder.name}: {e}")
+
     def update_resource_score_during_election(self):
         now = time.time()
 
@@ -284,94 +337,134 @@ class NetworkDiscoveryService:
             self._last_score_update_ts = now
 
     def add_device(self, name, ip, score, role="Undefined"):
-        if ip in self.discovered_devices:
-            self.discovered_devices[ip]["last_seen"] = int(time.time())
-            self.discovered_devices[ip]["my_role"] = role
-            if not self.election_active:
-                self.discovered_devices[ip]["resource_score"] = score
+        if ip != self.local_ip:
+            self.failure_detector.heartbeat(ip)
+        # Scores are frozen while an election is running
+        self.members.upsert(ip, name, score, role, update_score=not self.election_active)
+
+    def _on_gossip_alive(self, member):
+        self.add_device(member["name"], member["ip"], member["score"], role=member["role"])
+
+    def _on_gossip_dead(self, ip):
+        if ip not in self.discovered_devices:
+            return
+        if self._control.in_loop():
+            # A DEAD update read from the socket: removal may notify the leader
+            # or start an election over HTTP, which must not block the loop
+            asyncio.get_running_loop().run_in_executor(None, self.remove_dead_devices, [ip])
         else:
-            self.discovered_devices[ip] = {
-                "name": name,
-                "ip": ip,
-                "resource_score": score,
-                "last_seen": int(time.time()),
-                "my_role": role
-            }
+            self.remove_dead_devices([ip])
 
     def get_devices(self):
-        return list(self.discovered_devices.values())
+        return self.members.devices()
     
-    def check_stale_devices(self):
+    async def check_stale_devices(self):
+        loop = asyncio.get_running_loop()
         while self.running:
             try:
-                current_time = int(time.time())
-                stale_devices = []
-                leader_went_down = False
-                down_leader_ip = None
-
-                for ip, device in list(self.discovered_devices.items()):
-                    if ip == self.local_ip:
-                        continue
-
-                    last_seen = device.get('last_seen', 0)
-                    if current_time - last_seen > 10:
-                        stale_devices.append(ip)
-                        print(f"[{self.local_ip}] Device {device['name']} ({ip}) is stale")
-
-                for stale_ip in stale_devices:
-                    try:
-                        resp = requests.get(f"http://{stale_ip}:5050/api/status", timeout=5)
-
-                        if resp.status_code == 200:
-                            print(f"[{self.local_ip}] Stale device {stale_ip} is actually alive. Keeping it.")
-                            continue
-                        else:
-                            stale_ip_role = self.discovered_devices[stale_ip].get("my_role")
-                            del self.discovered_devices[stale_ip]
-                            print(f"[{self.local_ip}] Removed stale device: {stale_ip}")
-
-                            # Recalculating ring topology
-                            self.calculate_ring_topology()
-                            if stale_ip == self.current_leader:
-                                leader_went_down = True
-                                down_leader_ip = stale_ip
-                            else:
-                                if (self.current_leader):
-                                    requests.post(f"http://{self.current_leader}:5050/api/election/notify_node_disconnection", json={"ip": stale_ip, "my_role" : stale_ip_role})
-                    except (requests.Timeout, requests.RequestException):
-                        print(f"[{self.local_ip}] Removed stale device: {stale_ip}")
-                        stale_ip_role = self.discovered_devices[stale_ip].get("my_role")
-                        del self.discovered_devices[stale_ip]
-
-                        # Recalculating ring topology
-                        self.calculate_ring_topology()
-                        
-                        if stale_ip == self.current_leader:
-                            leader_went_down = True
-                            down_leader_ip = stale_ip
-                        else:
-                            if (self.current_leader):
-                                requests.post(f"http://{self.current_leader}:5050/api/election/notify_node_disconnection", json={"ip": stale_ip, "my_role" : stale_ip_role})
-
-                # Recalculate topology ONCE
-                if stale_devices:
-                    self.calculate_ring_topology()
-
-                # Handle leader-down logic OUTSIDE loop
-                if leader_went_down:
-                    self.my_role = "Undefined"
-                    self.handle_leader_down(down_leader_ip)
+                peers = [ip for ip in list(self.discovered_devices.keys()) if ip != self.local_ip]
+                self.failure_detector.retain(peers)
+
+                suspects = self.failure_detector.suspects(peers)
+                for ip in suspects:
+                    device = self.discovered_devices.get(ip, {})
+                    print(f"[{self.local_ip}] Device {device.get('name')} ({ip}) is suspected "
+                          f"(phi={self.failure_detector.phi(ip):.1f})")
+
+                dead = await self.confirm_dead(suspects)
+                if dead:
+                    # Notifies the leader and may start an election: off the loop
+                    await loop.run_in_executor(None, self.remove_dead_devices, dead)
 
             except Exception as e:
                 print(f"[{self.local_ip}] Error in stale device check: {e}")
 
-            time.sleep(2)
+            await asyncio.sleep(self._stale_check_interval)
+
+    def probe_device(self, ip):
+        """HTTP liveness probe used to confirm a suspicion. Returns True if the node answered."""
+        try:
+            resp = requests.get(f"http://{ip}:5050/api/status", timeout=self._probe_timeout)
+            return resp.status_code == 200
+        except requests.RequestException:
+            return False
+
+    async def confirm_dead(self, suspects):
+        """Probe all suspects concurrently on the probe pool; return the ones that did not answer."""
+        if not suspects:
+            return []
+
+        loop = asyncio.get_running_loop()
+        futures = {loop.run_in_executor(self._probe_pool, self.probe_device, ip): ip for ip in suspects}
+        done, _pending = await asyncio.wait(futures, timeout=self._probe_timeout + 0.5)
+
+        dead = []
+        for future, ip in futures.items():
+            if future in done and not future.exception() and future.result():
+                print(f"[{self.local_ip}] Stale device {ip} is actually alive. Keeping it.")
+                self.failure_detector.alive(ip)
+            else:
+                dead.append(ip)
+        return dead
+
+    def remove_dead_devices(self, dead):
+        """Remove all confirmed-dead nodes, recompute the ring once, then react."""
+        removed = []
+        for ip in dead:
+            device = self.members.remove(ip)
+            self.failure_detector.confirm_failure(ip)
+            if device is not None:
+                removed.append((ip, device.get("my_role")))
+                print(f"[{self.local_ip}] Removed stale device: {ip}")
+
+        if not removed:
+            return
+
+        # Recalculate topology ONCE for the whole batch
+        self.calculate_ring_topology()
+
+        leader_ip = self.current_leader
+        down_leader_ip = None
+        for ip, role in removed:
+            if ip == leader_ip:
+                down_leader_ip = ip
+            elif leader_ip:
+                self._probe_pool.submit(self._notify_leader_of_disconnection, leader_ip, ip, role)
+
+        # Handle leader-down logic OUTSIDE loop
+        if down_leader_ip:
+            self.my_role = "Undefined"
+            self._publish_status()
+            self.handle_leader_down(down_leader_ip)
+
+    def _notify_leader_of_disconnection(self, leader_ip, ip, role):
+        try:
+            requests.post(
+                f"http://{leader_ip}:5050/api/election/notify_node_disconnection",
+                json={"ip": ip, "my_role": role},
+                timeout=30
+            )
+        except requests.RequestException as e:
+            print(f"[{self.local_ip}] Failed to notify leader about {ip}: {e}")
+
+    def get_failure_detector_metrics(self):
+        return self.failure_detector.metrics()
+
+    def get_control_channel_status(self):
+        server = self._sequencer_server
+        return {
+            "role": "sequencer" if server else ("client" if self._sequenced_client else None),
+            "port": self.control_port,
+            "max_queue": self.control_max_queue,
+            "max_lag": self.control_max_lag,
+            "epoch": server.epoch if server else None,
+            "log_range": server.log_range() if server else None,
+            "peers": server.connected_peers() if server else [],
+            "client": self._sequenced_client.stats() if self._sequenced_client else None,
+        }
     
     def handle_leader_down(self, leader_ip):
         print("THE LEADER IS DOWN ACCORDING TO DISCOVERY SERVICE")
-        import json
-        import requests
-        from pathlib import Path
 
         jobs_path = Path(JOBS_DIR)
         if not jobs_path.exists():
@@ -389,7 +482,8 @@ class NetworkDiscoveryService:
                 with open(metadata_file) as f:
                     metadata = json.load(f)
 
-                if metadata.get("status") == "in_progress":
+                # A node that finished its share still holds frames for the job
+                if metadata.get("status") in ("in_progress", "completed") and metadata.get("leader_ip") == leader_ip:
                     job_id = job_folder.name
                     response = requests.post(
                         f"http://{self.local_ip}:5050/api/leader_is_down_flag",
@@ -404,42 +498,36 @@ class NetworkDiscoveryService:
 
     def pop_key(self, key):
         print(f"Popping device with IP: {key}")
-        if key in self.discovered_devices:
-            del self.discovered_devices[key]
+        self.members.remove(key)
     
     def pop_leader(self, key):
-        if key in self.discovered_devices:
-            del self.discovered_devices[key]
+        if self.members.remove(key) is not None:
             msg = f"POP_STALE_LEADER:{key}"
-            for addr in self.get_broadcast_addresses():
-                if addr.startswith('255') or addr.startswith('127'):
-                    continue
-                try:
-                    self.socket.sendto(msg.encode(), (addr, self.broadcast_port))
-                except:
-                    pass
+            try:
+                self.broadcast(msg)
+            except:
+                pass
             print(f"Force broadcasted removal of stale leader: {key}")
             time.sleep(3)
     
     def calculate_ring_topology(self):
         # print("Calculating ring topology with devices: ", self.discovered_devices)
-        all_nodes = sorted(self.discovered_devices.keys())
-        try:
-            my_index = all_nodes.index(self.local_ip)
-            successor_ip = all_nodes[(my_index + 1) % len(all_nodes)]
-            self.ring_successor = successor_ip
-        except ValueError:
+        if self._topology_frozen:
+            # Membership changes during an election are applied once it completes
+            return [node["ip"] for node in self.ring_topology]
+
+        snapshot = self.members.snapshot()
+        if self.local_ip in snapshot:
+            self.ring_successor = snapshot.successor(self.local_ip)
+        else:
             self.ring_successor = self.local_ip
-        
-        self.ring_topology = []
-        for idx, ip in enumerate(all_nodes):
-            self.ring_topology.append({
-                "position": idx + 1,
-                "ip": ip,
-                "name": self.discovered_devices[ip]['name'],
-                "resource_score": self.discovered_devices[ip]['resource_score']
-            })
-        return all_nodes
+
+        self.ring_topology = list(snapshot.ring_topology())
+        return list(snapshot.order)
+
+    def _on_membership_change(self, event, snapshot):
+        # Keep ring/successor current as members come and go (cached per version)
+        self.calculate_ring_topology()
 
     def finalize_job_if_committed(self, job_id):
         """Called after /worker/submit-job to apply any already-received ordered JOB_COMMIT."""
@@ -451,7 +539,8 @@ class NetworkDiscoveryService:
     def _finalize_job_commit(self, job_id):
         """If JOB_COMMIT was received for job_id and files are present, mark it committed locally."""
         with self._pending_job_lock:
-            if job_id not in self._pending_job_commits:
+            commit = self._pending_job_commits.get(job_id)
+            if commit is None:
                 return
 
         # Only finalize if metadata exists locally
@@ -461,16 +550,29 @@ class NetworkDiscoveryService:
 
         try:
             from backend.api.worker import commit_job_local
-            commit_job_local(job_id=job_id, assigned_worker_ip=self.local_ip)
+            result = commit_job_local(job_id=job_id, assigned_worker_ip=self.local_ip)
         except Exception:
             return
+        if result.get("status") != "ok":
+            return
 
         with self._pending_job_lock:
-            self._pending_job_commits.discard(job_id)
+            self._pending_job_commits.pop(job_id, None)
+
+        client = self._sequenced_client
+        if client:
+            epoch, seq = commit
+            client.ack(seq, "applied", epoch)
+
+    def control_channel_connected(self):
+        """True on a worker whose ordered control channel to the leader is up."""
+        client = self._sequenced_client
+        return client is not None and client.connected
 
     def _control_manager_kick(self):
-        # Force manager to react on next tick
+        # Leadership changed: reconcile server/client now instead of on a timer
         self._last_known_leader_for_control = None
+        self._control_wakeup.set()
 
     # ==========================================
     # SEQUENCER-BASED CONTROL CHANNEL
@@ -485,6 +587,7 @@ class NetworkDiscoveryService:
 
     def _stop_control_manager(self):
         self._control_manager_running = False
+        self._control_wakeup.set()
 
         try:
             if self._sequenced_client:
@@ -511,6 +614,7 @@ class NetworkDiscoveryService:
 
     def _control_manager_loop(self):
         while self._control_manager_running:
+            self._control_wakeup.clear()
             try:
                 leader_ip = self.current_leader
                 if leader_ip != self._last_known_leader_for_control:
@@ -523,7 +627,8 @@ class NetworkDiscoveryService:
                         self._become_worker_control(leader_ip)
             except Exception:
                 pass
-            time.sleep(1.0)
+            # Woken by _control_manager_kick; the timeout is only a safety net
+            self._control_wakeup.wait(5.0)
 
     def _become_leader_control(self):
         # Stop client if any
@@ -537,7 +642,14 @@ class NetworkDiscoveryService:
         # Start server (idempotent)
         if self._sequencer_server is None:
             try:
-                self._sequencer_server = SequencerServer(host=self.local_ip, port=self.control_port)
+                self._sequencer_server = SequencerServer(
+                    host=self.local_ip,
+                    port=self.control_port,
+                    max_queue=self.control_max_queue,
+                    max_lag=self.control_max_lag,
+                    epoch=self.election.epoch,
+                    control=self._control,
+                )
                 self._sequencer_server.start()
                 print(f"[{self.local_ip}] Sequencer TCP server started on port {self.control_port}")
             except Exception as e:
@@ -572,26 +684,35 @@ class NetworkDiscoveryService:
             self._sequenced_client = SequencedClient(
                 leader_host=leader_ip,
                 leader_port=self.control_port,
-                on_message=self._handle_control_message
+                on_message=self._handle_control_message,
+                control=self._control,
             )
             self._sequenced_client.start()
             print(f"[{self.local_ip}] Connected to Sequencer leader {leader_ip}:{self.control_port}")
 
-    def broadcast_control_message(self, msg_type, payload):
+    def broadcast_control_message(self, msg_type, payload, ack=False):
         """
         Reliable ordered broadcast (leader only).
+        With ack=True workers acknowledge delivery/application (see wait_for_control_acks).
         Returns (ok: bool, seq: int | None, message: str)
         """
         if self.current_leader != self.local_ip or self._sequencer_server is None:
             return False, None, "Not leader or sequencer not running"
         try:
-            seq = self._sequencer_server.broadcast_control(msg_type, payload or {})
+            seq = self._sequencer_server.broadcast_control(msg_type, payload or {}, ack=ack)
             print(msg_type,"assigned seq:", seq)
             return True, seq, "Sent"
         except Exception as e:
             return False, None, str(e)
 
 
+    def wait_for_control_acks(self, seq, ips, stage="applied", timeout=10.0, quorum=None):
+        """ip -> ack latency of the workers that acked `seq` at `stage` (leader only)."""
+        server = self._sequencer_server
+        if server is None or seq is None:
+            return {}
+        return server.wait_for_acks(seq, ips, stage=stage, timeout=timeout, quorum=quorum)
+
     def _handle_control_message(self, msg):
         """Worker-side dispatch for ordered control messages."""
         try:
@@ -605,7 +726,7 @@ class NetworkDiscoveryService:
                 job_id = payload.get("job_id")
                 if job_id:
                     with self._pending_job_lock:
-                        self._pending_job_commits.add(job_id)
+                        self._pending_job_commits[job_id] = (msg.get("epoch"), seq)
                     # If files already arrived, finalize immediately
                     self._finalize_job_commit(job_id)
 
@@ -631,6 +752,30 @@ class NetworkDiscoveryService:
                 from backend.api.worker import cancel_all_local
                 cancel_all_local()
 
+            elif msg_type == "JOB_REASSIGN":
+                print("JOB_REASSIGN received")
+                job_id = payload.get("job_id")
+                jobs = payload.get("jobs")
+                if job_id and isinstance(jobs, dict):
+                    from backend.api.worker import reassign_job_local
+                    reassign_job_local(job_id, int(payload.get("generation", 0)), jobs, term=int(payload.get("term", 0)))
+
+            elif msg_type == "JOB_RESUME":
+                print("JOB_RESUME received")
+                job_id = payload.get("job_id")
+                jobs = payload.get("jobs")
+                if job_id and payload.get("leader_ip") and isinstance(jobs, dict):
+                    from backend.api.worker import resume_job_local
+                    resume_job_local(job_id, payload["leader_ip"], int(payload.get("term", 0)),
+                                     int(payload.get("generation", 0)), jobs)
+
+            elif msg_type == "JOB_RELEASE":
+                print("JOB_RELEASE received")
+                job_id = payload.get("job_id")
+                if job_id:
+                    from backend.api.worker import release_job_local
+                    release_job_local(job_id)
+
             elif msg_type == "JOB_CREATED":
                 print("JOB_CREATED received")
                 pass
@@ -641,126 +786,88 @@ class NetworkDiscoveryService:
             pass
 
     def initiate_election(self):
-        # 1. RESET STATE FORCEFULLY
-        self.participant = False
-        self.current_leader = None
-        self._control_manager_kick()
-        self.election_active = True
-        self.my_role = "Worker" # Default to worker until won
-        
         print(f"[{self.local_ip}] Initiating Election...")
 
-        try:
-            msg = f"ELECTION_INIT:{self.local_ip}:{self.pc_name}"
-            #print(self.get_broadcast_addresses())
-            # 2. BROADCAST FIRST
-            for addr in self.get_broadcast_addresses():
-                # address starting with 255 is global broadcast, 127 is loopback broadcast. Ignore both
-                if addr.startswith('255') or addr.startswith('127'):
-                    continue
-                try:
-                    self.socket.sendto(msg.encode(), (addr, self.broadcast_port))
-                except:
-                    pass
-            
-            # 3. RUN SIMULATION ONCE (Outside Loop)
-            # Add a tiny delay to allow other nodes to receive the INIT message 
-            # and reset their state before we send the first token.
-            time.sleep(0.5) 
-            self.run_election_simulation()
-                
-        except Exception as e:
-            print(f"Error broadcasting election initiation: {e}")
-
-    def run_election_simulation(self):
-        print("=" * 60)
-        print("LEADER ELECTION SIMULATION HAS BEEN INITIATED")
-        print("=" * 60)
-        
-        ring_order_ips = self.calculate_ring_topology()
-        print(f"[{self.local_ip}] Ring Order IPs: {ring_order_ips}")
-        
-        if len(ring_order_ips) == 0:
-            return None
-        
-        successor_index = (ring_order_ips.index(self.local_ip) + 1) % len(ring_order_ips)
-        self.ring_successor = ring_order_ips[successor_index]
-        print(f"[{self.local_ip}] Successor IP: {self.ring_successor}")
-
-        if self.ring_successor == self.local_ip:
-            print(f"[{self.local_ip}] Only node in ring. declaring self leader.")
-            self.current_leader = self.local_ip
-            self._control_manager_kick()
-            self.my_role = "Leader"
-            self.election_active = False
-            # self.broadcast_election_result(self.local_ip, self.pc_name)
-            return
-              
-        if not self.participant:
-            self.participant = True
-            self.send_lcr_token(self.current_score, self.local_ip, is_leader=False)
-        
+        # 1. RESET STATE FORCEFULLY (via _on_election_start)
+        epoch = self.election.start()
         self.election_results = {
             "initiator_ip": self.local_ip,
-            "ring_topology": ring_order_ips,
+            "epoch": epoch,
+            "ring_topology": [ip for _score, ip in self.election.snapshot()],
             "successor": self.ring_successor
         }
-        return self.election_results
 
-    def send_lcr_token(self, mid_score, mid_ip, is_leader):
-        if self.ring_successor == "Undefined":
-            ring_order_ips = self.calculate_ring_topology()
-            successor_index = (ring_order_ips.index(self.local_ip) + 1) % len(ring_order_ips)
-            self.ring_successor = ring_order_ips[successor_index]
         try:
-            msg = f"LCR_TOKEN:{mid_score}:{mid_ip}:{is_leader}"
-            # Send 3 times to ensure delivery (UDP redundancy)
-            for _ in range(1):
-                print("Sending LCR token to " + self.ring_successor)
-                self.socket.sendto(msg.encode(), (self.ring_successor, self.broadcast_port))
-                time.sleep(0.05) # Tiny gap between bursts
+            # 2. Let every node freeze its scores/topology for this epoch
+            msg = f"ELECTION_INIT:{self.local_ip}:{self.pc_name}:{epoch}"
+            self.broadcast(msg)
         except Exception as e:
-            print(f"[{self.local_ip}] Error sending LCR token: {e}")
+            print(f"Error broadcasting election initiation: {e}")
 
-    def handle_lcr_token(self, mid_score, mid_ip, is_leader):
-        mid_uid = (mid_score, mid_ip)
-        my_uid = (self.current_score, self.local_ip)
-        
-        print("Ring Topology " , self.ring_topology)
-        print("LCR Received UUID ", mid_uid, ". My UUID ", my_uid)
-        if is_leader:
-            self.current_leader = mid_ip
-            self._control_manager_kick()
-            self.my_role = "Leader" if mid_ip == self.local_ip else "Worker"
-            self.participant = False
-            print(f"[{self.local_ip}] I have recognized the leader: {mid_ip}")
-            if self.ring_successor != self.local_ip and self.my_role != "Leader":
-                self.send_lcr_token(mid_score, mid_ip, is_leader=True)
-            elif self.my_role == "Leader":
-                print(f"[{self.local_ip}] Election complete. Ending election process.")
-            else:
-                print(f"[{self.local_ip}] Invalid Condition BEEEEP!.")
-            
-            self.election_active = False
-            # device_name = self.discovered_devices.get(mid_ip, {}).get('name', 'Unknown')
-            # self.broadcast_election_result(mid_ip, device_name)
-
-        elif mid_ip == self.local_ip:
-            self.current_leader = self.local_ip
-            self._control_manager_kick()
-            self.my_role = "Leader"
-            print(f"[{self.local_ip}] I have won the election and am the Leader.")
-            self.participant = False
-            self.send_lcr_token(self.current_score, self.local_ip, is_leader=True)
-
-        elif mid_uid < my_uid and not self.participant:
-            self.participant = True
-            self.send_lcr_token(self.current_score, self.local_ip, is_leader=False)
-            
-        elif mid_uid > my_uid:
-            self.participant = True
-            self.send_lcr_token(mid_score, mid_ip, is_leader=False)
-            
+        return epoch
+
+    def wait_for_election(self, timeout=None):
+        """Block until the running election completes. Returns the leader IP (None on timeout)."""
+        return self.election.wait(timeout)
+
+    def _on_election_start(self, epoch):
+        self.calculate_ring_topology()
+        self._topology_frozen = True
+        self.participant = True
+        self.current_leader = None
+        self.my_role = "Worker" # Default to worker until won
+        self._control_manager_kick()
+        self.election_active = True
+        self._publish_status()
+
+    def _election_members(self):
+        # Other nodes' scores are as last beaconed and only order the probes;
+        # the election compares the scores nodes ship in their own messages
+        members = []
+        for ip, device in list(self.discovered_devices.items()):
+            score = self.current_score if ip == self.local_ip else device.get("resource_score", 0)
+            members.append((score, ip))
+        if not any(ip == self.local_ip for _score, ip in members):
+            members.append((self.current_score, self.local_ip))
+        return members
+
+    def _send_datagram(self, ip, msg):
+        self.socket.sendto(msg.encode(), (ip, self.broadcast_port))
+
+    def _on_election_complete(self, leader_ip, epoch):
+        self.current_leader = leader_ip
+        self.my_role = "Leader" if leader_ip == self.local_ip else "Worker"
+        self.participant = False
+        self._topology_frozen = False
+        self.election_active = False
+        self._control_manager_kick()
+        self.calculate_ring_topology()
+        self._publish_status()
+        print(f"[{self.local_ip}] Election {epoch} complete. Leader: {leader_ip}")
+
+    def role_status(self):
+        """The small part of the election status that changes with roles (pushed on /api/events)."""
+        return {
+            "running": self.running,
+            "election_active": self.election_active,
+            "current_leader": self.current_leader,
+            "my_role": self.my_role,
+            "my_ip": self.local_ip,
+            "epoch": self.election.epoch,
+            "leader_consensus": self.verify_leader_consensus(),
+        }
+
+    def subscribe_status(self, callback):
+        """callback(role_status) after every start/stop, election start/end and leader loss."""
+        self._status_subscribers.append(callback)
+
+    def _publish_status(self):
+        status = self.role_status()
+        for callback in list(self._status_subscribers):
+            try:
+                callback(status)
+            except Exception as e:
+                print(f"[{self.local_ip}] status subscriber failed: {e}")
 
     def get_election_status(self):
         leader_consensus = self.verify_leader_consensus()
@@ -780,6 +887,8 @@ class NetworkDiscoveryService:
             "ring_successor": self.ring_successor,
             "leader_consensus": leader_consensus,
             "election_results": self.election_results,
+            "election_stats": self.election.stats(),
+            "membership_version": self.members.version,
             "ring_topology": topology_with_status
         }
 
@@ -799,10 +908,7 @@ class NetworkDiscoveryService:
     def send_client_disconnection(self):
         msg = f"CLIENT_DISCONNECTED"
         try:
-            for addr in self.get_broadcast_addresses():
-                if addr.startswith('255') or addr.startswith('127'):
-                    continue
-                self.socket.sendto(msg.encode(), (addr, self.broadcast_port))
+            self.broadcast(msg)
             print(f"[{self.local_ip}] Broadcasted client disconnection message.")
         except Exception as e:
             print(f"[{self.local_ip}] Error broadcasting client disconnection: {e}")
@@ -0,0 +1,343 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from backend.services import metrics
+
+_KINDS = ("BULLY_ELECTION", "BULLY_OK", "BULLY_COORDINATOR", "BULLY_COORDINATOR_ACK")
+_MESSAGES = metrics.counter("renderfarm_election_messages_total", "Election datagrams by direction and type", ("direction", "type"))
+_SENT = {kind: _MESSAGES.labels("sent", kind) for kind in _KINDS}
+_RECEIVED = {kind: _MESSAGES.labels("received", kind) for kind in _KINDS}
+
+
+class BullyElection:
+    """
+    Bully-style leader election over unreliable datagrams:
+    - the highest (score, ip) UID wins. Each node freezes its own score in
+      the snapshot when the election starts and ships it in ELECTION and
+      COORDINATOR, and two nodes are only ever compared on those shipped
+      scores, so both sides agree on who outranks whom. The beacon-fed
+      scores of other members only order the probes
+    - a node probes higher nodes one at a time, highest first, instead of
+      flooding all of them; the first one that answers OK takes over
+    - the winner announces COORDINATOR to every member and retransmits to
+      members that have not acknowledged it
+    - every request is retransmitted `retries` times, `answer_timeout` apart
+    - two COORDINATORs for the same epoch: the higher UID stands, whatever
+      the order they arrive in
+
+    With no failures an election costs O(n) messages: ELECTION + OK to the
+    top node, then n-1 COORDINATOR + n-1 ACK. Every dead higher node adds
+    one retransmission burst.
+
+    Wire format (":"-separated, like the discovery beacons):
+        BULLY_ELECTION:<epoch>:<sender_ip>:<sender_score>
+        BULLY_OK:<epoch>:<sender_ip>
+        BULLY_COORDINATOR:<epoch>:<leader_ip>:<leader_score>
+        BULLY_COORDINATOR_ACK:<epoch>:<sender_ip>
+    """
+
+    PREFIX = "BULLY_"
+
+    def __init__(
+        self,
+        local_ip: str,
+        send: Callable[[str, str], None],
+        members: Callable[[], List[Tuple[int, str]]],
+        on_leader: Callable[[str, int], None],
+        on_start: Optional[Callable[[int], None]] = None,
+        answer_timeout: float = 0.5,
+        coordinator_timeout: float = 3.0,
+        retries: int = 3,
+    ):
+        self.local_ip = local_ip
+        self._send = send
+        self._members = members
+        self._on_leader = on_leader
+        self._on_start = on_start
+
+        self.answer_timeout = answer_timeout
+        self.coordinator_timeout = coordinator_timeout
+        self.retries = retries
+
+        self._lock = threading.RLock()
+        self._epoch = 0
+        self._active = False
+        self._running_epoch: Optional[int] = None
+        self._leader: Optional[str] = None
+        self._leader_uid: Optional[Tuple[int, str]] = None
+        self._snapshot: List[Tuple[int, str]] = []
+        self._done = threading.Event()
+        self._done.set()
+
+        self._ok_events: Dict[Tuple[int, str], threading.Event] = {}
+        self._coordinator_acks: Set[str] = set()
+
+        self._started_at: Optional[float] = None
+        self._last_duration: Optional[float] = None
+        self._messages_sent: Dict[str, int] = {}
+        self._rounds = 0
+
+    # ------------------------------------------
+    # Public API
+    # ------------------------------------------
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    @property
+    def leader(self) -> Optional[str]:
+        return self._leader
+
+    def snapshot(self) -> List[Tuple[int, str]]:
+        """Membership frozen at the start of the current/last election."""
+        return list(self._snapshot)
+
+    def start(self) -> int:
+        """Start a new election round from this node. Returns the election epoch."""
+        with self._lock:
+            epoch = self._epoch + 1
+            self._begin(epoch)
+            self._spawn_round(epoch)
+        return epoch
+
+    def observe(self, epoch: int) -> None:
+        """Another node announced an election: freeze state and watch for a result."""
+        with self._lock:
+            if epoch <= self._epoch:
+                return
+            self._begin(epoch)
+        threading.Thread(target=self._watch, args=(epoch,), daemon=True).start()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Block until the running election completes. Returns the leader (or None on timeout)."""
+        if not self._done.wait(timeout):
+            return None
+        return self._leader
+
+    def reset(self) -> None:
+        with self._lock:
+            self._active = False
+            self._running_epoch = None
+            self._leader = None
+            self._leader_uid = None
+            self._ok_events.clear()
+            self._done.set()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "epoch": self._epoch,
+                "active": self._active,
+                "rounds": self._rounds,
+                "last_duration": self._last_duration,
+                "messages_sent": dict(self._messages_sent),
+                "snapshot_size": len(self._snapshot),
+            }
+
+    def handle(self, msg: str) -> bool:
+        """Process an incoming election datagram. Returns False if it was not one."""
+        if not msg.startswith(self.PREFIX):
+            return False
+
+        parts = msg.split(":")
+        kind = parts[0]
+        try:
+            epoch = int(parts[1])
+            sender = parts[2]
+        except (IndexError, ValueError):
+            return True
+        if kind in _RECEIVED:
+            _RECEIVED[kind].inc()
+
+        if kind == "BULLY_ELECTION":
+            self._on_election(epoch, self._uid(sender, parts))
+        elif kind == "BULLY_OK":
+            with self._lock:
+                event = self._ok_events.get((epoch, sender))
+            if event:
+                event.set()
+        elif kind == "BULLY_COORDINATOR":
+            self._on_coordinator(epoch, self._uid(sender, parts))
+        elif kind == "BULLY_COORDINATOR_ACK":
+            with self._lock:
+                if epoch == self._epoch:
+                    self._coordinator_acks.add(sender)
+        return True
+
+    # ------------------------------------------
+    # Message handlers
+    # ------------------------------------------
+
+    def _on_election(self, epoch: int, sender_uid: Tuple[int, str]) -> None:
+        sender = sender_uid[1]
+        with self._lock:
+            started = epoch > self._epoch
+            if started:
+                self._begin(epoch)
+            outranks = self._my_uid() > sender_uid
+            if outranks:
+                self._transmit(sender, f"BULLY_OK:{epoch}:{self.local_ip}")
+
+            if epoch < self._epoch or not self._active:
+                # Stale or already decided: repeat the result so the sender can finish
+                if self._leader == self.local_ip:
+                    self._transmit(sender, self._coordinator_msg())
+                return
+
+            if not outranks:
+                # The sender outranks this node and finishes the round itself
+                if started:
+                    threading.Thread(target=self._watch, args=(epoch,), daemon=True).start()
+                return
+            if self._running_epoch == epoch:
+                return
+            self._spawn_round(epoch)
+
+    def _on_coordinator(self, epoch: int, leader_uid: Tuple[int, str]) -> None:
+        leader = leader_uid[1]
+        self._transmit(leader, f"BULLY_COORDINATOR_ACK:{epoch}:{self.local_ip}")
+
+        with self._lock:
+            if epoch < self._epoch:
+                return
+            if epoch == self._epoch:
+                if not self._active and self._leader == leader:
+                    return
+                # A lower node that did not know about this one: this round announces a higher leader
+                if self._active and self._running_epoch == epoch and self._my_uid() > leader_uid:
+                    return
+                if not self._active and self._leader_uid is not None and self._leader_uid > leader_uid:
+                    # Two winners in one epoch: the higher one stands
+                    if self._leader == self.local_ip:
+                        self._transmit(leader, self._coordinator_msg())
+                    return
+            self._epoch = epoch
+            self._finish(leader_uid)
+
+        self._on_leader(leader, epoch)
+
+    # ------------------------------------------
+    # Rounds
+    # ------------------------------------------
+
+    def _begin(self, epoch: int) -> None:
+        # lock held
+        if self._on_start:
+            self._on_start(epoch)
+        self._epoch = epoch
+        self._active = True
+        self._leader = None
+        self._leader_uid = None
+        self._running_epoch = None
+        self._ok_events.clear()
+        self._coordinator_acks = set()
+        self._snapshot = sorted(self._members())
+        self._started_at = time.monotonic()
+        self._done.clear()
+
+    def _finish(self, leader_uid: Tuple[int, str]) -> None:
+        # lock held
+        self._leader_uid = leader_uid
+        self._leader = leader_uid[1]
+        self._active = False
+        self._running_epoch = None
+        if self._started_at is not None:
+            self._last_duration = time.monotonic() - self._started_at
+        self._done.set()
+
+    def _spawn_round(self, epoch: int) -> None:
+        # lock held
+        self._running_epoch = epoch
+        self._rounds += 1
+        threading.Thread(target=self._run, args=(epoch,), daemon=True).start()
+
+    def _superseded(self, epoch: int) -> bool:
+        return self._epoch != epoch or not self._active
+
+    def _watch(self, epoch: int) -> None:
+        # If the initiator dies mid-election nobody would finish it; take over after a grace period
+        grace = self.coordinator_timeout + self.answer_timeout * self.retries
+        if self._done.wait(grace):
+            return
+        with self._lock:
+            if self._superseded(epoch) or self._running_epoch == epoch:
+                return
+            self._spawn_round(epoch)
+
+    def _run(self, epoch: int) -> None:
+        my_uid = self._my_uid()
+        higher = sorted((uid for uid in self._snapshot if uid > my_uid), reverse=True)
+
+        for _score, ip in higher:
+            if self._superseded(epoch):
+                return
+            with self._lock:
+                ok = self._ok_events.setdefault((epoch, ip), threading.Event())
+            if not self._request(ip, f"BULLY_ELECTION:{epoch}:{self.local_ip}:{my_uid[0]}", ok):
+                continue
+            # A higher node is alive and has taken over; wait for its announcement
+            if self._done.wait(self.coordinator_timeout):
+                return
+
+        with self._lock:
+            if self._superseded(epoch):
+                return
+            self._finish(my_uid)
+        self._on_leader(self.local_ip, epoch)
+        self._announce(epoch)
+
+    def _announce(self, epoch: int) -> None:
+        msg = self._coordinator_msg()
+        pending = {ip for _score, ip in self._snapshot if ip != self.local_ip}
+
+        for _ in range(self.retries):
+            if self._epoch != epoch:
+                return
+            with self._lock:
+                pending -= self._coordinator_acks
+            if not pending:
+                return
+            for ip in pending:
+                self._transmit(ip, msg)
+            time.sleep(self.answer_timeout)
+
+    def _request(self, ip: str, msg: str, answered: threading.Event) -> bool:
+        for _ in range(self.retries):
+            self._transmit(ip, msg)
+            if answered.wait(self.answer_timeout):
+                return True
+        return False
+
+    def _coordinator_msg(self) -> str:
+        return f"BULLY_COORDINATOR:{self._epoch}:{self.local_ip}:{self._my_uid()[0]}"
+
+    def _uid(self, ip: str, parts: List[str]) -> Tuple[int, str]:
+        """The UID a message carries; older senders without a score are looked up in the snapshot."""
+        try:
+            return (int(parts[3]), ip)
+        except (IndexError, ValueError):
+            with self._lock:
+                return next((uid for uid in self._snapshot if uid[1] == ip), (0, ip))
+
+    def _my_uid(self) -> Tuple[int, str]:
+        for uid in self._snapshot:
+            if uid[1] == self.local_ip:
+                return uid
+        return (0, self.local_ip)
+
+    def _transmit(self, ip: str, msg: str) -> None:
+        kind = msg.split(":", 1)[0]
+        with self._lock:
+            self._messages_sent[kind] = self._messages_sent.get(kind, 0) + 1
+        if kind in _SENT:
+            _SENT[kind].inc()
+        try:
+            self._send(ip, msg)
+        except Exception as e:
+            print(f"[{self.local_ip}] Failed sending {kind} to {ip}: {e}")
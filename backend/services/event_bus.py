@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+class EventBus:
+    """
+    In-process publish/subscribe for the UI event stream (/api/events):
+    - publish() stamps every event with an id "<boot>-<seq>" and keeps the
+      last `history` events in a ring
+    - a subscriber resumes from its Last-Event-ID by replaying the ring; an
+      id from another boot, or one that has fallen out of the ring, means
+      the subscriber must start again from a snapshot
+    - at most `max_subscribers` streams are open at once, since each one
+      holds a request thread for its lifetime
+    """
+
+    def __init__(self, history: int = 1024, max_subscribers: int = 8):
+        self.boot = str(int(time.time()))
+        self.max_subscribers = max_subscribers
+        self._cond = threading.Condition()
+        self._events: Deque[Tuple[int, str, Dict[str, Any]]] = deque(maxlen=history)
+        self._seq = 0
+        self._subscribers = 0
+        self._published = 0
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> str:
+        with self._cond:
+            self._seq += 1
+            self._events.append((self._seq, event_type, data))
+            self._published += 1
+            self._cond.notify_all()
+            return self.event_id(self._seq)
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.boot}-{seq}"
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Optional["EventSubscription"]:
+        """A new subscription, or None when max_subscribers streams are already open."""
+        with self._cond:
+            if self._subscribers >= self.max_subscribers:
+                return None
+            self._subscribers += 1
+            cursor = self._resume_point(last_event_id)
+            if cursor is None:
+                return EventSubscription(self, self._seq, needs_snapshot=True)
+            return EventSubscription(self, cursor, needs_snapshot=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "boot": self.boot,
+                "last_id": self.event_id(self._seq),
+                "published": self._published,
+                "retained": len(self._events),
+                "subscribers": self._subscribers,
+            }
+
+    def _resume_point(self, last_event_id: Optional[str]) -> Optional[int]:
+        # lock held
+        if not last_event_id:
+            return None
+        boot, _, seq = last_event_id.partition("-")
+        if boot != self.boot or not seq.isdigit():
+            return None
+        seq = int(seq)
+        oldest = self._events[0][0] if self._events else self._seq + 1
+        if seq > self._seq or seq < oldest - 1:
+            return None
+        return seq
+
+    def _read(self, cursor: int, timeout: float) -> Optional[List[Tuple[int, str, Dict[str, Any]]]]:
+        """Events after `cursor` (waiting up to `timeout`); None if some were already dropped."""
+        with self._cond:
+            if self._seq <= cursor:
+                self._cond.wait(timeout)
+            if self._seq <= cursor:
+                return []
+            oldest = self._events[0][0]
+            if cursor + 1 < oldest:
+                return None
+            # The ring holds consecutive seqs, so the tail after cursor is a slice
+            start = cursor + 1 - oldest
+            return [self._events[i] for i in range(start, len(self._events))]
+
+    def _release(self) -> None:
+        with self._cond:
+            self._subscribers -= 1
+
+
+class EventSubscription:
+    """One stream's position in an EventBus; iterate with next_batch(), close() when done."""
+
+    def __init__(self, bus: EventBus, cursor: int, needs_snapshot: bool):
+        self.bus = bus
+        self.cursor = cursor
+        self.needs_snapshot = needs_snapshot
+        self._closed = False
+
+    @property
+    def last_id(self) -> str:
+        return self.bus.event_id(self.cursor)
+
+    def next_batch(self, timeout: float = 15.0) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """
+        (id, type, data) events published since the last batch; empty after
+        `timeout` with nothing new. If the subscriber fell out of the ring,
+        needs_snapshot is set again and the cursor jumps to the newest event.
+        """
+        events = self.bus._read(self.cursor, timeout)
+        if events is None:
+            with self.bus._cond:
+                self.cursor = self.bus._seq
+            self.needs_snapshot = True
+            return []
+        if events:
+            self.cursor = events[-1][0]
+        return [(self.bus.event_id(seq), event_type, data) for seq, event_type, data in events]
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self.bus._release()
+
+
+def format_sse(event_type: str, data: Dict[str, Any], event_id: Optional[str] = None) -> str:
+    """One text/event-stream message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,72 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+from backend.services.profiler import profiler
+
+
+class EventLoopThread:
+    """
+    One asyncio event loop on a daemon thread, shared by the control-plane
+    services (discovery datagrams and timers, sequencer server and client).
+    Synchronous code (Flask handlers, election and gossip threads) talks to
+    it through submit / call_soon / run.
+    """
+
+    def __init__(self, name: str = "control-plane"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self.start()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(ready,), name=self.name, daemon=True)
+                self._thread.start()
+                ready.wait()
+            return self._loop
+
+    def in_loop(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro: Awaitable[Any]) -> concurrent.futures.Future:
+        """Schedule a coroutine from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and block for its result (not from the loop thread)."""
+        return self.submit(coro).result(timeout)
+
+    def call_soon(self, callback: Callable[..., Any], *args: Any) -> None:
+        """Thread-safe call_soon; a no-op once the loop is closed."""
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass
+
+    def _run(self, ready: threading.Event) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(ready.set)
+        with profiler.profiled(f"loop.{self.name}"):
+            self._loop.run_forever()
+
+
+_shared: Optional[EventLoopThread] = None
+_shared_lock = threading.Lock()
+
+
+def shared_loop() -> EventLoopThread:
+    """The process-wide control-plane loop (started on first use)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = EventLoopThread()
+        return _shared
@@ -1,20 +1,176 @@
+import json
+import os
+import sys
+
 import bpy
 
-fps = bpy.context.scene.render.fps
-current_renderer = bpy.context.scene.render.engine
+# blender file.blend --background --python this_script.py -- <output path>
+args = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+output_path = args[0] if args else "blend_file_data.json"
+
+scene = bpy.context.scene
+render = scene.render
+
+
+def samples_and_denoiser():
+    if render.engine == "CYCLES":
+        cycles = scene.cycles
+        denoiser = cycles.denoiser if cycles.use_denoising else None
+        return cycles.samples, denoiser
+    if render.engine.startswith("BLENDER_EEVEE"):
+        return scene.eevee.taa_render_samples, None
+    return None, None
+
+
+def geometry():
+    """Objects, instances and polygons as rendered at the first frame (modifiers applied)."""
+    scene.frame_set(scene.frame_start)
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    polygons_by_object = {}
+    counts = {"objects": 0, "mesh_objects": 0, "lights": 0, "instances": 0, "polygons": 0}
+    for instance in depsgraph.object_instances:
+        obj = instance.object
+        if instance.is_instance:
+            counts["instances"] += 1
+        else:
+            counts["objects"] += 1
+            if obj.type == "LIGHT":
+                counts["lights"] += 1
+        if obj.type != "MESH":
+            continue
+        if not instance.is_instance:
+            counts["mesh_objects"] += 1
+        if obj.name not in polygons_by_object:
+            polygons_by_object[obj.name] = len(obj.data.polygons)
+        counts["polygons"] += polygons_by_object[obj.name]
+    return counts
+
+
+def textures():
+    """Images in use and a rough size of their pixels once loaded."""
+    images = []
+    memory = 0
+    for image in bpy.data.images:
+        if image.users == 0 or image.source not in ("FILE", "SEQUENCE", "TILED", "GENERATED", "MOVIE"):
+            continue
+        path = bpy.path.abspath(image.filepath) if image.filepath else ""
+        missing = image.source == "FILE" and not image.packed_file and not os.path.exists(path)
+        width, height = image.size[:] if not missing else (0, 0)
+        size = width * height * image.channels * (4 if image.is_float else 1)
+        memory += size
+        images.append({"name": image.name, "width": width, "height": height, "bytes": size, "missing": missing})
+    return {"images": len(images), "memory_bytes": memory, "missing": [i["name"] for i in images if i["missing"]]}
+
+
+def libraries():
+    return [
+        {
+            "name": library.name,
+            "filepath": library.filepath,
+            "missing": not os.path.exists(bpy.path.abspath(library.filepath)),
+        }
+        for library in bpy.data.libraries
+    ]
+
+
+def caches():
+    """Simulation point caches (cloth, soft body, particles, rigid body) and fluid domains."""
+    found = []
+
+    def point_cache(owner, kind, cache):
+        found.append({
+            "object": owner,
+            "type": kind,
+            "frame_start": cache.frame_start,
+            "frame_end": cache.frame_end,
+            "baked": cache.is_baked,
+            "disk": cache.use_disk_cache,
+        })
+
+    for obj in scene.objects:
+        for modifier in obj.modifiers:
+            if hasattr(modifier, "point_cache"):
+                point_cache(obj.name, modifier.type, modifier.point_cache)
+            elif modifier.type == "FLUID" and modifier.fluid_type == "DOMAIN":
+                domain = modifier.domain_settings
+                found.append({
+                    "object": obj.name,
+                    "type": "FLUID",
+                    "frame_start": domain.cache_frame_start,
+                    "frame_end": domain.cache_frame_end,
+                    "baked": domain.has_cache_baked_data,
+                    "disk": True,
+                    "directory": domain.cache_directory,
+                })
+        for particle_system in obj.particle_systems:
+            point_cache(obj.name, "PARTICLES", particle_system.point_cache)
+    if scene.rigidbody_world and scene.rigidbody_world.point_cache:
+        point_cache(None, "RIGID_BODY", scene.rigidbody_world.point_cache)
+    return found
+
+
+def fcurves(animation_data):
+    action = animation_data.action if animation_data else None
+    if action is None:
+        return []
+    slot = getattr(animation_data, "action_slot", None)
+    if hasattr(action, "layers") and slot is not None:
+        # Slotted actions (4.4+): the curves live in each strip's channelbag for our slot
+        curves = []
+        for layer in action.layers:
+            for strip in layer.strips:
+                channelbag = strip.channelbag(slot)
+                if channelbag:
+                    curves.extend(channelbag.fcurves)
+        return curves
+    return list(getattr(action, "fcurves", []))
+
+
+def frame_hints():
+    """Frames where rendering cost can jump: keyed render visibility and camera switches."""
+    visibility = {}
+    for obj in scene.objects:
+        frames = set()
+        for curve in fcurves(obj.animation_data):
+            if curve.data_path in ("hide_render", "visible_camera"):
+                frames.update(int(key.co[0]) for key in curve.keyframe_points
+                              if scene.frame_start <= key.co[0] <= scene.frame_end)
+        if frames:
+            visibility[obj.name] = sorted(frames)
+    camera_switches = sorted(marker.frame for marker in scene.timeline_markers
+                             if marker.camera and scene.frame_start <= marker.frame <= scene.frame_end)
+    changes = set(camera_switches)
+    for frames in visibility.values():
+        changes.update(frames)
+    return {
+        "visibility_keys": visibility,
+        "camera_switches": camera_switches,
+        "change_frames": sorted(changes),
+    }
 
-frame_start = bpy.context.scene.frame_start
-frame_end = bpy.context.scene.frame_end
 
-lines = []
-lines.append("fps:" + str(fps) + "\n")
-lines.append("renderer:" + str(current_renderer) + "\n")
-lines.append("frame_start:" + str(frame_start) + "\n")
-lines.append("frame_end:" + str(frame_end))
+samples, denoiser = samples_and_denoiser()
+analysis = {
+    "fps": render.fps,
+    "fps_base": render.fps_base,
+    "renderer": render.engine,
+    "frame_start": scene.frame_start,
+    "frame_end": scene.frame_end,
+    "frame_step": scene.frame_step,
+    "resolution_x": render.resolution_x,
+    "resolution_y": render.resolution_y,
+    "resolution_percentage": render.resolution_percentage,
+    "samples": samples,
+    "denoiser": denoiser,
+    "blender_version": bpy.app.version_string,
+    "scene": geometry(),
+    "textures": textures(),
+    "libraries": libraries(),
+    "caches": caches(),
+    "frame_hints": frame_hints(),
+}
 
-with(open("blend_file_data.txt", "w") as file):
-    
-    file.writelines(lines)
+with open(output_path, "w") as file:
+    json.dump(analysis, file)
 
-file.close()
-bpy.ops.wm.quit_blender()
\ No newline at end of file
+bpy.ops.wm.quit_blender()
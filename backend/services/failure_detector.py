@@ -0,0 +1,157 @@
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+
+class PhiAccrualFailureDetector:
+    """
+    Phi-accrual failure detector (Hayashibara et al.) fed by discovery beacons:
+    - keeps a sliding window of beacon inter-arrival times per node
+    - phi = -log10(P(next beacon arrives later than now)) under a normal model
+    - a node is suspected once phi crosses `threshold`
+
+    Also keeps detection metrics: how long after its last beacon a dead node
+    was confirmed, and how many suspicions turned out to be false positives.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 8.0,
+        window_size: int = 100,
+        expected_interval: float = 3.0,
+        min_std_dev: float = 0.5,
+        acceptable_pause: float = 1.0,
+    ):
+        self.threshold = threshold
+        self.window_size = window_size
+        self.expected_interval = expected_interval
+        self.min_std_dev = min_std_dev
+        self.acceptable_pause = acceptable_pause
+
+        self._lock = threading.Lock()
+        self._intervals: Dict[str, Deque[float]] = {}
+        self._last_heartbeat: Dict[str, float] = {}
+        self._suspected: Dict[str, float] = {}
+
+        # Metrics
+        self._suspicions = 0
+        self._false_positives = 0
+        self._confirmed_failures = 0
+        self._detection_latencies: Deque[float] = deque(maxlen=256)
+
+    def heartbeat(self, node: str, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            last = self._last_heartbeat.get(node)
+            if last is not None:
+                window = self._intervals.setdefault(node, deque(maxlen=self.window_size))
+                window.append(now - last)
+            self._last_heartbeat[node] = now
+            if self._suspected.pop(node, None) is not None:
+                # A suspected node spoke again without being removed
+                self._false_positives += 1
+
+    def phi(self, node: str, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            last = self._last_heartbeat.get(node)
+            if last is None:
+                return 0.0
+            mean, std = self._stats(node)
+        return self._phi(now - last, mean + self.acceptable_pause, std)
+
+    def suspects(self, nodes: List[str], now: Optional[float] = None) -> List[str]:
+        """Return nodes whose phi is above threshold and mark them suspected."""
+        now = time.monotonic() if now is None else now
+        suspected = []
+        for node in nodes:
+            if self.phi(node, now) < self.threshold:
+                continue
+            with self._lock:
+                if node not in self._suspected:
+                    self._suspected[node] = now
+                    self._suspicions += 1
+            suspected.append(node)
+        return suspected
+
+    def alive(self, node: str, now: Optional[float] = None) -> None:
+        """A confirmation probe answered: the suspicion was a false positive."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._suspected.pop(node, None) is not None:
+                self._false_positives += 1
+            # Restart the silence clock without polluting the interval window
+            if node in self._last_heartbeat:
+                self._last_heartbeat[node] = now
+
+    def confirm_failure(self, node: str, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            last = self._last_heartbeat.get(node)
+            if last is not None:
+                self._detection_latencies.append(now - last)
+            self._confirmed_failures += 1
+            self._forget(node)
+
+    def remove(self, node: str) -> None:
+        with self._lock:
+            self._forget(node)
+
+    def retain(self, nodes) -> None:
+        """Drop state for nodes that are no longer members."""
+        keep = set(nodes)
+        with self._lock:
+            for node in list(self._last_heartbeat):
+                if node not in keep:
+                    self._forget(node)
+
+    def metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            latencies = sorted(self._detection_latencies)
+            last_latency = self._detection_latencies[-1] if self._detection_latencies else None
+            nodes = list(self._last_heartbeat)
+            suspicions = self._suspicions
+            false_positives = self._false_positives
+            confirmed = self._confirmed_failures
+            suspected = list(self._suspected)
+
+        return {
+            "threshold": self.threshold,
+            "suspicions": suspicions,
+            "confirmed_failures": confirmed,
+            "false_positives": false_positives,
+            "false_positive_rate": (false_positives / suspicions) if suspicions else 0.0,
+            "detection_latency": {
+                "count": len(latencies),
+                "last": last_latency,
+                "mean": (sum(latencies) / len(latencies)) if latencies else None,
+                "p95": latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+            },
+            "suspected": suspected,
+            "phi": {node: round(self.phi(node, now), 3) for node in nodes},
+        }
+
+    def _forget(self, node: str) -> None:
+        self._intervals.pop(node, None)
+        self._last_heartbeat.pop(node, None)
+        self._suspected.pop(node, None)
+
+    def _stats(self, node: str):
+        window = self._intervals.get(node)
+        if not window:
+            # Bootstrap from the beacon period until real samples arrive
+            return self.expected_interval, max(self.expected_interval / 4, self.min_std_dev)
+        n = len(window)
+        mean = sum(window) / n
+        variance = sum((x - mean) ** 2 for x in window) / n
+        return mean, max(math.sqrt(variance), self.min_std_dev)
+
+    @staticmethod
+    def _phi(elapsed: float, mean: float, std: float) -> float:
+        p_later = 0.5 * math.erfc((elapsed - mean) / (std * math.sqrt(2)))
+        if p_later <= 1e-300:
+            return 300.0
+        return -math.log10(p_later)
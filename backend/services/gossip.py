@@ -0,0 +1,400 @@
+import itertools
+import json
+import math
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+ALIVE = "alive"
+SUSPECT = "suspect"
+DEAD = "dead"
+
+
+class SwimMembership:
+    """
+    SWIM-style membership (Das et al., 2002) over unicast datagrams:
+    - every `protocol_period` one member is probed with PING (round-robin
+      over a shuffled list); if no ACK within `ack_timeout`, `indirect_probes`
+      other members are asked to PING_REQ it on our behalf
+    - a member that misses a whole period becomes SUSPECT, and DEAD after
+      `suspicion_periods` more periods unless it refutes with a higher
+      incarnation number
+    - membership updates are piggybacked on probe traffic, each one
+      retransmitted ~3*log(n) times, at most `max_piggyback` per datagram
+
+    Per-node traffic is one probe (plus ACK) per period no matter how large
+    the cluster is. Joining needs one reachable member: static seed peers or
+    a node heard through an initial broadcast; the joiner gets the full
+    member list in SYNC datagrams.
+
+    Every `sync_periods` periods a node also pulls the full member list from
+    one random member (push-pull anti-entropy, as in memberlist), which
+    repairs updates whose piggyback retransmissions all got lost.
+
+    Wire format: "SWIM_<KIND>:" followed by a compact JSON body.
+    """
+
+    PREFIX = "SWIM_"
+    SYNC_CHUNK = 25
+
+    def __init__(
+        self,
+        local_ip: str,
+        send: Callable[[str, str], None],
+        self_info: Callable[[], Dict[str, Any]],
+        on_alive: Callable[[Dict[str, Any]], None],
+        on_dead: Callable[[str], None],
+        protocol_period: float = 1.0,
+        ack_timeout: float = 0.3,
+        indirect_probes: int = 3,
+        suspicion_periods: int = 4,
+        max_piggyback: int = 6,
+        sync_periods: int = 20,
+        seed: Optional[int] = None,
+    ):
+        self.local_ip = local_ip
+        self._send = send
+        self._self_info = self_info
+        self._on_alive = on_alive
+        self._on_dead = on_dead
+
+        self.protocol_period = protocol_period
+        self.ack_timeout = ack_timeout
+        self.indirect_probes = indirect_probes
+        self.suspicion_periods = suspicion_periods
+        self.max_piggyback = max_piggyback
+        self.sync_periods = sync_periods
+        self.beacon_responders = 3
+        self._periods = 0
+        self._joined_at: Dict[str, float] = {}
+
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+        self._members: Dict[str, Dict[str, Any]] = {}
+        self._incarnation = 0
+        self._announced: Optional[Dict[str, Any]] = None
+
+        # ip -> [update, transmissions left]
+        self._piggyback: Dict[str, List[Any]] = {}
+        self._probe_order: List[str] = []
+        self._seq = itertools.count(1)
+        self._pending: Dict[int, Callable[[], None]] = {}
+
+        self._thread: Optional[threading.Thread] = None
+        self._running = threading.Event()
+
+        self._sent: Dict[str, int] = {}
+        self._received: Dict[str, int] = {}
+
+    # ------------------------------------------
+    # Lifecycle
+    # ------------------------------------------
+
+    def start(self) -> None:
+        if self._running.is_set():
+            return
+        self._running.set()
+        self._refresh_self()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running.clear()
+        with self._lock:
+            self._members.clear()
+            self._piggyback.clear()
+            self._probe_order = []
+            self._pending.clear()
+            self._joined_at.clear()
+            self._announced = None
+
+    def seed(self, ips: Iterable[str], from_beacon: bool = False) -> None:
+        """
+        Contact peers we are not yet a member with (static seeds or broadcast-discovered nodes).
+
+        A beacon from a newcomer is heard by every member; only ~`beacon_responders`
+        of them answer it so a join costs O(1) messages, not O(n).
+        """
+        now = time.monotonic()
+        for ip in ips:
+            if not ip or ip == self.local_ip:
+                continue
+            with self._lock:
+                if ip in self._members and self._members[ip]["state"] != DEAD:
+                    continue
+                last = self._joined_at.get(ip)
+                if last is not None and now - last < self.protocol_period * self.sync_periods:
+                    continue
+                alive = sum(1 for m in self._members.values() if m["state"] == ALIVE)
+                if from_beacon and alive and self._rng.random() > self.beacon_responders / alive:
+                    continue
+                self._joined_at[ip] = now
+            self._transmit(ip, "JOIN", {})
+
+    def members(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(m) for m in self._members.values() if m["state"] != DEAD]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            states: Dict[str, int] = {}
+            for m in self._members.values():
+                states[m["state"]] = states.get(m["state"], 0) + 1
+            return {
+                "incarnation": self._incarnation,
+                "members": states,
+                "piggyback_queue": len(self._piggyback),
+                "sent": dict(self._sent),
+                "received": dict(self._received),
+            }
+
+    # ------------------------------------------
+    # Incoming
+    # ------------------------------------------
+
+    def handle(self, msg: str, src_ip: str) -> bool:
+        if not msg.startswith(self.PREFIX):
+            return False
+        kind, _, raw = msg[len(self.PREFIX):].partition(":")
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            return True
+
+        with self._lock:
+            self._received[kind] = self._received.get(kind, 0) + 1
+        if not self._running.is_set():
+            return True
+
+        sender = body.get("me")
+        if sender:
+            self._merge(sender)
+        for update in body.get("u", []):
+            self._merge(update)
+
+        if kind == "PING":
+            self._transmit(src_ip, "ACK", {"seq": body.get("seq")})
+
+        elif kind == "ACK":
+            with self._lock:
+                callback = self._pending.pop(body.get("seq"), None)
+            if callback:
+                callback()
+
+        elif kind == "PING_REQ":
+            target = body.get("target")
+            requester_seq = body.get("seq")
+            if target:
+                relay = lambda: self._transmit(src_ip, "ACK", {"seq": requester_seq})
+                self._ping(target, relay)
+
+        elif kind == "JOIN":
+            members = [self._record_for_wire(m) for m in self._all_records()]
+            for i in range(0, len(members), self.SYNC_CHUNK):
+                self._transmit(src_ip, "SYNC", {"u": members[i:i + self.SYNC_CHUNK]}, piggyback=False)
+
+        return True
+
+    # ------------------------------------------
+    # Protocol period
+    # ------------------------------------------
+
+    def _run(self) -> None:
+        while self._running.is_set():
+            started = time.monotonic()
+            try:
+                self._refresh_self()
+                target = self._next_target()
+                if target:
+                    self._probe(target)
+                self._expire()
+                self._periods += 1
+                if self._periods % self.sync_periods == 0:
+                    self._anti_entropy()
+            except Exception as e:
+                print(f"[{self.local_ip}] SWIM period failed: {e}")
+            remaining = self.protocol_period - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def _probe(self, target: str) -> None:
+        acked = threading.Event()
+        self._ping(target, acked.set)
+        if acked.wait(self.ack_timeout):
+            return
+
+        with self._lock:
+            helpers = [ip for ip, m in self._members.items() if ip != target and m["state"] == ALIVE]
+        for helper in self._rng.sample(helpers, min(self.indirect_probes, len(helpers))):
+            seq = next(self._seq)
+            with self._lock:
+                self._pending[seq] = acked.set
+            self._transmit(helper, "PING_REQ", {"seq": seq, "target": target})
+
+        if acked.wait(max(self.protocol_period - self.ack_timeout, self.ack_timeout)):
+            return
+
+        with self._lock:
+            member = self._members.get(target)
+            if member is None or member["state"] != ALIVE:
+                return
+            self._merge({**member, "state": SUSPECT})
+
+    def _ping(self, target: str, on_ack: Callable[[], None]) -> None:
+        seq = next(self._seq)
+        with self._lock:
+            self._pending[seq] = on_ack
+        self._transmit(target, "PING", {"seq": seq})
+
+    def _anti_entropy(self) -> None:
+        with self._lock:
+            alive = [ip for ip, m in self._members.items() if m["state"] == ALIVE]
+        if alive:
+            self._transmit(self._rng.choice(alive), "JOIN", {})
+
+    def _next_target(self) -> Optional[str]:
+        with self._lock:
+            while self._probe_order:
+                ip = self._probe_order.pop()
+                if ip in self._members and self._members[ip]["state"] != DEAD:
+                    return ip
+            candidates = [ip for ip, m in self._members.items() if m["state"] != DEAD]
+            if not candidates:
+                return None
+            self._rng.shuffle(candidates)
+            self._probe_order = candidates
+            return self._probe_order.pop()
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        suspicion_timeout = self.suspicion_periods * self.protocol_period
+        dead = []
+        with self._lock:
+            # Stale acks whose probe already gave up
+            if len(self._pending) > 1024:
+                self._pending.clear()
+            for ip, m in list(self._members.items()):
+                if m["state"] == SUSPECT and now - m["since"] > suspicion_timeout:
+                    dead.append(m)
+                elif m["state"] == DEAD and now - m["since"] > 10 * suspicion_timeout:
+                    del self._members[ip]
+        for m in dead:
+            self._merge({**m, "state": DEAD})
+
+    # ------------------------------------------
+    # Membership updates
+    # ------------------------------------------
+
+    def _refresh_self(self) -> None:
+        info = self._self_info()
+        with self._lock:
+            if info == self._announced:
+                return
+            if self._announced is not None:
+                self._incarnation += 1
+            self._announced = dict(info)
+            self._enqueue(self._self_record())
+
+    def _self_record(self) -> Dict[str, Any]:
+        info = self._announced or self._self_info()
+        return {"ip": self.local_ip, "inc": self._incarnation, "state": ALIVE, **info}
+
+    def _merge(self, update: Dict[str, Any]) -> None:
+        ip = update.get("ip")
+        state = update.get("state", ALIVE)
+        inc = update.get("inc", 0)
+        if not ip:
+            return
+
+        if ip == self.local_ip:
+            if state != ALIVE and inc >= self._incarnation:
+                # Refute: someone thinks we are suspect/dead
+                with self._lock:
+                    self._incarnation = inc + 1
+                    self._enqueue(self._self_record())
+            return
+
+        notify_alive = notify_dead = False
+        with self._lock:
+            current = self._members.get(ip)
+            if not self._overrides(update, current):
+                return
+            record = {
+                "ip": ip,
+                "name": update.get("name", current["name"] if current else ip),
+                "score": update.get("score", current["score"] if current else 0),
+                "role": update.get("role", current["role"] if current else "Undefined"),
+                "inc": inc,
+                "state": state,
+                "since": time.monotonic(),
+            }
+            self._members[ip] = record
+            self._enqueue(record)
+
+            if state == ALIVE:
+                notify_alive = True
+            elif state == DEAD and (current is None or current["state"] != DEAD):
+                notify_dead = True
+            elif state == SUSPECT and current is None:
+                notify_alive = True
+
+        if notify_alive:
+            self._on_alive(self._record_for_wire(record))
+        if notify_dead:
+            self._on_dead(ip)
+
+    @staticmethod
+    def _overrides(update: Dict[str, Any], current: Optional[Dict[str, Any]]) -> bool:
+        if current is None:
+            return update.get("state", ALIVE) != DEAD
+        state, inc = update.get("state", ALIVE), update.get("inc", 0)
+        cur_state, cur_inc = current["state"], current["inc"]
+
+        if state == ALIVE:
+            # Also how a DEAD member comes back: it rejoined with a newer incarnation
+            return inc > cur_inc
+        if state == SUSPECT:
+            if cur_state == DEAD:
+                return False
+            return inc > cur_inc or (inc == cur_inc and cur_state == ALIVE)
+        # DEAD
+        return cur_state != DEAD and inc >= cur_inc
+
+    def _enqueue(self, record: Dict[str, Any]) -> None:
+        # lock held
+        n = max(len(self._members), 1)
+        retransmits = max(3, int(math.ceil(3 * math.log2(n + 1))))
+        self._piggyback[record["ip"]] = [self._record_for_wire(record), retransmits]
+
+    def _take_piggyback(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            # Least-transmitted updates first
+            entries = sorted(self._piggyback.items(), key=lambda kv: -kv[1][1])[: self.max_piggyback]
+            updates = []
+            for ip, entry in entries:
+                updates.append(entry[0])
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self._piggyback[ip]
+            return updates
+
+    def _all_records(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self._self_record()] + list(self._members.values())
+
+    @staticmethod
+    def _record_for_wire(record: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: record[k] for k in ("ip", "name", "score", "role", "inc", "state") if k in record}
+
+    def _transmit(self, ip: str, kind: str, body: Dict[str, Any], piggyback: bool = True) -> None:
+        with self._lock:
+            body["me"] = self._record_for_wire(self._self_record())
+        if piggyback:
+            body["u"] = self._take_piggyback()
+        with self._lock:
+            self._sent[kind] = self._sent.get(kind, 0) + 1
+        try:
+            self._send(ip, self.PREFIX + kind + ":" + json.dumps(body, separators=(",", ":")))
+        except Exception as e:
+            print(f"[{self.local_ip}] SWIM send {kind} to {ip} failed: {e}")
@@ -0,0 +1,255 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class P2Quantile:
+    """
+    Streaming quantile estimate (Jain & Chlamtac's P-square algorithm):
+    five markers, O(1) memory and O(1) work per sample.
+    """
+
+    def __init__(self, q: float):
+        self.q = q
+        self._initial: List[float] = []
+        self._heights: Optional[List[float]] = None
+        self._positions: List[float] = [1, 2, 3, 4, 5]
+        self._desired: List[float] = [1, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5]
+        self._increments = (0, q / 2, q, (1 + q) / 2, 1)
+
+    def add(self, x: float) -> None:
+        if self._heights is None:
+            self._initial.append(x)
+            if len(self._initial) == 5:
+                self._heights = sorted(self._initial)
+            return
+
+        h, n = self._heights, self._positions
+        if x < h[0]:
+            h[0] = x
+            k = 0
+        elif x >= h[4]:
+            h[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= h[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        # Move the middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = self._desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                step = 1 if d > 0 else -1
+                height = self._parabolic(i, step)
+                if not h[i - 1] < height < h[i + 1]:
+                    height = h[i] + step * (h[i + step] - h[i]) / (n[i + step] - n[i])
+                h[i] = height
+                n[i] += step
+
+    def _parabolic(self, i: int, d: int) -> float:
+        h, n = self._heights, self._positions
+        return h[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self) -> Optional[float]:
+        if self._heights is not None:
+            return self._heights[2]
+        if not self._initial:
+            return None
+        ordered = sorted(self._initial)
+        return ordered[min(len(ordered) - 1, int(self.q * len(ordered)))]
+
+
+class _WorkerProgress:
+    __slots__ = ("assigned", "done", "total_time", "samples", "ewma", "p95", "last_at", "stats")
+
+    def __init__(self, assigned: Optional[int]):
+        self.assigned = assigned
+        self.done = 0
+        self.total_time = 0.0
+        self.samples = 0
+        self.ewma: Optional[float] = None
+        self.p95 = P2Quantile(0.95)
+        self.last_at: Optional[float] = None
+        self.stats: Dict[str, Any] = {}
+
+
+class _JobProgress:
+    __slots__ = ("started_at", "started_wall", "total", "workers", "received", "frame_time_sum", "frame_time_samples")
+
+    def __init__(self, total: Optional[int], started_at: Optional[float]):
+        self.started_at = started_at
+        self.started_wall = time.time() - (time.monotonic() - started_at) if started_at is not None else None
+        self.total = total
+        self.workers: Dict[str, _WorkerProgress] = {}
+        self.received: set = set()
+        self.frame_time_sum = 0.0
+        self.frame_time_samples = 0
+
+
+class JobProgressTracker:
+    """
+    Leader-side, in-memory progress of every running job:
+    - start_job() records when frames were handed out and how many each
+      worker got; record_frame() is called for every frame that arrives
+    - per worker: frames done, mean and p95 frame time, and the current
+      rate (EWMA of frame time, weight `alpha` for the newest frame)
+    - each frame updates only its worker's counters and cached stats, in
+      O(1); summary() assembles them with an ETA per worker and for the
+      cluster (the slowest worker finishes last)
+
+    Frame time is the gap between a worker's consecutive frames (its first
+    frame is measured from start_job). Duplicate frames are ignored. The
+    `max_jobs` most recently started jobs are kept.
+    """
+
+    def __init__(self, alpha: float = 0.3, max_jobs: int = 64):
+        self.alpha = alpha
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, _JobProgress]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start_job(self, job_id: str, assignments: Dict[str, Iterable[Any]], now: Optional[float] = None) -> None:
+        """assignments: worker ip -> frames assigned to it (metadata["jobs"])."""
+        now = time.monotonic() if now is None else now
+        counts = {ip: len(list(frames)) for ip, frames in (assignments or {}).items()}
+        with self._lock:
+            job = _JobProgress(sum(counts.values()) or None, now)
+            for ip, count in counts.items():
+                job.workers[ip] = _WorkerProgress(count)
+            self._jobs[job_id] = job
+            self._jobs.move_to_end(job_id)
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+
+    def record_frame(self, job_id: str, worker_ip: str, frame: Any = None, total: Optional[int] = None,
+                     now: Optional[float] = None) -> Optional[int]:
+        """Frames the worker still has to deliver (None if unknown, or a duplicate frame)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                # Frames for a job this leader did not start (e.g. after a restart)
+                job = self._jobs[job_id] = _JobProgress(total, None)
+            if frame is not None:
+                if frame in job.received:
+                    return None
+                job.received.add(frame)
+
+            worker = job.workers.get(worker_ip)
+            if worker is None:
+                worker = job.workers[worker_ip] = _WorkerProgress(None)
+            since = worker.last_at if worker.last_at is not None else job.started_at
+            worker.done += 1
+            worker.last_at = now
+            if since is not None:
+                frame_time = now - since
+                worker.samples += 1
+                worker.total_time += frame_time
+                worker.p95.add(frame_time)
+                worker.ewma = frame_time if worker.ewma is None else self.alpha * frame_time + (1 - self.alpha) * worker.ewma
+                job.frame_time_sum += frame_time
+                job.frame_time_samples += 1
+            worker.stats = {
+                "assigned": worker.assigned,
+                "done": worker.done,
+                "remaining": max(0, worker.assigned - worker.done) if worker.assigned is not None else None,
+                "mean_frame_s": _round(worker.total_time / worker.samples) if worker.samples else None,
+                "p95_frame_s": _round(worker.p95.value()),
+                "rate_fps": _round(1.0 / worker.ewma) if worker.ewma else None,
+            }
+            return worker.stats["remaining"]
+
+    def summary(self, job_id: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            cluster_mean = job.frame_time_sum / job.frame_time_samples if job.frame_time_samples else None
+            workers = {}
+            etas = []
+            done = 0
+            for ip, worker in job.workers.items():
+                done += worker.done
+                stats = dict(worker.stats) if worker.stats else {
+                    "assigned": worker.assigned, "done": 0, "remaining": worker.assigned,
+                    "mean_frame_s": None, "p95_frame_s": None, "rate_fps": None,
+                }
+                eta = self._worker_eta(job, worker, stats["remaining"], cluster_mean, now)
+                stats["eta_s"] = _round(eta)
+                if stats["remaining"]:
+                    etas.append(eta)
+                workers[ip] = stats
+            total = job.total
+            rate = sum(w["rate_fps"] for w in workers.values() if w["rate_fps"] and w["remaining"] != 0)
+
+        remaining = max(0, total - done) if total is not None else None
+        if remaining == 0:
+            eta = 0.0
+        else:
+            # Workers render in parallel: the job is done when the slowest one is
+            eta = _round(max(etas)) if etas and None not in etas else None
+        return {
+            "job_id": job_id,
+            "started_at": job.started_wall,
+            "elapsed_s": _round(now - job.started_at) if job.started_at is not None else None,
+            "frames_total": total,
+            "frames_done": done,
+            "frames_remaining": remaining,
+            "rate_fps": _round(rate) if rate else None,
+            "eta_s": eta,
+            "workers": workers,
+        }
+
+    def _worker_eta(self, job: _JobProgress, worker: _WorkerProgress, remaining: Optional[int],
+                    cluster_mean: Optional[float], now: float) -> Optional[float]:
+        if remaining == 0:
+            return 0.0
+        if remaining is None:
+            return None
+        frame_time = worker.ewma if worker.ewma is not None else cluster_mean
+        if frame_time is None:
+            return None
+        since = worker.last_at if worker.last_at is not None else job.started_at
+        in_progress = now - since if since is not None else 0.0
+        return max(0.0, remaining * frame_time - in_progress)
+
+    def reassign(self, job_id: str, lost_worker: str, added: Dict[str, int]) -> None:
+        """A worker's unfinished frames moved to others: `added` is worker ip -> frames it gained."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            lost = job.workers.get(lost_worker)
+            if lost is not None:
+                lost.assigned = lost.done
+                _refresh_assignment(lost)
+            for ip, count in added.items():
+                worker = job.workers.get(ip)
+                if worker is None:
+                    worker = job.workers[ip] = _WorkerProgress(0)
+                worker.assigned = (worker.assigned or 0) + count
+                _refresh_assignment(worker)
+
+    def forget(self, job_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+
+def _refresh_assignment(worker: _WorkerProgress) -> None:
+    if worker.stats:
+        worker.stats = dict(worker.stats, assigned=worker.assigned,
+                            remaining=max(0, worker.assigned - worker.done) if worker.assigned is not None else None)
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
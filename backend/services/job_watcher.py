@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+METADATA_FILENAME = "metadata.json"
+
+
+class JobWatcher(FileSystemEventHandler):
+    """
+    Watches every jobs/<id>/metadata.json (whichever process writes it: the
+    API, worker.py, discovery) and reports job state changes:
+    - on_change(summary) is called when a job appears or its status changes
+    - jobs() returns the latest summary of every job, for snapshots
+    """
+
+    def __init__(self, jobs_dir: str, on_change: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.jobs_dir = jobs_dir
+        self.on_change = on_change
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._observer = None
+
+    def start(self) -> None:
+        if self._observer is not None:
+            return
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        for job_id in sorted(os.listdir(self.jobs_dir)):
+            self._refresh(os.path.join(self.jobs_dir, job_id, METADATA_FILENAME), notify=False)
+        self._observer = Observer()
+        self._observer.schedule(self, self.jobs_dir, recursive=True)
+        self._observer.daemon = True
+        self._observer.start()
+
+    def stop(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._refresh(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._refresh(event.src_path)
+
+    def on_moved(self, event):
+        # metadata.json is usually replaced atomically (temp file + rename)
+        if not event.is_directory:
+            self._refresh(event.dest_path)
+
+    def on_deleted(self, event):
+        if event.is_directory and os.path.dirname(os.path.normpath(event.src_path)) == os.path.normpath(self.jobs_dir):
+            with self._lock:
+                self._jobs.pop(os.path.basename(event.src_path), None)
+
+    def _refresh(self, path: str, notify: bool = True) -> None:
+        if os.path.basename(path) != METADATA_FILENAME:
+            return
+        try:
+            with open(path, "r") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            # Missing, or caught mid-write: the next event carries the final content
+            return
+
+        job_id = os.path.basename(os.path.dirname(path))
+        summary = {
+            "job_id": job_id,
+            "status": metadata.get("status"),
+            "filename": metadata.get("filename"),
+            "remaining_frames": metadata.get("remaining_frames"),
+            "total_no_frames": metadata.get("total_no_frames"),
+            "leader_ip": metadata.get("leader_ip"),
+        }
+        with self._lock:
+            previous = self._jobs.get(job_id)
+            self._jobs[job_id] = summary
+        if notify and self.on_change and (previous is None or previous["status"] != summary["status"]):
+            try:
+                self.on_change(summary)
+            except Exception as e:
+                print(f"[JobWatcher] on_change failed: {e}")
@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+from backend.services import metrics
+
+_SENT = metrics.counter("renderfarm_replica_batches_total", "Leader state batches sent to the standby", ("result",))
+_STORED = metrics.counter("renderfarm_replica_jobs_stored_total", "Job states stored as the standby", ("result",))
+
+
+def _version(payload: Dict[str, Any]):
+    return (payload.get("term", 0), payload.get("seq", 0))
+
+
+class LeaderReplica:
+    """
+    Job state the leader keeps on a standby node, for failover:
+    - on the leader, publish() records a job's latest metadata.json
+      (assignment, generation, received_frames, ...). A background thread
+      sends the newest state of every changed job to the standby
+      (`standby()`, the ring successor) in one request at most every
+      `interval` seconds, so a burst of frames costs one transfer
+    - when the standby changes, every job still running is sent again
+    - on the standby, store() keeps the newest copy of each job under
+      `replica_dir`, ordered by the leader term and then a sequence
+      number; a new leader collects them with load()
+
+    Frames themselves are not replicated: workers keep theirs until the
+    job is released and send them again to a new leader.
+    """
+
+    def __init__(self, standby: Callable[[], Optional[str]], local_ip: Callable[[], str],
+                 replica_dir: str = "replica", interval: float = 0.5, timeout: float = 2.0, port: int = 5050):
+        self.standby = standby
+        self.local_ip = local_ip
+        self.replica_dir = replica_dir
+        self.interval = interval
+        self.timeout = timeout
+        self.port = port
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._dirty: set = set()
+        self._target: Optional[str] = None
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._store_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_sent: Optional[Dict[str, Any]] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="leader-replica", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        self._thread = None
+
+    # --- leader side ---
+
+    def publish(self, job_id: str, metadata: Dict[str, Any]) -> None:
+        """Queue the job's current metadata for the standby."""
+        with self._lock:
+            # Wall-clock based, so a restarted leader still moves forward
+            self._seq = max(self._seq + 1, time.time_ns())
+            self._latest[job_id] = {
+                "job_id": job_id,
+                "term": metadata.get("leader_term", 0),
+                "seq": self._seq,
+                "leader": self.local_ip(),
+                "state": metadata,
+            }
+            self._dirty.add(job_id)
+        self._wake.set()
+
+    def retire(self, job_id: str) -> None:
+        """Stop replicating a job (released or canceled)."""
+        with self._lock:
+            self._latest.pop(job_id, None)
+            self._dirty.discard(job_id)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self._flush()
+            except Exception as e:
+                print(f"[Replica] Sending state to the standby failed: {e}")
+            self._stop.wait(self.interval)
+
+    def _flush(self) -> None:
+        target = self.standby()
+        with self._lock:
+            if target != self._target:
+                self._target = target
+                self._dirty = set(self._latest)
+            if not target or target == self.local_ip() or not self._dirty:
+                self._dirty.clear()
+                return
+            batch = [self._latest[job_id] for job_id in self._dirty if job_id in self._latest]
+            self._dirty.clear()
+
+        try:
+            response = requests.post(f"http://{target}:{self.port}/api/replica", json={"replicas": batch},
+                                     timeout=self.timeout)
+            response.raise_for_status()
+            _SENT.labels("ok").inc()
+            self.last_sent = {"at": time.time(), "standby": target, "jobs": len(batch)}
+        except requests.RequestException as e:
+            _SENT.labels("failed").inc()
+            print(f"[Replica] Standby {target} unreachable: {e}")
+            with self._lock:
+                # Retried with the next flush unless a newer state replaced it
+                self._dirty.update(payload["job_id"] for payload in batch if payload["job_id"] in self._latest)
+            self._wake.set()
+
+    # --- standby side ---
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.replica_dir, f"{job_id}.json")
+
+    def store(self, payloads: List[Dict[str, Any]]) -> int:
+        """Keep each job's newest state; returns how many were newer than the stored copy."""
+        stored = 0
+        os.makedirs(self.replica_dir, exist_ok=True)
+        with self._store_lock:
+            for payload in payloads:
+                job_id = os.path.basename(str(payload.get("job_id") or ""))
+                if not job_id or not isinstance(payload.get("state"), dict):
+                    continue
+                current = self.load(job_id)
+                if current is not None and _version(current) >= _version(payload):
+                    _STORED.labels("stale").inc()
+                    continue
+                tmp_path = self._path(job_id) + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(payload, f)
+                os.replace(tmp_path, self._path(job_id))
+                _STORED.labels("ok").inc()
+                stored += 1
+        return stored
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(os.path.basename(job_id)), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def forget(self, job_id: str) -> None:
+        self.retire(job_id)
+        try:
+            os.remove(self._path(os.path.basename(job_id)))
+        except OSError:
+            pass
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            jobs = sorted(self._latest)
+            pending = len(self._dirty)
+        held = []
+        if os.path.isdir(self.replica_dir):
+            held = sorted(name[:-5] for name in os.listdir(self.replica_dir) if name.endswith(".json"))
+        return {
+            "standby": self._target,
+            "replicating": jobs,
+            "pending": pending,
+            "last_sent": self.last_sent,
+            "held": held,
+        }
@@ -0,0 +1,156 @@
+import bisect
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+
+class MembershipSnapshot:
+    """
+    Immutable, versioned view of the cluster membership.
+
+    `devices` maps ip -> read-only device dict and `order` holds the IPs in
+    ring order. Readers can keep and iterate a snapshot without locking;
+    writers never mutate one, they publish a new one.
+    """
+
+    __slots__ = ("version", "devices", "order", "_ring")
+
+    def __init__(self, version: int, devices: Mapping[str, Mapping[str, Any]], order: Tuple[str, ...]):
+        self.version = version
+        self.devices = devices
+        self.order = order
+        self._ring: Optional[Tuple[Dict[str, Any], ...]] = None
+
+    def __contains__(self, ip: str) -> bool:
+        return ip in self.devices
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def successor(self, ip: str) -> Optional[str]:
+        """Next IP in ring order after `ip` (which need not be a member)."""
+        if not self.order:
+            return None
+        idx = bisect.bisect_right(self.order, ip)
+        return self.order[idx % len(self.order)]
+
+    def ring_topology(self) -> Tuple[Dict[str, Any], ...]:
+        """Ring positions for this version (computed once, then cached)."""
+        if self._ring is None:
+            self._ring = tuple(
+                {
+                    "position": idx + 1,
+                    "ip": ip,
+                    "name": self.devices[ip]["name"],
+                    "resource_score": self.devices[ip]["resource_score"],
+                }
+                for idx, ip in enumerate(self.order)
+            )
+        return self._ring
+
+
+class MembershipStore:
+    """
+    Thread-safe membership table:
+    - writes (upsert/remove/clear) are serialized by one lock and each
+      structural change publishes a new MembershipSnapshot
+    - the ring order is a sorted index maintained with bisect on add/remove
+      instead of a full re-sort
+    - liveness timestamps (`last_seen`) are kept outside the snapshot so a
+      beacon does not create a new version
+    - subscribers are called with (event, snapshot) after every change,
+      where event = {"type": "added"|"updated"|"removed"|"cleared", "ip", "version"}
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._devices: Dict[str, Mapping[str, Any]] = {}
+        self._order: List[str] = []
+        self._last_seen: Dict[str, int] = {}
+        self._subscribers: List[Callable[[Dict[str, Any], MembershipSnapshot], None]] = []
+        self._snapshot = MembershipSnapshot(0, MappingProxyType({}), ())
+
+    # ------------------------------------------
+    # Readers (lock-free)
+    # ------------------------------------------
+
+    def snapshot(self) -> MembershipSnapshot:
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def last_seen(self, ip: str) -> Optional[int]:
+        return self._last_seen.get(ip)
+
+    def devices(self) -> List[Dict[str, Any]]:
+        """Device dicts (with current last_seen) for JSON responses."""
+        snap = self._snapshot
+        return [dict(snap.devices[ip], last_seen=self._last_seen.get(ip, 0)) for ip in snap.order]
+
+    # ------------------------------------------
+    # Writers
+    # ------------------------------------------
+
+    def subscribe(self, callback: Callable[[Dict[str, Any], MembershipSnapshot], None]) -> None:
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def upsert(self, ip: str, name: str, score: int, role: str, update_score: bool = True) -> None:
+        """Record a beacon / membership update. Only attribute changes create a new version."""
+        now = int(time.time())
+        with self._lock:
+            self._last_seen[ip] = now
+            current = self._devices.get(ip)
+            if current is None:
+                device = {"name": name, "ip": ip, "resource_score": score, "my_role": role}
+                bisect.insort(self._order, ip)
+                event_type = "added"
+            else:
+                device = dict(current, my_role=role)
+                if update_score:
+                    device["resource_score"] = score
+                if device == current:
+                    return
+                event_type = "updated"
+            self._devices[ip] = MappingProxyType(device)
+            event, snapshot, subscribers = self._publish(event_type, ip)
+        self._notify(subscribers, event, snapshot)
+
+    def remove(self, ip: str) -> Optional[Mapping[str, Any]]:
+        with self._lock:
+            device = self._devices.pop(ip, None)
+            self._last_seen.pop(ip, None)
+            if device is None:
+                return None
+            idx = bisect.bisect_left(self._order, ip)
+            if idx < len(self._order) and self._order[idx] == ip:
+                del self._order[idx]
+            event, snapshot, subscribers = self._publish("removed", ip)
+        self._notify(subscribers, event, snapshot)
+        return device
+
+    def clear(self) -> None:
+        with self._lock:
+            self._devices.clear()
+            self._order.clear()
+            self._last_seen.clear()
+            event, snapshot, subscribers = self._publish("cleared", None)
+        self._notify(subscribers, event, snapshot)
+
+    def _publish(self, event_type: str, ip: Optional[str]):
+        # lock held
+        version = self._snapshot.version + 1
+        self._snapshot = MembershipSnapshot(version, MappingProxyType(dict(self._devices)), tuple(self._order))
+        event = {"type": event_type, "ip": ip, "version": version}
+        return event, self._snapshot, list(self._subscribers)
+
+    @staticmethod
+    def _notify(subscribers, event, snapshot) -> None:
+        for callback in subscribers:
+            try:
+                callback(event, snapshot)
+            except Exception as e:
+                print(f"[MembershipStore] subscriber failed: {e}")
@@ -0,0 +1,214 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+# Longest a profiling session may run, whatever was requested
+MAX_DURATION = 300.0
+MAX_DEPTH = 64
+# Other processes (worker.py) exchange requests and stacks through here
+PROFILE_DIR = "profiles"
+CONTROL_FILENAME = "control.json"
+
+
+class SamplingProfiler:
+    """
+    Opt-in statistical profiler for request handlers and background loops:
+    - code marks the threads worth sampling with profiled(label) (a
+      decorator or context manager) or track()/untrack(); when the
+      profiler is off this costs one dict write per call
+    - start() runs a sampler thread for at most `duration` seconds that
+      reads every tracked thread's stack each `interval` (scope="all"
+      samples every thread instead, labelled by thread name)
+    - samples are aggregated as collapsed stacks ("label;outer;inner N"),
+      the input of flamegraph.pl, speedscope and similar tools
+    """
+
+    def __init__(self):
+        self._tracked: Dict[int, str] = {}
+        self._stacks: Counter = Counter()
+        self._frame_names: Dict[Any, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.interval = 0.005
+        self.scope = "tracked"
+        self.started_at: Optional[float] = None
+        self.until: Optional[float] = None
+        self.samples = 0
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def track(self, label: str) -> Optional[str]:
+        """Sample the calling thread under `label`; returns the label it had before."""
+        ident = threading.get_ident()
+        previous = self._tracked.get(ident)
+        self._tracked[ident] = label
+        return previous
+
+    def untrack(self, previous: Optional[str] = None) -> None:
+        ident = threading.get_ident()
+        if previous is None:
+            self._tracked.pop(ident, None)
+        else:
+            self._tracked[ident] = previous
+
+    def profiled(self, label: str):
+        """Decorator / context manager marking the code inside as sampled under `label`."""
+        return _Profiled(self, label)
+
+    def start(self, duration: float = 30.0, interval: float = 0.005, scope: str = "tracked") -> Dict[str, Any]:
+        """Start (or restart) sampling; earlier stacks are discarded."""
+        if scope not in ("tracked", "all"):
+            raise ValueError("scope must be 'tracked' or 'all'")
+        self.stop()
+        duration = min(max(float(duration), 0.1), MAX_DURATION)
+        with self._lock:
+            self._stacks = Counter()
+            self.samples = 0
+        self.interval = max(float(interval), 0.001)
+        self.scope = scope
+        self.started_at = time.time()
+        self.until = self.started_at + duration
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            if thread is not threading.current_thread():
+                thread.join()
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            distinct = len(self._stacks)
+        return {
+            "active": self.active,
+            "scope": self.scope,
+            "interval": self.interval,
+            "started_at": self.started_at,
+            "until": self.until,
+            "samples": self.samples,
+            "distinct_stacks": distinct,
+            "tracked_threads": sorted(set(self._tracked.values())),
+        }
+
+    def collapsed(self, prefix: str = "") -> str:
+        """Aggregated stacks, one "frame;frame;... count" line each, hottest first."""
+        with self._lock:
+            stacks = self._stacks.most_common()
+        head = prefix + ";" if prefix else ""
+        return "".join(f"{head}{stack} {count}\n" for stack, count in stacks)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.is_set() and time.time() < self.until:
+            started = time.perf_counter()
+            frames = sys._current_frames()
+            if self.scope == "all":
+                names = {t.ident: t.name for t in threading.enumerate()}
+                targets = {ident: self._tracked.get(ident) or names.get(ident, str(ident))
+                           for ident in frames if ident != own}
+            else:
+                targets = {ident: label for ident, label in list(self._tracked.items()) if ident in frames}
+            collapsed = [label + ";" + self._collapse(frames[ident]) for ident, label in targets.items()]
+            del frames
+            with self._lock:
+                self._stacks.update(collapsed)
+                self.samples += 1
+            self._stop.wait(max(0.0, self.interval - (time.perf_counter() - started)))
+
+    def _collapse(self, frame) -> str:
+        names: List[str] = []
+        while frame is not None and len(names) < MAX_DEPTH:
+            code = frame.f_code
+            name = self._frame_names.get(code)
+            if name is None:
+                name = self._frame_names[code] = (
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+                )
+            names.append(name)
+            frame = frame.f_back
+        names.reverse()
+        return ";".join(names)
+
+    def follow(self, control_path: str, output_path: str, poll: float = 1.0) -> threading.Thread:
+        """
+        For a process without the admin endpoint (worker.py): apply the
+        start/stop requests the API writes to `control_path`, and write the
+        stacks to `output_path` while sampling and when it ends.
+        """
+        def loop():
+            seen = None
+            written = 0
+            while True:
+                try:
+                    mtime = os.path.getmtime(control_path)
+                    if mtime != seen:
+                        seen = mtime
+                        with open(control_path, "r") as f:
+                            request = json.load(f)
+                        if request.get("action") == "start" and time.time() < request.get("until", 0):
+                            self.start(request["until"] - time.time(), request.get("interval", 0.005),
+                                       request.get("scope", "tracked"))
+                        else:
+                            self.stop()
+                except (OSError, ValueError, KeyError):
+                    pass
+                if self.samples != written:
+                    written = self.samples
+                    try:
+                        tmp_path = output_path + ".tmp"
+                        with open(tmp_path, "w") as f:
+                            f.write(self.collapsed())
+                        os.replace(tmp_path, output_path)
+                    except OSError:
+                        pass
+                time.sleep(poll)
+
+        thread = threading.Thread(target=loop, name="profiler-control", daemon=True)
+        thread.start()
+        return thread
+
+
+class _Profiled:
+    __slots__ = ("_profiler", "_label", "_previous")
+
+    def __init__(self, profiler: SamplingProfiler, label: str):
+        self._profiler = profiler
+        self._label = label
+
+    def __enter__(self):
+        self._previous = self._profiler.track(self._label)
+        return self
+
+    def __exit__(self, *exc):
+        self._profiler.untrack(self._previous)
+        return False
+
+    def __call__(self, func: Callable) -> Callable:
+        profiler, label = self._profiler, self._label
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            previous = profiler.track(label)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.untrack(previous)
+        return wrapper
+
+
+# One per process: the API and its services, or worker.py
+profiler = SamplingProfiler()
+profiled = profiler.profiled
@@ -0,0 +1,47 @@
+import heapq
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+def plan_reassignment(
+    jobs: Dict[str, List[Any]],
+    lost_worker: str,
+    received: Iterable[Any] = (),
+) -> Tuple[Dict[str, List[Any]], Dict[str, List[Any]]]:
+    """
+    Hand a lost worker's frames to the survivors. Returns (new jobs, frames
+    added per survivor).
+    - only frames the leader has not received move; frames the lost worker
+      already delivered stay delivered
+    - survivors keep their own frames (including the ones they are rendering
+      right now), so nothing is assigned twice
+    - each frame goes to the survivor with the least outstanding work
+      (assigned and not yet received), and each survivor's share is a
+      contiguous run of the lost frames, in survivor order
+    """
+    received = set(received)
+    missing = [frame for frame in jobs.get(lost_worker) or [] if frame not in received]
+    survivors = [worker for worker in jobs if worker != lost_worker]
+    new_jobs = {worker: list(jobs[worker]) for worker in survivors}
+    if not missing or not survivors:
+        return new_jobs, {}
+
+    # Water-fill: the least loaded survivor takes the next frame
+    heap = [
+        (sum(1 for frame in jobs[worker] if frame not in received), i, worker)
+        for i, worker in enumerate(survivors)
+    ]
+    heapq.heapify(heap)
+    counts = dict.fromkeys(survivors, 0)
+    for _ in missing:
+        load, i, worker = heapq.heappop(heap)
+        counts[worker] += 1
+        heapq.heappush(heap, (load + 1, i, worker))
+
+    added = {}
+    start = 0
+    for worker in survivors:
+        if counts[worker]:
+            added[worker] = missing[start:start + counts[worker]]
+            new_jobs[worker].extend(added[worker])
+            start += counts[worker]
+    return new_jobs, added
@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import psutil
+
+
+class ResourceSampler:
+    """
+    Background host resource sampler:
+    - samples CPU, memory, disk and load average every `interval` seconds
+    - smooths every value with an EWMA (weight `alpha` for the newest sample)
+    - publishes a new snapshot dict on every tick; readers never block
+
+    The snapshot is replaced wholesale and never mutated in place, so a
+    plain attribute read is always a consistent view without a lock.
+    """
+
+    def __init__(self, interval: float = 1.0, alpha: float = 0.3, disk_path: str = "/"):
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+
+        self.interval = interval
+        self.alpha = alpha
+        self.disk_path = disk_path
+
+        self._thread: Optional[threading.Thread] = None
+        self._running = threading.Event()
+        self._wakeup = threading.Event()
+        self._smoothed: Dict[str, float] = {}
+        self._samples = 0
+
+        # Prime cpu_percent so the first non-blocking call has a baseline
+        try:
+            psutil.cpu_percent(interval=None)
+        except Exception:
+            pass
+
+        self._snapshot: Dict[str, Any] = self._build_snapshot(self._read_raw())
+
+    def start(self) -> None:
+        if self._running.is_set():
+            return
+        self._running.set()
+        self._wakeup.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running.clear()
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=self.interval + 1)
+        self._thread = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Latest smoothed snapshot. Treat the returned dict as read-only."""
+        return self._snapshot
+
+    def resource_score(self) -> int:
+        """Composite ID component: Resource_Score, computed from smoothed values."""
+        return self._snapshot["resource_score"]
+
+    def _run(self) -> None:
+        while self._running.is_set():
+            try:
+                self._snapshot = self._build_snapshot(self._read_raw())
+            except Exception as e:
+                print(f"[ResourceSampler] sample failed: {e}")
+            self._wakeup.wait(self.interval)
+
+    def _read_raw(self) -> Dict[str, float]:
+        raw: Dict[str, float] = {}
+        try:
+            raw["cpu_usage"] = psutil.cpu_percent(interval=None)
+        except Exception:
+            pass
+        try:
+            mem = psutil.virtual_memory()
+            raw["memory_total"] = mem.total
+            raw["memory_used"] = mem.used
+            raw["memory_available"] = mem.available
+        except Exception:
+            pass
+        try:
+            disk = psutil.disk_usage(self.disk_path)
+            raw["disk_total"] = disk.total
+            raw["disk_free"] = disk.free
+            raw["disk_usage"] = disk.percent
+        except Exception:
+            pass
+        try:
+            raw["load_1m"] = os.getloadavg()[0] if hasattr(os, "getloadavg") else psutil.getloadavg()[0]
+        except Exception:
+            pass
+        return raw
+
+    def _build_snapshot(self, raw: Dict[str, float]) -> Dict[str, Any]:
+        for key, value in raw.items():
+            prev = self._smoothed.get(key)
+            self._smoothed[key] = value if prev is None else self.alpha * value + (1 - self.alpha) * prev
+        self._samples += 1
+
+        s = self._smoothed
+        memory_total = s.get("memory_total", 0)
+        memory_used = s.get("memory_used", 0)
+
+        return {
+            "cpu_usage": round(s.get("cpu_usage", 0.0), 2),
+            "memory_total": int(memory_total),
+            "memory_used": int(memory_used),
+            "memory_available": int(s.get("memory_available", 0)),
+            "memory_usage": (memory_used / memory_total) * 100 if memory_total else 0.0,
+            "disk_total": int(s.get("disk_total", 0)),
+            "disk_free": int(s.get("disk_free", 0)),
+            "disk_usage": round(s.get("disk_usage", 0.0), 2),
+            "load_1m": round(s.get("load_1m", 0.0), 2),
+            "resource_score": self._score(s),
+            "samples": self._samples,
+            "sampled_at": time.time(),
+        }
+
+    @staticmethod
+    def _score(s: Dict[str, float]) -> int:
+        if "cpu_usage" not in s and "memory_available" not in s:
+            return 10
+        disk_score = s.get("disk_free", 0) / (1024**3) * 50  # GB * 50
+        ram_score = s.get("memory_available", 0) / (1024**3) * 30  # GB * 30
+        cpu_score = (100 - s.get("cpu_usage", 100)) * 30
+        return int(ram_score + cpu_score + disk_score)
@@ -1,8 +1,294 @@
+import asyncio
 import json
 import socket
+import struct
 import threading
 import time
-from typing import Callable, Dict, Optional, Tuple, Any, List
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Iterator, Optional, Tuple, Any, List
+
+from backend.services import metrics
+from backend.services.event_loop import EventLoopThread, shared_loop
+
+# Wire protocol versions:
+#   1 - one compact JSON document per line
+#   2 - 4-byte big-endian length prefix + compact JSON body
+# A connection starts in v1: the worker's HELLO carries the highest version it
+# speaks and the leader's SYNC reply picks one. Everything after SYNC uses it.
+PROTOCOL_VERSION = 2
+MAX_FRAME = 16 * 1024 * 1024
+
+_LENGTH = struct.Struct(">I")
+# Kernel-side backpressure only matters once this much is buffered in user space
+_HIGH_WATER = 64 * 1024
+# Gaps listed in one NACK; anything beyond is requested by the next one
+MAX_NACK_RANGES = 64
+
+_MESSAGES = metrics.counter(
+    "renderfarm_control_messages_total",
+    "Sequenced control messages: sent (sequenced by the leader), retransmitted, received (delivered in order)",
+    ("direction",),
+)
+_SENT = _MESSAGES.labels("sent")
+_RETRANSMITTED = _MESSAGES.labels("retransmitted")
+_RECEIVED = _MESSAGES.labels("received")
+_NACKS = metrics.counter("renderfarm_control_nacks_total", "NACKs sent by this worker for gaps in the sequence")
+
+
+def _body(msg: Dict[str, Any]) -> bytes:
+    return json.dumps(msg, separators=(",", ":")).encode("utf-8")
+
+
+def _frame(body: bytes, proto: int) -> bytes:
+    if proto >= 2:
+        return _LENGTH.pack(len(body)) + body
+    return body + b"\n"
+
+
+def _encode(msg: Dict[str, Any], proto: int = 1) -> bytes:
+    return _frame(_body(msg), proto)
+
+
+class _FrameReader:
+    """
+    Incremental decoder for one connection over a single reusable bytearray.
+    Complete messages are parsed in place and consumed bytes are dropped once
+    per read, not once per message. `framed` can be flipped between messages
+    (after protocol negotiation).
+    """
+
+    def __init__(self):
+        self.framed = False
+        self._buf = bytearray()
+
+    def feed(self, data: bytes) -> None:
+        self._buf += data
+
+    def messages(self) -> Iterator[Dict[str, Any]]:
+        buf = self._buf
+        pos = 0
+        try:
+            while True:
+                if self.framed:
+                    if len(buf) - pos < _LENGTH.size:
+                        return
+                    (size,) = _LENGTH.unpack_from(buf, pos)
+                    if size > MAX_FRAME:
+                        raise ValueError(f"frame of {size} bytes exceeds limit")
+                    end = pos + _LENGTH.size + size
+                    if end > len(buf):
+                        return
+                    body = bytes(buf[pos + _LENGTH.size:end])
+                    pos = end
+                else:
+                    idx = buf.find(b"\n", pos)
+                    if idx < 0:
+                        return
+                    body = bytes(buf[pos:idx])
+                    pos = idx + 1
+                    if not body:
+                        continue
+                try:
+                    yield json.loads(body)
+                except ValueError:
+                    # ignore malformed
+                    continue
+        finally:
+            if pos:
+                del buf[:pos]
+
+    def clear(self) -> None:
+        self._buf.clear()
+        self.framed = False
+
+
+def _set_nodelay(writer: asyncio.StreamWriter) -> None:
+    sock = writer.get_extra_info("socket")
+    if sock is not None:
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            pass
+
+
+class _ClientConnection:
+    """
+    One connected worker on the leader side, served by two coroutines on the
+    control-plane loop:
+    - a bounded outbound queue filled by broadcast_control from any thread
+      (never blocks)
+    - a writer coroutine that drains it one batch per write; during a burst
+      (previous write less than `coalesce_window` ago) it waits up to that
+      long for more messages, an idle link writes at once
+    - a reader coroutine for the worker's HELLO / NACK / ACK messages
+
+    Queued items are unframed message bodies; the writer frames them for the
+    protocol version negotiated with this worker (`proto`).
+    """
+
+    def __init__(self, control: EventLoopThread, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 addr: Tuple[str, int], max_queue: int, max_lag: float,
+                 on_line: Callable[["_ClientConnection", Dict[str, Any]], None],
+                 on_dead: Callable[["_ClientConnection"], None],
+                 coalesce_window: float = 0.0005, max_batch: int = 256):
+        self.addr = addr
+        self.max_queue = max_queue
+        self.max_lag = max_lag
+        self.coalesce_window = coalesce_window
+        self.max_batch = max_batch
+        self.proto = 1
+        self._control = control
+        self._reader = reader
+        self._writer = writer
+        self._on_line = on_line
+        self._on_dead = on_dead
+
+        self._queue: Deque[Tuple[int, bytes, float]] = deque()
+        self._lock = threading.Lock()
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self.last_sent_seq = 0
+        self.retransmitted = 0
+        self.writes = 0
+        self.messages_written = 0
+        self._last_write = 0.0
+        self.connected_at = time.time()
+        # stage -> {"count", "last", "mean"} ack latency (seconds since broadcast)
+        self.ack_latency: Dict[str, Dict[str, float]] = {}
+
+    def enqueue(self, seq: int, data: bytes, force: bool = False) -> bool:
+        """
+        Queue a message body; False if the client is closed or too far behind
+        (unless forced). A negative seq marks `data` as already framed.
+        Safe to call from any thread.
+        """
+        with self._lock:
+            if self._closed:
+                return False
+            if not force:
+                if len(self._queue) >= self.max_queue:
+                    return False
+                if self._queue and time.monotonic() - self._queue[0][2] > self.max_lag:
+                    return False
+            wake = not self._queue
+            self._queue.append((seq, data, time.monotonic()))
+        if wake:
+            self._control.call_soon(self._wakeup.set)
+        return True
+
+    def lag(self) -> float:
+        """Age in seconds of the oldest message not yet written to the socket."""
+        with self._lock:
+            return (time.monotonic() - self._queue[0][2]) if self._queue else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queued = len(self._queue)
+            lag = (time.monotonic() - self._queue[0][2]) if self._queue else 0.0
+            ack_latency = {stage: dict(v) for stage, v in self.ack_latency.items()}
+        return {
+            "ip": self.addr[0],
+            "port": self.addr[1],
+            "queued": queued,
+            "lag": round(lag, 4),
+            "last_sent_seq": self.last_sent_seq,
+            "retransmitted": self.retransmitted,
+            "proto": self.proto,
+            "messages_per_write": round(self.messages_written / self.writes, 2) if self.writes else 0.0,
+            "ack_latency": ack_latency,
+            "connected_at": self.connected_at,
+        }
+
+    def record_ack(self, stage: str, latency: float) -> None:
+        with self._lock:
+            entry = self.ack_latency.setdefault(stage, {"count": 0, "last": 0.0, "mean": 0.0})
+            entry["count"] += 1
+            entry["last"] = round(latency, 4)
+            entry["mean"] = round(entry["mean"] + (latency - entry["mean"]) / entry["count"], 4)
+
+    def close(self) -> None:
+        """Drop the connection (from any thread)."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.clear()
+        self._control.call_soon(self._abort)
+
+    def _abort(self) -> None:
+        # loop thread
+        self._wakeup.set()
+        transport = self._writer.transport
+        if transport is not None and not transport.is_closing():
+            transport.abort()
+
+    async def serve(self) -> None:
+        writer_task = asyncio.ensure_future(self._write_loop())
+        try:
+            await self._read_loop()
+        finally:
+            writer_task.cancel()
+            if not self._closed:
+                self.close()
+                self._on_dead(self)
+
+    async def _write_loop(self) -> None:
+        try:
+            while not self._closed:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+
+                # In a burst, give broadcasts a moment to pile up into one write
+                if (time.monotonic() - self._last_write < self.coalesce_window
+                        and len(self._queue) < self.max_batch):
+                    await asyncio.sleep(self.coalesce_window)
+
+                while not self._closed:
+                    with self._lock:
+                        batch = [self._queue[i] for i in range(min(len(self._queue), self.max_batch))]
+                        proto = self.proto
+                    if not batch:
+                        break
+                    self._writer.write(b"".join(
+                        item[1] if item[0] < 0 else _frame(item[1], proto) for item in batch
+                    ))
+                    if self._writer.transport.get_write_buffer_size() > _HIGH_WATER:
+                        # A write stalled for longer than max_lag drops the client
+                        await asyncio.wait_for(self._writer.drain(), self.max_lag)
+                    with self._lock:
+                        for _ in range(min(len(batch), len(self._queue))):
+                            self._queue.popleft()
+                        self.last_sent_seq = max(self.last_sent_seq, max(item[0] for item in batch))
+                        self.writes += 1
+                        self.messages_written += len(batch)
+                        self._last_write = time.monotonic()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if not self._closed:
+                self.close()
+                self._on_dead(self)
+
+    async def _read_loop(self) -> None:
+        frames = _FrameReader()
+        while not self._closed:
+            try:
+                data = await self._reader.read(65536)
+            except Exception:
+                return
+            if not data:
+                return
+            frames.feed(data)
+            try:
+                for msg in frames.messages():
+                    try:
+                        self._on_line(self, msg)
+                    except Exception:
+                        pass
+                    frames.framed = self.proto >= 2
+            except ValueError:
+                return
 
 
 class SequencerServer:
@@ -11,128 +297,302 @@ class SequencerServer:
     - accepts TCP connections from workers
     - assigns a global increasing sequence number to each control message
     - broadcasts messages to all connected workers
+
+    All connections are coroutines on the shared control-plane event loop,
+    so the thread count does not grow with the number of workers. Each worker
+    has its own bounded send queue, so broadcast_control returns as soon as
+    the message is sequenced and queued. A worker whose queue is full, or
+    whose oldest unsent message is older than `max_lag` seconds, is
+    disconnected (it reconnects and catches up).
+
+    Every stream is tagged with the leader `epoch`. The last `log_size`
+    messages are kept for retransmission:
+    - a worker opens with HELLO {epoch, last_seq}; the server answers SYNC
+      {epoch, next} and replays the log from there (or from seq 1 if the
+      worker was following another epoch)
+    - a worker that sees gaps sends NACK {epoch, from, to, ranges} and the
+      missing messages are re-sent to it alone
+
+    Each worker negotiates the wire format in its HELLO (see
+    PROTOCOL_VERSION); workers that do not send a version keep JSON lines.
+
+    Messages broadcast with ack=True ask workers to answer ACK {epoch, seq,
+    stage}: "delivered" when received, "applied" once the worker has acted
+    on it. wait_for_acks blocks until enough workers reached a stage.
     """
 
-    def __init__(self, host: str, port: int = 8890):
+    def __init__(self, host: str, port: int = 8890, max_queue: int = 1024, max_lag: float = 5.0,
+                 epoch: int = 0, log_size: int = 4096, coalesce_window: float = 0.0005,
+                 max_batch: int = 256, max_proto: int = PROTOCOL_VERSION,
+                 control: Optional[EventLoopThread] = None):
         self.host = host
         self.port = port
-
-        self._server_sock: Optional[socket.socket] = None
-        self._accept_thread: Optional[threading.Thread] = None
+        self.max_queue = max_queue
+        self.max_lag = max_lag
+        self.epoch = epoch
+        self.coalesce_window = coalesce_window
+        self.max_batch = max_batch
+        self.max_proto = max_proto
+
+        self._control = control or shared_loop()
+        self._server: Optional[asyncio.AbstractServer] = None
         self._running = threading.Event()
 
         self._clients_lock = threading.Lock()
-        self._clients: List[Tuple[socket.socket, Tuple[str, int]]] = []
+        self._clients: List[_ClientConnection] = []
+        self._pending: List[_ClientConnection] = []
 
         self._seq_lock = threading.Lock()
         self._next_seq = 1
+        self._log: Deque[Tuple[int, bytes]] = deque(maxlen=log_size)
+
+        # seq -> broadcast time and stage -> {ip: latency}, for ack=True messages
+        self._ack_cond = threading.Condition()
+        self._ack_sent_at: Dict[int, float] = {}
+        self._acks: Dict[int, Dict[str, Dict[str, float]]] = {}
+        self._ack_history = 1024
 
     def start(self) -> None:
         if self._running.is_set():
             return
+        # Bind errors surface here, in the caller's thread
+        self._server = self._control.run(
+            asyncio.start_server(self._on_connect, self.host, self.port, reuse_address=True, backlog=64)
+        )
         self._running.set()
 
-        self._server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self._server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self._server_sock.bind((self.host, self.port))
-        self._server_sock.listen(64)
-
-        self._accept_thread = threading.Thread(target=self._accept_loop, daemon=True)
-        self._accept_thread.start()
-
     def stop(self) -> None:
         self._running.clear()
 
-        try:
-            if self._server_sock:
-                try:
-                    self._server_sock.shutdown(socket.SHUT_RDWR)
-                except Exception:
-                    pass
-                self._server_sock.close()
-        except Exception:
-            pass
+        server, self._server = self._server, None
+        if server is not None:
+            self._control.call_soon(server.close)
 
         with self._clients_lock:
-            for sock, _addr in self._clients:
-                try:
-                    sock.shutdown(socket.SHUT_RDWR)
-                except Exception:
-                    pass
-                try:
-                    sock.close()
-                except Exception:
-                    pass
-            self._clients.clear()
+            clients = self._clients + self._pending
+            self._clients = []
+            self._pending = []
+        for client in clients:
+            client.close()
+
+    async def _on_connect(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        _set_nodelay(writer)
+        addr = writer.get_extra_info("peername") or ("?", 0)
+        client = _ClientConnection(
+            self._control, reader, writer, addr[:2], self.max_queue, self.max_lag,
+            self._on_client_line, self._drop_client,
+            coalesce_window=self.coalesce_window, max_batch=self.max_batch,
+        )
+        # Receives broadcasts only after its HELLO has been answered
+        with self._clients_lock:
+            if not self._running.is_set():
+                writer.close()
+                return
+            self._pending.append(client)
+        await client.serve()
 
-    def _accept_loop(self) -> None:
-        while self._running.is_set():
-            try:
-                assert self._server_sock is not None
-                client_sock, addr = self._server_sock.accept()
-                client_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-                with self._clients_lock:
-                    self._clients.append((client_sock, addr))
-            except Exception:
-                # short sleep to avoid busy loop on transient errors
-                time.sleep(0.1)
+    def _drop_client(self, client: _ClientConnection) -> None:
+        with self._clients_lock:
+            self._clients = [c for c in self._clients if c is not client]
+            self._pending = [c for c in self._pending if c is not client]
+
+    def _on_client_line(self, client: _ClientConnection, msg: Dict[str, Any]) -> None:
+        kind = msg.get("type")
+        if kind == "HELLO":
+            self._on_hello(client, msg)
+        elif kind == "NACK" and msg.get("epoch") == self.epoch:
+            ranges = msg.get("ranges") or [[msg.get("from", 0), msg.get("to", 0)]]
+            self._retransmit(client, [(int(first), int(last)) for first, last in ranges[:MAX_NACK_RANGES]])
+        elif kind == "ACK" and msg.get("epoch") == self.epoch:
+            self._on_ack(client, msg.get("seq"), str(msg.get("stage") or "delivered"))
+
+    def _on_ack(self, client: _ClientConnection, seq: Any, stage: str) -> None:
+        with self._ack_cond:
+            sent_at = self._ack_sent_at.get(seq)
+            if sent_at is None:
+                return
+            by_ip = self._acks[seq].setdefault(stage, {})
+            if client.addr[0] in by_ip:
+                return
+            latency = time.monotonic() - sent_at
+            by_ip[client.addr[0]] = latency
+            self._ack_cond.notify_all()
+        client.record_ack(stage, latency)
 
-    def broadcast_control(self, msg_type: str, payload: Dict[str, Any]) -> int:
-        """Assign seq and send to all connected clients. Returns assigned seq."""
+    def _on_hello(self, client: _ClientConnection, msg: Dict[str, Any]) -> None:
+        last_seq = msg.get("last_seq") if msg.get("epoch") == self.epoch else 0
+        start = (last_seq if isinstance(last_seq, int) else 0) + 1
+
+        with self._seq_lock:
+            # Replay and registration are atomic w.r.t. broadcast_control, so the
+            # client sees the log and the live stream without holes or reordering
+            oldest = self._log[0][0] if self._log else self._next_seq
+            if start < oldest:
+                print(f"[Sequencer] {client.addr[0]} missed seq {start}..{oldest - 1} (no longer in log)")
+                start = oldest
+            start = min(start, self._next_seq)
+
+            # SYNC itself is always a v1 line; the chosen version applies after it
+            offered = msg.get("proto")
+            proto = min(offered, self.max_proto) if isinstance(offered, int) and offered > 1 else 1
+            sync = {"type": "SYNC", "epoch": self.epoch, "next": start}
+            if proto > 1:
+                sync["proto"] = proto
+            client.enqueue(-1, _encode(sync), force=True)
+            client.proto = proto
+            for seq, data in self._log:
+                if seq >= start:
+                    client.enqueue(seq, data, force=True)
+                    client.retransmitted += 1
+
+            with self._clients_lock:
+                if client in self._pending:
+                    self._pending.remove(client)
+                    self._clients.append(client)
+
+    def _retransmit(self, client: _ClientConnection, ranges: List[Tuple[int, int]]) -> None:
+        with self._seq_lock:
+            oldest = self._log[0][0] if self._log else self._next_seq
+            first = min((r[0] for r in ranges), default=oldest)
+            if first < oldest:
+                # Part of the gap fell out of the log: move the client past it
+                # instead of leaving it waiting for messages that cannot come
+                print(f"[Sequencer] {client.addr[0]} missed seq {first}..{oldest - 1} (no longer in log)")
+                sync = {"type": "SYNC", "epoch": self.epoch, "next": oldest, "proto": client.proto}
+                client.enqueue(-1, _encode(sync, client.proto), force=True)
+            # The log holds consecutive seqs, so each range is a slice of it
+            resent = 0
+            for first, last in sorted(ranges):
+                for idx in range(max(first, oldest) - oldest, min(last - oldest + 1, len(self._log))):
+                    seq, data = self._log[idx]
+                    client.enqueue(seq, data, force=True)
+                    resent += 1
+            client.retransmitted += resent
+        _RETRANSMITTED.inc(resent)
+
+    def broadcast_control(self, msg_type: str, payload: Dict[str, Any], ack: bool = False) -> int:
+        """Assign seq and queue for all connected clients. Returns assigned seq."""
+        slow: List[_ClientConnection] = []
         with self._seq_lock:
             seq = self._next_seq
             self._next_seq += 1
 
-        wire = json.dumps({
-            "seq": seq,
-            "type": msg_type,
-            "payload": payload
-        }, separators=(",", ":")) + "\n"
-        data = wire.encode("utf-8")
-
-        dead: List[Tuple[socket.socket, Tuple[str, int]]] = []
-        with self._clients_lock:
-            for sock, addr in self._clients:
-                try:
-                    sock.sendall(data)
-                except Exception:
-                    dead.append((sock, addr))
-
-            if dead:
-                for sock, _addr in dead:
-                    try:
-                        sock.close()
-                    except Exception:
-                        pass
-                self._clients = [(s, a) for (s, a) in self._clients if (s, a) not in dead]
+            msg = {
+                "epoch": self.epoch,
+                "seq": seq,
+                "type": msg_type,
+                "payload": payload
+            }
+            if ack:
+                msg["ack"] = True
+                self._track_acks(seq)
+            data = _body(msg)
+            self._log.append((seq, data))
+
+            # Enqueue under the seq lock so every client queue stays in seq order
+            with self._clients_lock:
+                for client in self._clients:
+                    if not client.enqueue(seq, data):
+                        slow.append(client)
+                if slow:
+                    self._clients = [c for c in self._clients if c not in slow]
+
+        _SENT.inc()
+        for client in slow:
+            print(f"[Sequencer] Disconnecting slow client {client.addr[0]} (lag {client.lag():.1f}s)")
+            client.close()
 
         return seq
 
-    def connected_peers(self) -> List[str]:
+    def _track_acks(self, seq: int) -> None:
+        with self._ack_cond:
+            self._ack_sent_at[seq] = time.monotonic()
+            self._acks[seq] = {}
+            while len(self._ack_sent_at) > self._ack_history:
+                oldest = min(self._ack_sent_at)
+                self._ack_sent_at.pop(oldest)
+                self._acks.pop(oldest, None)
+
+    def acks(self, seq: int, stage: str = "applied") -> Dict[str, float]:
+        """ip -> ack latency (seconds) of the workers that reached `stage` for `seq`."""
+        with self._ack_cond:
+            return dict(self._acks.get(seq, {}).get(stage, {}))
+
+    def wait_for_acks(self, seq: int, ips: List[str], stage: str = "applied",
+                      timeout: float = 10.0, quorum: Optional[int] = None) -> Dict[str, float]:
+        """
+        Block until `quorum` of `ips` (default: all) acked `seq` at `stage`, or
+        until timeout. Returns ip -> latency for the workers that did.
+        """
+        needed = len(ips) if quorum is None else min(quorum, len(ips))
+        wanted = set(ips)
+        deadline = time.monotonic() + timeout
+        with self._ack_cond:
+            while True:
+                acked = {ip: lat for ip, lat in self._acks.get(seq, {}).get(stage, {}).items() if ip in wanted}
+                remaining = deadline - time.monotonic()
+                if len(acked) >= needed or remaining <= 0:
+                    return acked
+                self._ack_cond.wait(remaining)
+
+    def connected_peers(self) -> List[Dict[str, Any]]:
+        """Connected workers with their send-queue depth and lag (seconds)."""
         with self._clients_lock:
-            return [addr[0] for _sock, addr in self._clients]
+            clients = list(self._clients)
+        return [client.stats() for client in clients]
+
+    def log_range(self) -> Tuple[int, int]:
+        """(oldest, newest) seq still available for retransmission; (0, 0) if empty."""
+        with self._seq_lock:
+            return (self._log[0][0], self._log[-1][0]) if self._log else (0, 0)
 
 
 class SequencedClient:
     """
-    Worker-side sequenced receiver:
-    - connects to leader via TCP
-    - receives JSON lines containing {seq,type,payload}
-    - buffers out-of-order messages until gaps are filled
-    - dispatches messages strictly in seq order
+    Worker-side sequenced receiver, a coroutine on the shared control-plane
+    event loop:
+    - connects to leader via TCP and announces (epoch, last delivered seq)
+    - receives {epoch,seq,type,payload} messages as JSON lines or, once the
+      leader agreed in SYNC, as length-prefixed frames
+    - buffers out-of-order messages and NACKs gaps until they are filled
+    - dispatches messages strictly in seq order, on one dispatcher thread so
+      slow handlers (file I/O) never stall the loop
+    - starts a fresh stream when the leader's epoch changes
+    - answers ack=True messages with ACK "delivered"; the application sends
+      "applied" itself through ack() once it has acted on the message
+    - sends nothing on a new connection until SYNC has settled the protocol
+      version: ACKs wait for it, gaps are NACKed after it
     """
 
-    def __init__(self, leader_host: str, leader_port: int = 8890, on_message: Optional[Callable[[Dict[str, Any]], None]] = None):
+    def __init__(self, leader_host: str, leader_port: int = 8890, on_message: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 nack_interval: float = 0.2, max_proto: int = PROTOCOL_VERSION,
+                 control: Optional[EventLoopThread] = None):
         self.leader_host = leader_host
         self.leader_port = leader_port
         self.on_message = on_message
-
-        self._sock: Optional[socket.socket] = None
-        self._thread: Optional[threading.Thread] = None
+        self.nack_interval = nack_interval
+        self.max_proto = max_proto
+        self.proto = 1
+
+        self._control = control or shared_loop()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        # Loop thread only: SYNC handled on the current connection, and what waits for it
+        self._synced = False
+        self._unsent: Deque[Dict[str, Any]] = deque(maxlen=1024)
+        self._frames = _FrameReader()
+        self._task = None
+        self._dispatcher: Optional[ThreadPoolExecutor] = None
         self._running = threading.Event()
 
+        self._epoch: Optional[int] = None
         self._next_expected = 1
         self._buffer: Dict[int, Dict[str, Any]] = {}
+        self._ready: List[Dict[str, Any]] = []
+        self._last_nack = 0.0
+        self._nacked_upto = 0
+        self._max_buffered = 0
+        self._nacks_sent = 0
+        self._gaps_repaired = 0
 
         self._lock = threading.Lock()
 
@@ -140,90 +600,234 @@ class SequencedClient:
         if self._running.is_set():
             return
         self._running.set()
-        self._thread = threading.Thread(target=self._run, daemon=True)
-        self._thread.start()
+        self._dispatcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="control-dispatch")
+        self._task = self._control.submit(self._run())
 
     def stop(self) -> None:
         self._running.clear()
-        try:
-            if self._sock:
-                try:
-                    self._sock.shutdown(socket.SHUT_RDWR)
-                except Exception:
-                    pass
-                self._sock.close()
-        except Exception:
-            pass
-        self._sock = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._control.call_soon(self._disconnect)
+        if self._dispatcher is not None:
+            self._dispatcher.shutdown(wait=False)
 
         with self._lock:
             self._buffer.clear()
 
-    def _connect(self) -> Optional[socket.socket]:
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "leader": self.leader_host,
+                "connected": self._writer is not None,
+                "epoch": self._epoch,
+                "proto": self.proto,
+                "last_delivered_seq": self._next_expected - 1,
+                "buffered": len(self._buffer),
+                "nacks_sent": self._nacks_sent,
+                "gaps_repaired": self._gaps_repaired,
+            }
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    def ack(self, seq: int, stage: str = "applied", epoch: Optional[int] = None) -> None:
+        """Acknowledge an ack=True message to the leader (no-op while disconnected)."""
+        self._send({"type": "ACK", "epoch": self._epoch if epoch is None else epoch, "seq": seq, "stage": stage})
+
+    def _send(self, msg: Dict[str, Any]) -> None:
+        # Any thread; encoded and written on the loop, in the version SYNC agreed
+        self._control.call_soon(self._write, msg)
+
+    def _write(self, msg: Dict[str, Any]) -> None:
+        # loop thread
+        if not self._synced:
+            self._unsent.append(msg)
+            return
+        writer = self._writer
+        if writer is not None and not writer.is_closing():
+            writer.write(_encode(msg, self.proto))
+
+    def _disconnect(self) -> None:
+        # loop thread
+        self._synced = False
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+
+    async def _connect(self) -> Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]:
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-            sock.settimeout(5)
-            sock.connect((self.leader_host, self.leader_port))
-            sock.settimeout(None)
-            return sock
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.leader_host, self.leader_port), 5
+            )
         except Exception:
             return None
-
-    def _run(self) -> None:
-        buf = b""
-        while self._running.is_set():
-            if self._sock is None:
-                self._sock = self._connect()
-                if self._sock is None:
-                    time.sleep(1.0)
+        _set_nodelay(writer)
+        with self._lock:
+            hello = {"type": "HELLO", "epoch": self._epoch, "last_seq": self._next_expected - 1}
+        if self.max_proto > 1:
+            hello["proto"] = self.max_proto
+        self.proto = 1
+        self._synced = False
+        self._frames.clear()
+        writer.write(_encode(hello))
+        self._writer = writer
+        return reader, writer
+
+    async def _run(self) -> None:
+        frames = self._frames
+        # Outstanding gaps are re-NACKed every nack_interval while the stream is idle
+        nack_timer = asyncio.ensure_future(self._nack_loop())
+        try:
+            while self._running.is_set():
+                conn = await self._connect()
+                if conn is None:
+                    await asyncio.sleep(1.0)
                     continue
+                reader, _writer = conn
 
-            try:
-                chunk = self._sock.recv(4096)
-                if not chunk:
-                    # leader closed
-                    self.stop()
-                    continue
-                buf += chunk
-                while b"\n" in buf:
-                    line, buf = buf.split(b"\n", 1)
-                    if not line:
-                        continue
-                    try:
-                        msg = json.loads(line.decode("utf-8"))
-                        self._handle(msg)
-                    except Exception:
-                        # ignore malformed
-                        continue
-            except Exception:
-                self.stop()
-                time.sleep(1.0)
+                try:
+                    while self._running.is_set():
+                        data = await reader.read(65536)
+                        if not data:
+                            # leader closed; reconnect and resume from the last delivered seq
+                            break
+                        frames.feed(data)
+                        for msg in frames.messages():
+                            try:
+                                self._handle(msg)
+                            except Exception:
+                                pass
+                            frames.framed = self.proto >= 2
+                        self._flush_ready()
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    pass
+                self._disconnect()
+                await asyncio.sleep(0.5)
+        finally:
+            nack_timer.cancel()
+            self._disconnect()
+
+    async def _nack_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.nack_interval)
+            self._maybe_nack()
 
     def _handle(self, msg: Dict[str, Any]) -> None:
+        if msg.get("type") == "SYNC":
+            self._sync(msg)
+            return
+
         seq = msg.get("seq")
         if not isinstance(seq, int):
             return
 
+        if msg.get("ack"):
+            # Duplicates are acked too: the first ACK may have been lost with the connection
+            self.ack(seq, "delivered", msg.get("epoch"))
+
         with self._lock:
-            if seq < self._next_expected:
+            if msg.get("epoch") != self._epoch or seq < self._next_expected:
                 return
 
             if seq != self._next_expected:
                 self._buffer[seq] = msg
-                return
+                self._max_buffered = max(self._max_buffered, seq)
+            else:
+                had_gap = bool(self._buffer)
+                self._dispatch(msg)
+                self._next_expected += 1
 
-            # seq == next_expected
-            self._dispatch(msg)
-            self._next_expected += 1
+                while self._next_expected in self._buffer:
+                    nxt = self._buffer.pop(self._next_expected)
+                    self._dispatch(nxt)
+                    self._next_expected += 1
+                if had_gap and not self._buffer:
+                    self._gaps_repaired += 1
 
-            while self._next_expected in self._buffer:
-                nxt = self._buffer.pop(self._next_expected)
-                self._dispatch(nxt)
-                self._next_expected += 1
+        self._maybe_nack()
+
+    def _sync(self, msg: Dict[str, Any]) -> None:
+        with self._lock:
+            epoch, nxt = msg.get("epoch"), msg.get("next")
+            if epoch != self._epoch:
+                print(f"[Sequencer] Following leader epoch {epoch} (was {self._epoch})")
+                self._epoch = epoch
+                self._buffer.clear()
+                self._max_buffered = self._nacked_upto = 0
+            if isinstance(nxt, int):
+                self._next_expected = nxt
+                self._buffer = {s: m for s, m in self._buffer.items() if s >= nxt}
+                while self._next_expected in self._buffer:
+                    self._dispatch(self._buffer.pop(self._next_expected))
+                    self._next_expected += 1
+            proto = msg.get("proto")
+            self.proto = min(proto, self.max_proto) if isinstance(proto, int) else 1
+        if not self._synced:
+            self._synced = True
+            while self._unsent:
+                self._write(self._unsent.popleft())
+
+    def _maybe_nack(self) -> None:
+        # Gaps that opened since the last NACK are requested right away; all
+        # outstanding gaps are requested again once every nack_interval
+        if not self._synced:
+            return
+        with self._lock:
+            if not self._buffer:
+                return
+            now = time.monotonic()
+            if now - self._last_nack >= self.nack_interval:
+                start = self._next_expected
+            elif self._max_buffered - 1 > self._nacked_upto:
+                start = max(self._next_expected, self._nacked_upto + 1)
+            else:
+                return
+            ranges = self._missing_ranges(start)
+            if not ranges:
+                return
+            if start == self._next_expected:
+                self._last_nack = now
+            self._nacked_upto = max(self._nacked_upto, ranges[-1][1])
+            self._nacks_sent += 1
+            nack = {"type": "NACK", "epoch": self._epoch, "from": ranges[0][0], "to": ranges[0][1], "ranges": ranges}
+        _NACKS.inc()
+        self._send(nack)
+
+    def _missing_ranges(self, start: int) -> List[List[int]]:
+        # lock held; [first, last] runs of seqs below the highest buffered one
+        ranges: List[List[int]] = []
+        seq = start
+        while seq < self._max_buffered and len(ranges) < MAX_NACK_RANGES:
+            if seq in self._buffer:
+                seq += 1
+                continue
+            first = seq
+            while seq < self._max_buffered and seq not in self._buffer:
+                seq += 1
+            ranges.append([first, seq - 1])
+        return ranges
 
     def _dispatch(self, msg: Dict[str, Any]) -> None:
-        if self.on_message:
+        # lock held; handed to the dispatcher once per read by _flush_ready
+        self._ready.append(msg)
+
+    def _flush_ready(self) -> None:
+        with self._lock:
+            ready, self._ready = self._ready, []
+        if ready and self.on_message and self._dispatcher is not None:
+            try:
+                self._dispatcher.submit(self._deliver, ready)
+            except RuntimeError:
+                # dispatcher shut down by stop()
+                pass
+
+    def _deliver(self, messages: List[Dict[str, Any]]) -> None:
+        _RECEIVED.inc(len(messages))
+        for msg in messages:
             try:
                 self.on_message(msg)
             except Exception:
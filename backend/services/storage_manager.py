@@ -0,0 +1,341 @@
+import contextlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from backend.services import metrics
+
+GB = 1024 ** 3
+
+# Statuses after which a job's files on this node are only a cache. A worker's
+# "completed" only means its share is done: the job may still be resumed or
+# reassigned, so it is "released" (JOB_RELEASE) before it can be evicted
+FINISHED_STATUSES = ("released", "completed_video", "canceled")
+# Kept after a pressure eviction of a finished job: its record and final video
+KEEP_FILES = ("metadata.json", "analysis.json", "output_video.mp4")
+
+_RECLAIMED = metrics.counter("renderfarm_storage_reclaimed_bytes_total", "Disk space freed by the storage manager", ("reason",))
+_REJECTED = metrics.counter("renderfarm_storage_rejected_jobs_total", "Jobs refused because the node is short on disk")
+
+
+def _tree_size(path: str) -> int:
+    """Bytes under `path`, counting hard-linked files once."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    seen = set()
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                st = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            if st.st_nlink > 1:
+                if (st.st_dev, st.st_ino) in seen:
+                    continue
+                seen.add((st.st_dev, st.st_ino))
+            total += st.st_size
+    return total
+
+
+# ioctl that shares a file's extents with another (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+
+def link_or_copy(src: str, dst: str) -> str:
+    """
+    Make `dst` hold the contents of `src` without duplicating the data
+    where the filesystem allows it: a hard link, else a reflink, else a
+    plain copy. Returns the method used.
+    """
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError:
+        pass
+    try:
+        import fcntl
+        with open(src, "rb") as source, open(dst, "wb") as target:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        shutil.copystat(src, dst)
+        return "reflink"
+    except (ImportError, OSError):
+        pass
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def link_tree(src_dir: str, dst_dir: str) -> Dict[str, int]:
+    """link_or_copy every file under `src_dir` missing from `dst_dir`; counts per method."""
+    methods: Dict[str, int] = {}
+    for root, _dirs, files in os.walk(src_dir):
+        target_root = os.path.join(dst_dir, os.path.relpath(root, src_dir))
+        os.makedirs(target_root, exist_ok=True)
+        for name in files:
+            target = os.path.join(target_root, name)
+            if os.path.exists(target):
+                continue
+            method = link_or_copy(os.path.join(root, name), target)
+            methods[method] = methods.get(method, 0) + 1
+    return methods
+
+
+def _newest_mtime(path: str) -> float:
+    newest = 0.0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                newest = max(newest, os.path.getmtime(os.path.join(root, name)))
+            except OSError:
+                pass
+    return newest or os.path.getmtime(path)
+
+
+class StorageManager:
+    """
+    Disk budget for this node's jobs/ and render_output/ folders:
+    - `quota_bytes` caps what both folders may hold (None: no cap) and
+      `min_free_bytes` is kept free on the volume
+    - collect() removes finished jobs older than their status' retention
+      (`retention`: status -> seconds), then, while over quota or short
+      on free space, evicts the cached blends and frames of finished jobs,
+      least recently used first, and finally whole finished jobs
+    - running jobs are never touched; cleanup is always per job. A
+      worker's own share ("completed") counts as running until the leader
+      releases the job, since a new leader may still need its frames
+    - can_accept() tells whether a new job of a given size fits; reserve()
+      admits one (collecting first if that would make room) and holds its
+      bytes until its files are written, so concurrent uploads cannot both
+      be admitted against the same free space
+
+    Every removal is counted by reason and the last collection is kept as
+    a report (GET /api/storage).
+    """
+
+    def __init__(self, jobs_dir: str = "jobs", output_dir: str = "render_output",
+                 quota_bytes: Optional[int] = None, min_free_bytes: int = 2 * GB,
+                 retention: Optional[Dict[str, float]] = None, interval: float = 300.0):
+        self.jobs_dir = jobs_dir
+        self.output_dir = output_dir
+        self.quota_bytes = quota_bytes
+        self.min_free_bytes = min_free_bytes
+        self.retention = retention if retention is not None else {
+            "completed": 7 * 86400,
+            "released": 7 * 86400,
+            "completed_video": 7 * 86400,
+            "canceled": 86400,
+        }
+        self.interval = interval
+        self.last_report: Optional[Dict[str, Any]] = None
+        self.reclaimed_total = 0
+        self._lock = threading.Lock()
+        self._collecting = threading.Lock()
+        self._admitting = threading.Lock()
+        # Bytes of admitted jobs still being written
+        self._reserved = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="storage-gc", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                report = self.collect()
+                if report["reclaimed_bytes"]:
+                    print(f"[Storage] Reclaimed {report['reclaimed_bytes'] / GB:.2f} GB "
+                          f"({len(report['removed'])} jobs removed, {len(report['evicted'])} evicted)")
+            except Exception as e:
+                print(f"[Storage] Collection failed: {e}")
+
+    # --- accounting ---
+
+    def free_bytes(self) -> int:
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        return shutil.disk_usage(self.jobs_dir).free
+
+    def used_bytes(self) -> int:
+        return sum(_tree_size(path) for path in (self.jobs_dir, self.output_dir) if os.path.exists(path))
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        """Every job folder with its status, size and last use (newest file mtime)."""
+        found = []
+        if not os.path.isdir(self.jobs_dir):
+            return found
+        for job_id in os.listdir(self.jobs_dir):
+            path = os.path.join(self.jobs_dir, job_id)
+            if not os.path.isdir(path):
+                continue
+            try:
+                with open(os.path.join(path, "metadata.json"), "r", encoding="utf-8") as f:
+                    status = json.load(f).get("status")
+            except (OSError, ValueError):
+                status = None
+            output = os.path.join(self.output_dir, job_id)
+            try:
+                found.append({
+                    "job_id": job_id,
+                    "status": status,
+                    "bytes": _tree_size(path) + (_tree_size(output) if os.path.isdir(output) else 0),
+                    "last_used": _newest_mtime(path),
+                })
+            except OSError:
+                continue
+        return found
+
+    def _shortfall(self, incoming: int = 0, used: Optional[int] = None) -> int:
+        """Bytes that must be freed before `incoming` more bytes fit (0 if they do)."""
+        with self._lock:
+            incoming += self._reserved
+        short = self.min_free_bytes + incoming - self.free_bytes()
+        if self.quota_bytes is not None:
+            used = self.used_bytes() if used is None else used
+            short = max(short, used + incoming - self.quota_bytes)
+        return max(0, short)
+
+    def can_accept(self, incoming: int = 0) -> bool:
+        return self._shortfall(incoming) == 0
+
+    @contextlib.contextmanager
+    def reserve(self, incoming: int = 0) -> Iterator[bool]:
+        """
+        Admit `incoming` bytes, collecting first if needed, and hold them
+        until the block exits (write the job's files inside it). Yields
+        False, and counts a refusal, if they do not fit.
+        """
+        with self._admitting:
+            admitted = self.can_accept(incoming)
+            if not admitted:
+                self.collect(incoming)
+                admitted = self.can_accept(incoming)
+            if admitted:
+                with self._lock:
+                    self._reserved += incoming
+            else:
+                _REJECTED.inc()
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                with self._lock:
+                    self._reserved -= incoming
+
+    def status(self, incoming: int = 0) -> Dict[str, Any]:
+        return {
+            "used_bytes": self.used_bytes(),
+            "free_bytes": self.free_bytes(),
+            "quota_bytes": self.quota_bytes,
+            "min_free_bytes": self.min_free_bytes,
+            "reserved_bytes": self._reserved,
+            "accepting": self.can_accept(incoming),
+            "retention_s": self.retention,
+            "reclaimed_total_bytes": self.reclaimed_total,
+            "last_collection": self.last_report,
+        }
+
+    # --- cleanup ---
+
+    def cleanup_output(self, job_id: str, reason: str = "job_done") -> int:
+        """Remove render_output/<job_id> (this job's scratch frames only)."""
+        return self._remove(os.path.join(self.output_dir, job_id), reason)
+
+    def remove_job(self, job_id: str, reason: str = "removed") -> int:
+        """Remove a job's folder and scratch output; returns bytes freed."""
+        return (self._remove(os.path.join(self.jobs_dir, job_id), reason)
+                + self._remove(os.path.join(self.output_dir, job_id), reason))
+
+    def _remove(self, path: str, reason: str) -> int:
+        if not os.path.lexists(path):
+            return 0
+        size = _tree_size(path)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.unlink(path)
+            except OSError:
+                return 0
+        freed = size - (_tree_size(path) if os.path.exists(path) else 0)
+        if freed > 0:
+            _RECLAIMED.labels(reason).inc(freed)
+            with self._lock:
+                self.reclaimed_total += freed
+        return freed
+
+    def _evict_cache(self, job_id: str) -> int:
+        """Drop a finished job's blend and frames, keeping its metadata and final video."""
+        freed = self._remove(os.path.join(self.output_dir, job_id), "pressure")
+        for root, _dirs, files in os.walk(os.path.join(self.jobs_dir, job_id)):
+            for name in files:
+                if name not in KEEP_FILES:
+                    freed += self._remove(os.path.join(root, name), "pressure")
+        return freed
+
+    def collect(self, incoming: int = 0, now: Optional[float] = None) -> Dict[str, Any]:
+        """One collection pass: retention, orphaned output, then LRU eviction under pressure."""
+        now = time.time() if now is None else now
+        with self._collecting:
+            started = time.perf_counter()
+            removed: List[str] = []
+            evicted: List[str] = []
+            reclaimed = 0
+            jobs = self.jobs()
+
+            finished: List[Dict[str, Any]] = []
+            for job in jobs:
+                keep_for = self.retention.get(job["status"])
+                if keep_for is not None and now - job["last_used"] > keep_for:
+                    reclaimed += self.remove_job(job["job_id"], "retention")
+                    removed.append(job["job_id"])
+                elif job["status"] in FINISHED_STATUSES:
+                    finished.append(job)
+
+            # Scratch output of jobs this node no longer has
+            known = {job["job_id"] for job in jobs if job["job_id"] not in removed}
+            if os.path.isdir(self.output_dir):
+                for job_id in os.listdir(self.output_dir):
+                    if job_id not in known:
+                        reclaimed += self._remove(os.path.join(self.output_dir, job_id), "orphaned")
+
+            used = self.used_bytes() if self.quota_bytes is not None else None
+            shortfall = self._shortfall(incoming, used)
+            finished.sort(key=lambda job: job["last_used"])
+            # Evict nothing if even every finished job would not make enough room
+            stages = ("cache", "job") if shortfall <= sum(job["bytes"] for job in finished) else ()
+            # First only the cached inputs and frames, then whole jobs, oldest first
+            for stage in stages:
+                for job in finished:
+                    if shortfall <= 0:
+                        break
+                    if stage == "cache":
+                        freed = self._evict_cache(job["job_id"])
+                        if freed:
+                            evicted.append(job["job_id"])
+                    else:
+                        freed = self.remove_job(job["job_id"], "pressure")
+                        removed.append(job["job_id"])
+                    reclaimed += freed
+                    shortfall -= freed
+
+            report = {
+                "at": now,
+                "duration_s": round(time.perf_counter() - started, 3),
+                "reclaimed_bytes": reclaimed,
+                "removed": removed,
+                "evicted": evicted,
+                "shortfall_bytes": max(0, shortfall),
+            }
+            self.last_report = report
+            return report
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+import requests
+
+
+class Tracer:
+    """
+    Lightweight per-job spans, stored as Chrome trace events:
+    - span() / record() add a complete ("X") event, instant() an "i" event,
+      each tagged with this process (`node`) and the current thread
+    - add() merges events recorded elsewhere; the leader collects every
+      node's events for its jobs and chrome_trace() exports them for
+      Perfetto / chrome://tracing, one track per node and thread
+    - drain() hands back (and forgets) a job's events, for shipping them
+      to the leader with ship()
+
+    Timestamps are wall-clock microseconds, so spans from different nodes
+    line up only as well as their clocks agree. At most `max_events` are
+    kept per job and `max_jobs` jobs in total.
+    """
+
+    def __init__(self, node: str = "", max_jobs: int = 64, max_events: int = 20000):
+        self.node = node
+        self.max_jobs = max_jobs
+        self.max_events = max_events
+        self._jobs: "OrderedDict[str, Deque[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, job_id: str, name: str, **args: Any) -> Iterator[Dict[str, Any]]:
+        """Time the block as one span; the yielded dict becomes its args."""
+        start = time.time()
+        try:
+            yield args
+        finally:
+            self.record(job_id, name, start, time.time(), **args)
+
+    def record(self, job_id: str, name: str, start: float, end: float, **args: Any) -> None:
+        """A span from `start` to `end` (time.time() seconds)."""
+        self._append(job_id, {
+            "name": name,
+            "ph": "X",
+            "ts": int(start * 1e6),
+            "dur": max(0, int((end - start) * 1e6)),
+            "node": self.node,
+            "thread": threading.current_thread().name,
+            "args": args,
+        })
+
+    def instant(self, job_id: str, name: str, **args: Any) -> None:
+        self._append(job_id, {
+            "name": name,
+            "ph": "i",
+            "s": "p",
+            "ts": int(time.time() * 1e6),
+            "node": self.node,
+            "thread": threading.current_thread().name,
+            "args": args,
+        })
+
+    def add(self, job_id: str, events: List[Dict[str, Any]]) -> int:
+        """Merge events shipped by another node; returns how many were accepted."""
+        accepted = [
+            e for e in events
+            if isinstance(e, dict) and e.get("ph") in ("X", "i") and isinstance(e.get("ts"), int) and e.get("name")
+        ]
+        with self._lock:
+            ring = self._ring(job_id)
+            ring.extend(accepted)
+        return len(accepted)
+
+    def events(self, job_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._jobs.get(job_id, ()))
+
+    def drain(self, job_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            ring = self._jobs.pop(job_id, None)
+        return list(ring) if ring else []
+
+    def first(self, job_id: str, name: str) -> Optional[Dict[str, Any]]:
+        """Earliest event called `name` for the job."""
+        matches = [e for e in self.events(job_id) if e["name"] == name]
+        return min(matches, key=lambda e: e["ts"]) if matches else None
+
+    def chrome_trace(self, job_id: str) -> Dict[str, Any]:
+        events = sorted(self.events(job_id), key=lambda e: e["ts"])
+        pids: Dict[str, int] = {}
+        tids: Dict[tuple, int] = {}
+        trace: List[Dict[str, Any]] = []
+        for event in events:
+            node, thread = event.get("node") or "?", event.get("thread") or "?"
+            if node not in pids:
+                pids[node] = len(pids) + 1
+                trace.append({"name": "process_name", "ph": "M", "pid": pids[node], "args": {"name": node}})
+            if (node, thread) not in tids:
+                tids[(node, thread)] = len(tids) + 1
+                trace.append({"name": "thread_name", "ph": "M", "pid": pids[node],
+                              "tid": tids[(node, thread)], "args": {"name": thread}})
+            exported = {k: v for k, v in event.items() if k not in ("node", "thread")}
+            exported.update(cat="job", pid=pids[node], tid=tids[(node, thread)])
+            trace.append(exported)
+        return {"traceEvents": trace, "displayTimeUnit": "ms", "otherData": {"job_id": job_id}}
+
+    def _append(self, job_id: str, event: Dict[str, Any]) -> None:
+        with self._lock:
+            self._ring(job_id).append(event)
+
+    def _ring(self, job_id: str) -> Deque[Dict[str, Any]]:
+        # lock held
+        ring = self._jobs.get(job_id)
+        if ring is None:
+            ring = self._jobs[job_id] = deque(maxlen=self.max_events)
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        return ring
+
+
+def ship(leader_ip: str, job_id: str, events: List[Dict[str, Any]], timeout: float = 5.0) -> bool:
+    """POST events to the leader's trace collector; False if that failed."""
+    if not events:
+        return True
+    try:
+        response = requests.post(
+            f"http://{leader_ip}:5050/api/jobs/{job_id}/trace",
+            json={"events": events},
+            timeout=timeout,
+        )
+        return response.status_code == 200
+    except requests.RequestException as e:
+        print(f"[Tracer] Could not ship {len(events)} spans of job {job_id} to {leader_ip}: {e}")
+        return False
@@ -0,0 +1,105 @@
+import asyncio
+import platform
+import socket
+from typing import Callable, List, Optional, Tuple
+
+import netifaces
+
+from backend.services.event_loop import EventLoopThread, shared_loop
+
+# on_datagram(data, (ip, port)), called on the event loop thread
+DatagramHandler = Callable[[bytes, Tuple[str, int]], None]
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, on_datagram: DatagramHandler):
+        self.on_datagram = on_datagram
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        try:
+            self.on_datagram(data, addr)
+        except Exception as e:
+            print(f"[UdpTransport] Handling a datagram from {addr[0]} failed: {e}")
+
+    def error_received(self, exc: Exception) -> None:
+        # ICMP errors for earlier datagrams (e.g. port unreachable); beacons are best effort
+        pass
+
+
+class UdpTransport:
+    """
+    Datagram transport used by NetworkDiscoveryService, an asyncio datagram
+    endpoint on the shared control-plane loop:
+    - one UDP socket bound to the discovery port on all interfaces
+    - every datagram is handed to `on_datagram(data, addr)` on the loop
+      thread, as it arrives
+    - sendto() and broadcast() may be called from any thread; the write
+      happens on the loop
+    - broadcast() sends to the broadcast address of every local interface
+
+    Anything with the same methods (open/sendto/broadcast/close) can be
+    passed to NetworkDiscoveryService as a transport_factory result, e.g.
+    the in-memory network in backend.sim.
+    """
+
+    def __init__(self, port: int):
+        self.port = port
+        self._control: Optional[EventLoopThread] = None
+        self._transport: Optional[asyncio.DatagramTransport] = None
+
+    def open(self, on_datagram: DatagramHandler, control: Optional[EventLoopThread] = None) -> "UdpTransport":
+        """Bind the socket and start receiving (not from the loop thread)."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+        if platform.system() == 'Darwin':
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
+        sock.bind(('', self.port))
+        sock.setblocking(False)
+        self._control = control or shared_loop()
+        self._transport, _protocol = self._control.run(
+            self._control.loop.create_datagram_endpoint(lambda: _DatagramProtocol(on_datagram), sock=sock)
+        )
+        return self
+
+    def sendto(self, data: bytes, addr: Tuple[str, int]) -> None:
+        transport = self._transport
+        if transport is None:
+            raise OSError("transport closed")
+        # asyncio transports are not thread-safe
+        if self._control.in_loop():
+            transport.sendto(data, addr)
+        else:
+            self._control.call_soon(transport.sendto, data, addr)
+
+    def broadcast(self, data: bytes) -> None:
+        for addr in self.get_broadcast_addresses():
+            # address starting with 255 is global broadcast, 127 is loopback broadcast. Ignore both
+            if addr.startswith('255') or addr.startswith('127'):
+                continue
+            try:
+                self.sendto(data, (addr, self.port))
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        transport, self._transport = self._transport, None
+        if transport is not None:
+            self._control.call_soon(transport.close)
+
+    @staticmethod
+    def get_broadcast_addresses() -> List[str]:
+        """Get all broadcast addresses for network interfaces"""
+        broadcast_addresses = ['255.255.255.255']
+        try:
+            for interface in netifaces.interfaces():
+                addrs = netifaces.ifaddresses(interface)
+                if netifaces.AF_INET in addrs:
+                    for link in addrs[netifaces.AF_INET]:
+                        if 'broadcast' in link:
+                            broadcast_addresses.append(link['broadcast'])
+        except:
+            pass
+        return broadcast_addresses
@@ -1,9 +1,105 @@
 from backend.services.discovery_service import NetworkDiscoveryService
 from backend.services.blender_service import BlenderService
+from backend.services.resource_sampler import ResourceSampler
+from backend.services.event_bus import EventBus
+from backend.services.job_watcher import JobWatcher
+from backend.services.job_progress import JobProgressTracker
+from backend.services.tracing import Tracer
+from backend.services.storage_manager import GB, StorageManager
+from backend.services.leader_replica import LeaderReplica
+from backend.services import metrics
 import os
+import shutil
 
 BLENDER_PATH = os.getenv("BLENDER_PATH") or "blender"
 print("Starting Server with Blender Binary at : " + BLENDER_PATH)
+# The sampling profiler can only be started through /api/admin/profiler when set
+profiler_enabled = (os.getenv("PROFILER_ENABLED") or "").lower() in ("1", "true", "yes")
 
-discovery = NetworkDiscoveryService()
-blender = BlenderService(blender_binary=BLENDER_PATH)
\ No newline at end of file
+sampler = ResourceSampler(
+    interval=float(os.getenv("RESOURCE_SAMPLE_INTERVAL") or 1.0),
+    alpha=float(os.getenv("RESOURCE_SAMPLE_ALPHA") or 0.3),
+)
+sampler.start()
+
+discovery = NetworkDiscoveryService(
+    sampler=sampler,
+    membership=os.getenv("DISCOVERY_MODE") or "broadcast",
+    seed_peers=[ip.strip() for ip in (os.getenv("SEED_PEERS") or "").split(",") if ip.strip()],
+    control_max_queue=int(os.getenv("CONTROL_MAX_QUEUE") or 1024),
+    control_max_lag=float(os.getenv("CONTROL_MAX_LAG") or 5.0),
+)
+blender = BlenderService(
+    blender_binary=BLENDER_PATH,
+    max_workers=int(os.getenv("ANALYSIS_WORKERS") or 2),
+    cache_size=int(os.getenv("ANALYSIS_CACHE_SIZE") or 128),
+    native_reader=(os.getenv("ANALYSIS_NATIVE") or "1").lower() not in ("0", "false", "no"),
+)
+# UI event stream (/api/events): membership deltas, role changes, job state changes
+events = EventBus(max_subscribers=int(os.getenv("EVENT_STREAMS") or 8))
+
+
+def _publish_membership(event, snapshot):
+    delta = {"event": event["type"], "ip": event["ip"], "version": event["version"]}
+    if event["type"] in ("added", "updated"):
+        delta["device"] = dict(snapshot.devices[event["ip"]], last_seen=discovery.members.last_seen(event["ip"]) or 0)
+    events.publish("membership", delta)
+
+
+discovery.members.subscribe(_publish_membership)
+discovery.subscribe_status(lambda status: events.publish("role", status))
+
+job_watcher = JobWatcher("jobs", on_change=lambda summary: events.publish("job", summary))
+job_watcher.start()
+
+# Leader-side per-job, per-worker frame counters (/api/jobs/<id>/progress)
+progress = JobProgressTracker()
+# Per-job spans; the leader also collects other nodes' (/api/jobs/<id>/trace)
+tracer = Tracer(node=f"{discovery.local_ip} api")
+
+# Disk budget for jobs/ and render_output/ (collection runs in the API process, see create_app)
+_finished_retention = float(os.getenv("STORAGE_RETENTION_HOURS") or 168) * 3600
+storage = StorageManager(
+    quota_bytes=int(float(os.getenv("STORAGE_QUOTA_GB")) * GB) if os.getenv("STORAGE_QUOTA_GB") else None,
+    min_free_bytes=int(float(os.getenv("STORAGE_MIN_FREE_GB") or 2) * GB),
+    retention={
+        "completed": _finished_retention,
+        "released": _finished_retention,
+        "completed_video": _finished_retention,
+        "canceled": float(os.getenv("STORAGE_CANCELED_RETENTION_HOURS") or 24) * 3600,
+        # Paused by a lost leader and never resumed
+        "awaiting_leader": float(os.getenv("STORAGE_CANCELED_RETENTION_HOURS") or 24) * 3600,
+    },
+    interval=float(os.getenv("STORAGE_GC_INTERVAL") or 300),
+)
+
+# Running jobs' state, sent by the leader to its ring successor for failover
+# (/api/jobs/<id>/resume); sending runs in the API process, see create_app
+replica = LeaderReplica(
+    standby=lambda: discovery.ring_successor if discovery.ring_successor != "Undefined" else None,
+    local_ip=lambda: discovery.local_ip,
+    interval=float(os.getenv("REPLICA_INTERVAL") or 0.5),
+)
+
+
+def _control_queue_depth():
+    status = discovery.get_control_channel_status()
+    if status["client"]:
+        return status["client"]["buffered"]
+    return sum(peer["queued"] for peer in status["peers"])
+
+
+def _control_log_size():
+    oldest, newest = discovery.get_control_channel_status()["log_range"] or (0, 0)
+    return newest - oldest + 1 if newest else 0
+
+
+# Gauges read at scrape time (/api/metrics)
+metrics.gauge("renderfarm_cluster_members", "Devices in the local membership view").set_function(lambda: len(discovery.get_devices()))
+metrics.gauge(
+    "renderfarm_control_queue_depth",
+    "Sequenced messages waiting: queued for workers on the leader, buffered out of order on a worker",
+).set_function(_control_queue_depth)
+metrics.gauge("renderfarm_control_log_size", "Messages kept for retransmission by the sequencer").set_function(_control_log_size)
+metrics.gauge("renderfarm_event_streams", "Open /api/events streams").set_function(lambda: events.stats()["subscribers"])
+metrics.gauge("renderfarm_disk_free_bytes", "Free space on the volume holding jobs/").set_function(lambda: shutil.disk_usage("jobs").free)
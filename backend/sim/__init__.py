@@ -0,0 +1,2 @@
+from .network import InMemoryNetwork, InMemoryTransport
+from .cluster import DEFAULT_TIMING, SimulatedCluster, SimulatedNode, run_benchmark
@@ -0,0 +1,47 @@
+"""
+Election / discovery convergence benchmark on an in-memory network.
+
+    python -m backend.sim --sizes 3 10 30 --loss 0.05 --latency 0.002
+"""
+import argparse
+import json
+import os
+import sys
+
+from .cluster import DEFAULT_TIMING, run_benchmark
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate N discovery nodes in one process")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3, 5, 10, 20])
+    parser.add_argument("--latency", type=float, default=0.001, help="one-way datagram latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra uniform random latency (s)")
+    parser.add_argument("--loss", type=float, default=0.0, help="datagram loss probability")
+    parser.add_argument("--trials", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--membership", choices=["broadcast", "gossip"], default="broadcast")
+    for key, value in DEFAULT_TIMING.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    timing = {key: getattr(args, key) for key in DEFAULT_TIMING}
+    # Node threads log with print() until the process exits; keep stdout for the JSON report only
+    report = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+
+    results = run_benchmark(
+        args.sizes,
+        latency=args.latency,
+        jitter=args.jitter,
+        loss=args.loss,
+        trials=args.trials,
+        timing=timing,
+        seed=args.seed,
+        membership=args.membership,
+    )
+    report.write(json.dumps(results, indent=2) + "\n")
+    report.flush()
+
+
+if __name__ == "__main__":
+    main()
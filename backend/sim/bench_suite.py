@@ -0,0 +1,104 @@
+"""
+Throughput benchmark suite for the control plane on loopback:
+- control: SequencerServer -> N SequencedClients (message rate, latency
+  percentiles, CPU per message, delivery and NACK repair under loss)
+- udp: the NetworkDiscoveryService listener fed beacons from N peers
+  (processing rate, latency, CPU per message, false suspicions under loss)
+
+    python -m backend.sim.bench_suite --peers 1 10 100 500 --loss 0 0.05
+
+Prints one JSON document; keep it next to the commit to spot regressions.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from .control_bench import run_control_benchmark
+from .udp_bench import run_udp_benchmark
+
+
+def run_suite(
+    peers: List[int],
+    losses: List[float],
+    messages: int = 5000,
+    payload_bytes: int = 64,
+    rate: float = 0.0,
+    duration: float = 2.0,
+    suites: Optional[List[str]] = None,
+    port: int = 18890,
+    seed: Optional[int] = None,
+) -> Dict[str, Any]:
+    suites = suites or ["control", "udp"]
+    report: Dict[str, Any] = {
+        "started_at": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "control": [],
+        "udp": [],
+    }
+    next_port = port
+    for count in peers:
+        for loss in losses:
+            if "control" in suites:
+                report["control"].append(run_control_benchmark(
+                    messages=messages,
+                    clients=count,
+                    payload_bytes=payload_bytes,
+                    rate=rate,
+                    loss=loss,
+                    seed=seed,
+                    port=next_port,
+                ))
+                next_port += 1
+            if "udp" in suites:
+                report["udp"].append(dict(run_udp_benchmark(
+                    peers=count,
+                    rate=rate,
+                    messages=messages,
+                    loss=loss,
+                    duration=duration,
+                    port=next_port,
+                    seed=seed,
+                ), loss=loss))
+                next_port += 1
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Control-channel and discovery listener benchmarks on loopback")
+    parser.add_argument("--peers", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--loss", type=float, nargs="+", default=[0.0, 0.05])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--payload-bytes", type=int, default=64)
+    parser.add_argument("--rate", type=float, default=0.0, help="messages/s to offer (0 = unthrottled)")
+    parser.add_argument("--duration", type=float, default=2.0, help="liveness phase length (s)")
+    parser.add_argument("--suite", choices=["control", "udp"], nargs="+", default=["control", "udp"])
+    parser.add_argument("--port", type=int, default=18890, help="first loopback port to use")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    # Services log with print(); keep stdout for the JSON report only
+    report = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+
+    results = run_suite(
+        args.peers,
+        args.loss,
+        messages=args.messages,
+        payload_bytes=args.payload_bytes,
+        rate=args.rate,
+        duration=args.duration,
+        suites=args.suite,
+        port=args.port,
+        seed=args.seed,
+    )
+    report.write(json.dumps(results, indent=2) + "\n")
+    report.flush()
+
+
+if __name__ == "__main__":
+    main()
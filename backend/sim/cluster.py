@@ -0,0 +1,287 @@
+import contextlib
+import io
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from backend.services.discovery_service import NetworkDiscoveryService
+from backend.services.failure_detector import PhiAccrualFailureDetector
+from .network import InMemoryNetwork
+
+# Production timings scaled down ~30x so a benchmark run takes seconds, not minutes
+DEFAULT_TIMING = {
+    "beacon_interval": 0.1,
+    "stale_check_interval": 0.05,
+    "probe_timeout": 0.05,
+    "phi_threshold": 8.0,
+    "min_std_dev": 0.02,
+    "acceptable_pause": 0.05,
+    "answer_timeout": 0.05,
+    "coordinator_timeout": 0.3,
+    "retries": 3,
+    "protocol_period": 0.3,
+    "ack_timeout": 0.1,
+    "suspicion_periods": 4,
+}
+
+
+class StaticSampler:
+    """Stands in for ResourceSampler: a fixed resource score, no psutil."""
+
+    def __init__(self, score: int):
+        self.score = score
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def resource_score(self) -> int:
+        return self.score
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"resource_score": self.score}
+
+
+class SimulatedNode(NetworkDiscoveryService):
+    """
+    NetworkDiscoveryService on an InMemoryNetwork.
+
+    Only the edges that leave the process are replaced: the UDP socket, the
+    HTTP liveness probe, the HTTP notifications to the leader and the TCP
+    sequencer. Beacons, failure detection and elections run unmodified.
+    """
+
+    def __init__(self, network: InMemoryNetwork, ip: str, score: int, timing: Dict[str, Any],
+                 membership: str = "broadcast"):
+        super().__init__(
+            sampler=StaticSampler(score),
+            transport_factory=network.endpoint(ip),
+            local_ip=ip,
+            pc_name=f"sim-{ip}",
+            membership=membership,
+        )
+        self.network = network
+
+        self.beacon_interval = timing["beacon_interval"]
+        self._stale_check_interval = timing["stale_check_interval"]
+        self._probe_timeout = timing["probe_timeout"]
+        self.failure_detector = PhiAccrualFailureDetector(
+            threshold=timing["phi_threshold"],
+            expected_interval=timing["beacon_interval"],
+            min_std_dev=timing["min_std_dev"],
+            acceptable_pause=timing["acceptable_pause"],
+        )
+        self.election.answer_timeout = timing["answer_timeout"]
+        self.election.coordinator_timeout = timing["coordinator_timeout"]
+        self.election.retries = timing["retries"]
+        self.gossip.protocol_period = timing["protocol_period"]
+        self.gossip.ack_timeout = timing["ack_timeout"]
+        self.gossip.suspicion_periods = timing["suspicion_periods"]
+
+    def _start_control_manager(self):
+        pass
+
+    def probe_device(self, ip):
+        if self.network.reachable(self.local_ip, ip):
+            time.sleep(min(2 * self.network.latency, self._probe_timeout))
+            return True
+        time.sleep(self._probe_timeout)
+        return False
+
+    def _notify_leader_of_disconnection(self, leader_ip, ip, role):
+        pass
+
+    def handle_leader_down(self, leader_ip):
+        # In production the job's client re-elects via /leader_is_down_flag; here every survivor does
+        self.initiate_election()
+
+
+class SimulatedCluster:
+    """
+    N SimulatedNodes on one InMemoryNetwork, with helpers that measure:
+    - discovery convergence (every node sees every live node)
+    - election convergence (every live node agrees on one leader)
+    - failover (leader crash -> new agreed leader)
+    - split-brain incidents (more than one live node acting as Leader)
+    """
+
+    def __init__(
+        self,
+        size: int,
+        network: Optional[InMemoryNetwork] = None,
+        timing: Optional[Dict[str, Any]] = None,
+        seed: Optional[int] = None,
+        quiet: bool = True,
+        membership: str = "broadcast",
+    ):
+        self.network = network or InMemoryNetwork(seed=seed)
+        self.timing = dict(DEFAULT_TIMING, **(timing or {}))
+        self.quiet = quiet
+        rng = random.Random(seed)
+
+        self.nodes: Dict[str, SimulatedNode] = {}
+        for i in range(size):
+            ip = f"10.0.{i // 250}.{i % 250 + 1}"
+            self.nodes[ip] = SimulatedNode(self.network, ip, rng.randint(1000, 10000), self.timing, membership)
+
+        self._crashed: set = set()
+        self._split_brain_incidents = 0
+        self._monitor_running = False
+        self._monitor_thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------
+    # Lifecycle
+    # ------------------------------------------
+
+    def start(self) -> None:
+        with self._quiet():
+            for node in self.nodes.values():
+                node.start()
+        self._monitor_running = True
+        self._monitor_thread = threading.Thread(target=self._monitor_split_brain, daemon=True)
+        self._monitor_thread.start()
+
+    def stop(self) -> None:
+        self._monitor_running = False
+        with self._quiet():
+            for node in self.nodes.values():
+                node.stop()
+        self.network.close()
+
+    def alive(self) -> List[SimulatedNode]:
+        return [n for ip, n in self.nodes.items() if ip not in self._crashed]
+
+    def crash(self, ip: str) -> None:
+        self._crashed.add(ip)
+        self.network.crash(ip)
+        with self._quiet():
+            self.nodes[ip].stop()
+
+    # ------------------------------------------
+    # Measurements
+    # ------------------------------------------
+
+    def wait_for_discovery(self, timeout: float = 30.0) -> Optional[float]:
+        """Seconds until every live node has discovered every live node (None on timeout)."""
+        live = {n.local_ip for n in self.alive()}
+        return self._wait(lambda: all(live <= set(n.discovered_devices) for n in self.alive()), timeout)
+
+    def agreed_leader(self) -> Optional[str]:
+        nodes = self.alive()
+        leaders = {n.current_leader for n in nodes}
+        if len(leaders) != 1 or any(n.election_active for n in nodes):
+            return None
+        leader = leaders.pop()
+        return leader if leader in self.nodes and leader not in self._crashed else None
+
+    def elect(self, initiator: Optional[str] = None, timeout: float = 30.0) -> Optional[float]:
+        """Start an election and return seconds until all live nodes agree on the leader."""
+        node = self.nodes[initiator] if initiator else self.alive()[0]
+        with self._quiet():
+            node.initiate_election()
+            return self._wait(lambda: self.agreed_leader() is not None, timeout)
+
+    def failover(self, timeout: float = 60.0) -> Dict[str, Optional[float]]:
+        """Crash the current leader; time detection (first survivor drops it) and re-election."""
+        old_leader = self.agreed_leader()
+        if old_leader is None:
+            return {"detection": None, "election": None}
+
+        started = time.monotonic()
+        self.crash(old_leader)
+        with self._quiet():
+            detection = self._wait(lambda: any(old_leader not in n.discovered_devices for n in self.alive()), timeout)
+            agreed = self._wait(
+                lambda: self.agreed_leader() not in (None, old_leader), timeout - (time.monotonic() - started)
+            )
+        return {
+            "detection": detection,
+            "election": (time.monotonic() - started) if agreed is not None else None,
+        }
+
+    def expected_leader(self) -> Optional[str]:
+        uids = [(n.current_score, n.local_ip) for n in self.alive()]
+        return max(uids)[1] if uids else None
+
+    def split_brain_incidents(self) -> int:
+        return self._split_brain_incidents
+
+    def election_messages(self) -> int:
+        return sum(sum(n.election.stats()["messages_sent"].values()) for n in self.nodes.values())
+
+    # ------------------------------------------
+    # Helpers
+    # ------------------------------------------
+
+    def _wait(self, predicate, timeout: float) -> Optional[float]:
+        started = time.monotonic()
+        while time.monotonic() - started < timeout:
+            if predicate():
+                return time.monotonic() - started
+            time.sleep(0.005)
+        return None
+
+    def _monitor_split_brain(self) -> None:
+        split = False
+        while self._monitor_running:
+            leaders = [n for n in self.alive() if n.my_role == "Leader" and n.running]
+            if len(leaders) > 1 and not split:
+                self._split_brain_incidents += 1
+            split = len(leaders) > 1
+            time.sleep(0.01)
+
+    def _quiet(self):
+        # NetworkDiscoveryService logs with print(); mute it for large clusters
+        return contextlib.redirect_stdout(io.StringIO()) if self.quiet else contextlib.nullcontext()
+
+
+def run_benchmark(
+    sizes: List[int],
+    latency: float = 0.001,
+    jitter: float = 0.0,
+    loss: float = 0.0,
+    trials: int = 1,
+    timing: Optional[Dict[str, Any]] = None,
+    seed: Optional[int] = None,
+    membership: str = "broadcast",
+) -> List[Dict[str, Any]]:
+    """Discovery, election and failover convergence for each cluster size."""
+    results = []
+    for size in sizes:
+        for trial in range(trials):
+            trial_seed = None if seed is None else seed + trial
+            network = InMemoryNetwork(latency=latency, jitter=jitter, loss=loss, seed=trial_seed)
+            cluster = SimulatedCluster(size, network=network, timing=timing, seed=trial_seed, membership=membership)
+            cluster.start()
+            try:
+                discovery = cluster.wait_for_discovery()
+
+                network.reset_stats()
+                messages_before = cluster.election_messages()
+                election = cluster.elect()
+                election_messages = cluster.election_messages() - messages_before
+                correct = cluster.agreed_leader() == cluster.expected_leader()
+
+                failover = cluster.failover() if size > 1 else {"detection": None, "election": None}
+
+                results.append({
+                    "membership": membership,
+                    "nodes": size,
+                    "trial": trial,
+                    "latency": latency,
+                    "loss": loss,
+                    "discovery_convergence_s": discovery,
+                    "election_convergence_s": election,
+                    "election_messages": election_messages,
+                    "elected_highest_uid": correct,
+                    "failover_detection_s": failover["detection"],
+                    "failover_convergence_s": failover["election"],
+                    "split_brain_incidents": cluster.split_brain_incidents(),
+                    "network": network.stats(),
+                })
+            finally:
+                cluster.stop()
+    return results
@@ -0,0 +1,189 @@
+"""
+Control-channel micro-benchmark: one SequencerServer and N SequencedClients
+on loopback, comparing wire formats.
+
+    python -m backend.sim.control_bench --messages 20000 --clients 4
+
+"before" is protocol v1 (JSON lines, one write per message), "after" is
+protocol v2 (length-prefixed frames, coalesced writes).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from backend.services.event_loop import EventLoopThread
+from backend.services.sequencer_tcp import PROTOCOL_VERSION, SequencedClient, SequencerServer
+
+VARIANTS = {
+    "before": {"proto": 1, "coalesce_window": 0.0, "max_batch": 1},
+    "after": {"proto": PROTOCOL_VERSION, "coalesce_window": 0.0005, "max_batch": 256},
+}
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_control_benchmark(
+    messages: int = 10000,
+    clients: int = 4,
+    payload_bytes: int = 64,
+    rate: float = 0.0,
+    proto: int = PROTOCOL_VERSION,
+    coalesce_window: float = 0.0005,
+    max_batch: int = 256,
+    loss: float = 0.0,
+    seed: Optional[int] = None,
+    host: str = "127.0.0.1",
+    port: int = 18890,
+    timeout: float = 60.0,
+    idle_timeout: float = 2.0,
+) -> Dict[str, Any]:
+    """
+    Broadcast `messages` control messages (at `rate` msg/s, 0 = as fast as
+    possible) and time their in-order delivery to every client.
+
+    `loss` drops that fraction of live sends per client on the leader side,
+    so delivery depends on NACK repair. Waiting stops after `timeout`, or
+    after `idle_timeout` without progress once everything has been sent.
+    """
+    server = SequencerServer(host=host, port=port, max_queue=messages + 16, max_lag=timeout,
+                             epoch=1, log_size=messages + 16, coalesce_window=coalesce_window, max_batch=max_batch,
+                             max_proto=proto)
+    server.start()
+
+    lock = threading.Lock()
+    latencies: List[float] = []
+    received = [0]
+    last_delivery = [0.0]
+    done = threading.Event()
+    expected = messages * clients
+
+    def on_message(msg):
+        now = time.perf_counter()
+        with lock:
+            latencies.append(now - msg["payload"]["t"])
+            received[0] += 1
+            last_delivery[0] = now
+            if received[0] >= expected:
+                done.set()
+
+    # Workers get their own loop, as they would in their own processes
+    worker_loop = EventLoopThread("bench-workers")
+    receivers = [
+        SequencedClient(host, port, on_message=on_message, max_proto=proto, control=worker_loop)
+        for _ in range(clients)
+    ]
+    for client in receivers:
+        client.start()
+    try:
+        deadline = time.monotonic() + 5.0 + clients * 0.01
+        while len(server.connected_peers()) < clients and time.monotonic() < deadline:
+            time.sleep(0.01)
+        if loss:
+            rng = random.Random(seed)
+            with server._clients_lock:
+                connections = list(server._clients)
+            for connection in connections:
+                connection.enqueue = _lossy(connection.enqueue, loss, rng)
+
+        filler = "x" * payload_bytes
+        interval = 1.0 / rate if rate else 0.0
+        cpu_started = time.process_time()
+        started = time.perf_counter()
+        for i in range(messages):
+            server.broadcast_control("BENCH", {"i": i, "t": time.perf_counter(), "data": filler})
+            if interval:
+                time.sleep(max(0.0, started + (i + 1) * interval - time.perf_counter()))
+        last_count, last_progress = -1, time.monotonic()
+        while not done.wait(0.05):
+            now = time.monotonic()
+            if received[0] != last_count:
+                last_count, last_progress = received[0], now
+            if now - last_progress > idle_timeout or time.perf_counter() - started > timeout:
+                break
+        cpu = time.process_time() - cpu_started
+        elapsed = (last_delivery[0] or time.perf_counter()) - started
+
+        peers = server.connected_peers()
+        client_stats = [client.stats() for client in receivers]
+        return {
+            "proto": proto,
+            "coalesce_window": coalesce_window,
+            "max_batch": max_batch,
+            "messages": messages,
+            "clients": clients,
+            "payload_bytes": payload_bytes,
+            "rate": rate,
+            "loss": loss,
+            "connected": len(peers),
+            "delivered": received[0],
+            "delivery_ratio": round(received[0] / expected, 4) if expected else None,
+            "elapsed_s": round(elapsed, 4),
+            "messages_per_s": round(received[0] / elapsed, 1) if elapsed else None,
+            "cpu_us_per_message": round(cpu / received[0] * 1e6, 2) if received[0] else None,
+            "latency_ms": {
+                "p50": _ms(percentile(latencies, 0.50)),
+                "p99": _ms(percentile(latencies, 0.99)),
+                "max": _ms(max(latencies) if latencies else None),
+            },
+            "messages_per_write": round(sum(p["messages_per_write"] for p in peers) / len(peers), 2) if peers else None,
+            "retransmitted": sum(p["retransmitted"] for p in peers),
+            "nacks_sent": sum(c["nacks_sent"] for c in client_stats),
+            "gaps_repaired": sum(c["gaps_repaired"] for c in client_stats),
+        }
+    finally:
+        for client in receivers:
+            client.stop()
+        server.stop()
+
+
+def _lossy(enqueue, loss: float, rng: random.Random):
+    # Replays and retransmissions (force=True) and the SYNC line (seq < 0) always go through
+    def enqueue_with_loss(seq, data, force=False):
+        if not force and seq > 0 and rng.random() < loss:
+            return True
+        return enqueue(seq, data, force)
+    return enqueue_with_loss
+
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return round(value * 1000, 3) if value is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequenced control-channel throughput / latency on loopback")
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--payload-bytes", type=int, default=64)
+    parser.add_argument("--rate", type=float, default=0.0, help="messages/s to offer (0 = unthrottled)")
+    parser.add_argument("--port", type=int, default=18890)
+    args = parser.parse_args()
+
+    report = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+
+    results = {}
+    for idx, (name, variant) in enumerate(VARIANTS.items()):
+        results[name] = run_control_benchmark(
+            messages=args.messages,
+            clients=args.clients,
+            payload_bytes=args.payload_bytes,
+            rate=args.rate,
+            port=args.port + idx,
+            **variant,
+        )
+    report.write(json.dumps(results, indent=2) + "\n")
+    report.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Frame-ingest load test: the real Flask app behind each serving mode, with
+N concurrent uploaders POSTing frames to /api/jobs/submit-frames.
+
+    python -m backend.sim.http_bench --clients 8 --frames 200 --frame-kb 512
+
+The server runs in a child process (so the uploaders do not share its
+GIL) inside a scratch directory, as the API keeps jobs under ./jobs.
+Besides throughput, latency and server CPU per frame it checks that
+remaining_frames lost no updates.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import psutil
+import requests
+
+from backend.server import SERVER_MODES, build_server
+from .control_bench import percentile, _ms
+
+
+def _create_job(frames: int) -> str:
+    job_id = str(uuid.uuid4())
+    job_dir = os.path.join("jobs", job_id)
+    os.makedirs(job_dir)
+    with open(os.path.join(job_dir, "metadata.json"), "w") as f:
+        json.dump({"status": "in_progress", "remaining_frames": frames + 1, "total_no_frames": frames + 1}, f)
+    return job_id
+
+
+def _remaining_frames(job_id: str) -> Optional[int]:
+    with open(os.path.join("jobs", job_id, "metadata.json")) as f:
+        return json.load(f).get("remaining_frames")
+
+
+def _serve(mode: str, port: int, threads: int, scratch: str) -> None:
+    # Child process: the app imports backend.shared.state, so it must start here
+    os.chdir(scratch)
+    sys.stdout = open(os.devnull, "w")
+    # Per-request access logs would dominate the measurement
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    from backend.app import create_app
+
+    build_server(create_app(), host="127.0.0.1", port=port, mode=mode, threads=threads).serve_forever()
+
+
+def _wait_for_port(port: int, timeout: float = 30.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def run_http_benchmark(
+    mode: str = "waitress",
+    clients: int = 8,
+    frames: int = 200,
+    frame_kb: int = 256,
+    threads: int = 16,
+    port: int = 15050,
+) -> Dict[str, Any]:
+    """
+    Upload `frames` frames of `frame_kb` KiB from `clients` threads (one
+    keep-alive session each) against the app served in `mode`. Must run
+    with the working directory set to a scratch directory.
+    """
+    job_id = _create_job(frames)
+    child = multiprocessing.get_context("spawn").Process(
+        target=_serve, args=(mode, port, threads, os.getcwd()), daemon=True
+    )
+    child.start()
+    if not _wait_for_port(port):
+        child.terminate()
+        raise RuntimeError(f"{mode} server did not start on port {port}")
+    server_process = psutil.Process(child.pid)
+
+    url = f"http://127.0.0.1:{port}/api/jobs/submit-frames"
+    payload = os.urandom(frame_kb * 1024)
+    lock = threading.Lock()
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    next_frame = [0]
+
+    def uploader():
+        session = requests.Session()
+        while True:
+            with lock:
+                frame = next_frame[0]
+                if frame >= frames:
+                    return
+                next_frame[0] += 1
+            started = time.perf_counter()
+            try:
+                resp = session.post(url, data={"uuid": job_id}, files={"image": (f"{frame}.png", payload)}, timeout=30)
+                outcome = None if resp.status_code == 200 else str(resp.status_code)
+            except requests.RequestException as e:
+                outcome = type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                if outcome is None:
+                    latencies.append(elapsed)
+                else:
+                    errors[outcome] = errors.get(outcome, 0) + 1
+
+    try:
+        workers = [threading.Thread(target=uploader) for _ in range(clients)]
+        cpu_started = sum(server_process.cpu_times()[:2])
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        cpu = sum(server_process.cpu_times()[:2]) - cpu_started
+    finally:
+        child.terminate()
+        child.join(5)
+
+    ok = len(latencies)
+    remaining = _remaining_frames(job_id)
+    return {
+        "mode": mode,
+        "clients": clients,
+        "threads": threads if mode != "dev" else None,
+        "frames": frames,
+        "frame_kb": frame_kb,
+        "ok": ok,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "frames_per_s": round(ok / elapsed, 1) if elapsed else None,
+        "mb_per_s": round(ok * frame_kb / 1024 / elapsed, 1) if elapsed else None,
+        "server_cpu_ms_per_frame": round(cpu / ok * 1000, 3) if ok else None,
+        "latency_ms": {
+            "p50": _ms(percentile(latencies, 0.50)),
+            "p99": _ms(percentile(latencies, 0.99)),
+            "max": _ms(max(latencies) if latencies else None),
+        },
+        # every accepted frame must have decremented remaining_frames exactly once
+        "metadata_consistent": remaining == frames + 1 - ok,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame-ingest throughput per HTTP serving mode")
+    parser.add_argument("--modes", nargs="+", choices=SERVER_MODES, default=["dev", "threaded", "waitress"])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--frame-kb", type=int, default=256)
+    parser.add_argument("--threads", type=int, default=16, help="request threads for threaded / waitress")
+    parser.add_argument("--port", type=int, default=15050)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        cwd = os.getcwd()
+        os.chdir(scratch)
+        try:
+            for idx, mode in enumerate(args.modes):
+                results.append(run_http_benchmark(
+                    mode=mode,
+                    clients=args.clients,
+                    frames=args.frames,
+                    frame_kb=args.frame_kb,
+                    threads=args.threads,
+                    port=args.port + idx,
+                ))
+        finally:
+            os.chdir(cwd)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from backend.services.event_loop import EventLoopThread, shared_loop
+from backend.services.transport import DatagramHandler
+
+
+class InMemoryNetwork:
+    """
+    Simulated datagram network shared by many in-process nodes:
+    - every datagram is delayed by `latency` (+ uniform `jitter`) seconds
+    - every datagram is dropped with probability `loss`
+    - nodes can be crashed, and the network split into partitions
+    - sent / delivered / dropped datagrams are counted per message kind
+      (the text before the first ':' of the payload, e.g. DISCOVER)
+    """
+
+    def __init__(self, latency: float = 0.001, jitter: float = 0.0, loss: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self._rng = random.Random(seed)
+
+        self._lock = threading.Lock()
+        self._endpoints: Dict[Tuple[str, int], "InMemoryTransport"] = {}
+        self._partition: Dict[str, int] = {}
+        self._crashed: Set[str] = set()
+
+        self._sent: Dict[str, int] = {}
+        self._delivered: Dict[str, int] = {}
+        self._dropped: Dict[str, int] = {}
+
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._deliver_loop, daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------
+    # Endpoints
+    # ------------------------------------------
+
+    def endpoint(self, ip: str):
+        """Transport factory for NetworkDiscoveryService(transport_factory=...)."""
+        return lambda port: InMemoryTransport(self, ip, port)
+
+    def register(self, transport: "InMemoryTransport") -> None:
+        with self._lock:
+            self._endpoints[(transport.ip, transport.port)] = transport
+
+    def unregister(self, transport: "InMemoryTransport") -> None:
+        with self._lock:
+            if self._endpoints.get((transport.ip, transport.port)) is transport:
+                del self._endpoints[(transport.ip, transport.port)]
+
+    # ------------------------------------------
+    # Faults
+    # ------------------------------------------
+
+    def partition(self, *groups: Iterable[str]) -> None:
+        """Split the network: nodes only reach nodes in their own group. Unlisted nodes form one more group."""
+        with self._lock:
+            self._partition = {}
+            for idx, group in enumerate(groups):
+                for ip in group:
+                    self._partition[ip] = idx + 1
+
+    def heal(self) -> None:
+        with self._lock:
+            self._partition = {}
+
+    def crash(self, ip: str) -> None:
+        with self._lock:
+            self._crashed.add(ip)
+
+    def recover(self, ip: str) -> None:
+        with self._lock:
+            self._crashed.discard(ip)
+
+    def reachable(self, src: str, dst: str) -> bool:
+        with self._lock:
+            return self._reachable(src, dst)
+
+    def _reachable(self, src: str, dst: str) -> bool:
+        # lock held
+        if src in self._crashed or dst in self._crashed:
+            return False
+        return self._partition.get(src, 0) == self._partition.get(dst, 0)
+
+    # ------------------------------------------
+    # Traffic
+    # ------------------------------------------
+
+    def send(self, src: str, dst: str, port: int, data: bytes) -> None:
+        kind = self._kind(data)
+        with self._lock:
+            self._sent[kind] = self._sent.get(kind, 0) + 1
+            target = self._endpoints.get((dst, port))
+            if target is None or not self._reachable(src, dst) or self._rng.random() < self.loss:
+                self._dropped[kind] = self._dropped.get(kind, 0) + 1
+                return
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._counter), target, data, src, kind))
+            self._cond.notify()
+
+    def broadcast(self, src: str, port: int, data: bytes) -> None:
+        with self._lock:
+            targets = [ip for (ip, p) in self._endpoints if p == port]
+        for ip in targets:
+            self.send(src, ip, port, data)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                "sent": dict(self._sent),
+                "delivered": dict(self._delivered),
+                "dropped": dict(self._dropped),
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._sent.clear()
+            self._delivered.clear()
+            self._dropped.clear()
+
+    def close(self) -> None:
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+
+    def _deliver_loop(self) -> None:
+        while self._running:
+            with self._cond:
+                while self._running and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    timeout = (self._heap[0][0] - time.monotonic()) if self._heap else None
+                    self._cond.wait(timeout)
+                if not self._running:
+                    return
+                _at, _n, target, data, src, kind = heapq.heappop(self._heap)
+
+            with self._lock:
+                # Faults injected while the datagram was in flight still apply
+                if not self._reachable(src, target.ip):
+                    self._dropped[kind] = self._dropped.get(kind, 0) + 1
+                    continue
+                self._delivered[kind] = self._delivered.get(kind, 0) + 1
+            target.deliver(data, src)
+
+    @staticmethod
+    def _kind(data: bytes) -> str:
+        return data.split(b":", 1)[0].decode("utf-8", "replace")
+
+
+class InMemoryTransport:
+    """
+    Endpoint on an InMemoryNetwork with the interface of
+    services.transport.UdpTransport: arriving datagrams are handed to
+    `on_datagram` on the event loop, as the asyncio endpoint does.
+    """
+
+    def __init__(self, network: InMemoryNetwork, ip: str, port: int):
+        self.network = network
+        self.ip = ip
+        self.port = port
+        self._on_datagram: Optional[DatagramHandler] = None
+        self._control: Optional[EventLoopThread] = None
+        self._closed = True
+
+    def open(self, on_datagram: DatagramHandler, control: Optional[EventLoopThread] = None) -> "InMemoryTransport":
+        self._on_datagram = on_datagram
+        self._control = control or shared_loop()
+        self._closed = False
+        self.network.register(self)
+        return self
+
+    def sendto(self, data: bytes, addr: Tuple[str, int]) -> None:
+        if self._closed:
+            raise OSError("transport closed")
+        self.network.send(self.ip, addr[0], addr[1], data)
+
+    def broadcast(self, data: bytes) -> None:
+        if self._closed:
+            raise OSError("transport closed")
+        self.network.broadcast(self.ip, self.port, data)
+
+    def deliver(self, data: bytes, src: str) -> None:
+        # network thread
+        if not self._closed:
+            self._control.call_soon(self._receive, data, (src, self.port))
+
+    def _receive(self, data: bytes, addr: Tuple[str, int]) -> None:
+        # loop thread; what was still queued when the endpoint closed is dropped
+        if self._closed:
+            return
+        try:
+            self._on_datagram(data, addr)
+        except Exception as e:
+            print(f"[{self.ip}] Handling a datagram from {addr[0]} failed: {e}")
+
+    def close(self) -> None:
+        self._closed = True
+        self.network.unregister(self)
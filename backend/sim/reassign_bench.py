@@ -0,0 +1,186 @@
+"""
+Work lost to worker failures: a discrete-event model of one render job in
+which some workers die part-way through. It compares two reassignment
+policies:
+- full: the lost worker's whole frame list, split evenly over the
+  survivors. This is what the leader did before received_frames existed.
+- missing: backend.services.reassignment.plan_reassignment, i.e. only the
+  frames not yet received, to the least loaded survivors
+
+    python -m backend.sim.reassign_bench --workers 4 --frames 240 --fail-at 0.25 0.5 0.9
+
+Nothing is rendered or slept: frame times are drawn from a seeded
+log-normal distribution, so both policies see the same job and the same
+failure. Prints one JSON document.
+"""
+import argparse
+import json
+import random
+from statistics import mean
+from typing import Any, Dict, List, Optional
+
+from backend.services.reassignment import plan_reassignment
+
+
+def _split(frames: List[int], workers: List[str]) -> Dict[str, List[int]]:
+    """Contiguous ranges, the first len % workers get one extra frame (as create_job does)."""
+    base, extra = divmod(len(frames), len(workers))
+    jobs, start = {}, 0
+    for i, worker in enumerate(workers):
+        count = base + (1 if i < extra else 0)
+        jobs[worker] = frames[start:start + count]
+        start += count
+    return jobs
+
+
+def _full_reassignment(jobs: Dict[str, List[int]], lost: str, received) -> Dict[str, List[int]]:
+    survivors = [worker for worker in jobs if worker != lost]
+    new_jobs = {worker: list(jobs[worker]) for worker in survivors}
+    for worker, chunk in _split(list(jobs[lost]), survivors).items():
+        new_jobs[worker].extend(chunk)
+    return new_jobs
+
+
+POLICIES = {
+    "full": _full_reassignment,
+    "missing": lambda jobs, lost, received: plan_reassignment(jobs, lost, received)[0],
+}
+
+
+def _finish_times(frames: List[int], cost: Dict[int, float], speed: float,
+                  resume_at: int = -1, resume_time: float = 0.0) -> List[float]:
+    """When each frame of a worker's list is done. Frames from index `resume_at` on start no earlier than `resume_time`."""
+    t, times = 0.0, []
+    for i, frame in enumerate(frames):
+        if i == resume_at:
+            t = max(t, resume_time)
+        t += cost[frame] / speed
+        times.append(t)
+    return times
+
+
+def simulate(policy: str, jobs: Dict[str, List[int]], cost: Dict[int, float], speed: Dict[str, float],
+             lost: List[str], fail_time: float, detect_s: float) -> Dict[str, Any]:
+    """One job where `lost` die at `fail_time` and the leader reassigns `detect_s` later."""
+    reassign_time = fail_time + detect_s
+    received = set()
+    for worker, frames in jobs.items():
+        deadline = fail_time if worker in lost else reassign_time
+        for frame, done_at in zip(frames, _finish_times(frames, cost, speed[worker])):
+            if done_at <= deadline:
+                received.add(frame)
+
+    # The leader handles one disconnection at a time
+    new_jobs = jobs
+    for worker in lost:
+        new_jobs = POLICIES[policy](new_jobs, worker, received)
+
+    makespan, rendered, wasted, reassigned = 0.0, 0.0, 0.0, 0
+    for worker, frames in new_jobs.items():
+        original = len(jobs[worker])
+        times = _finish_times(frames, cost, speed[worker], resume_at=original, resume_time=reassign_time)
+        if times:
+            makespan = max(makespan, times[-1])
+        for frame in frames[original:]:
+            reassigned += 1
+            rendered += cost[frame] / speed[worker]
+            if frame in received:
+                wasted += cost[frame] / speed[worker]
+    for worker in lost:
+        # Delivered frames plus the time sunk into the frame it died rendering
+        done = [t for t in _finish_times(jobs[worker], cost, speed[worker]) if t <= fail_time]
+        makespan = max(makespan, done[-1] if done else 0.0)
+
+    return {
+        "frames_reassigned": reassigned,
+        "frames_rerendered": sum(1 for worker, frames in new_jobs.items()
+                                 for frame in frames[len(jobs[worker]):] if frame in received),
+        "reassigned_render_s": rendered,
+        "wasted_render_s": wasted,
+        "makespan_s": makespan,
+    }
+
+
+def run_reassign_benchmark(
+    workers: int = 4,
+    frames: int = 240,
+    frame_s: float = 10.0,
+    jitter: float = 0.3,
+    speed_spread: float = 0.0,
+    failures: int = 1,
+    fail_at: Optional[List[float]] = None,
+    detect_s: float = 5.0,
+    trials: int = 20,
+    seed: Optional[int] = None,
+) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    names = [f"w{i}" for i in range(workers)]
+    results = []
+    for at in fail_at or [0.25, 0.5, 0.75, 0.9]:
+        runs: Dict[str, List[Dict[str, Any]]] = {policy: [] for policy in POLICIES}
+        baseline = []
+        for _ in range(trials):
+            cost = {frame: frame_s * rng.lognormvariate(0, jitter) for frame in range(1, frames + 1)}
+            speed = {name: rng.uniform(1 - speed_spread, 1 + speed_spread) for name in names}
+            jobs = _split(list(cost), names)
+            healthy = max(_finish_times(jobs[name], cost, speed[name])[-1] for name in names if jobs[name])
+            baseline.append(healthy)
+            lost = rng.sample(names, min(failures, workers - 1))
+            for policy in POLICIES:
+                runs[policy].append(simulate(policy, jobs, cost, speed, lost, at * healthy, detect_s))
+
+        summary = {policy: {key: round(mean(run[key] for run in policy_runs), 3) for key in policy_runs[0]}
+                   for policy, policy_runs in runs.items()}
+        full, missing = summary["full"], summary["missing"]
+        results.append({
+            "fail_at": at,
+            "healthy_makespan_s": round(mean(baseline), 3),
+            **summary,
+            "saved_frames": round(full["frames_reassigned"] - missing["frames_reassigned"], 3),
+            "saved_render_s": round(full["reassigned_render_s"] - missing["reassigned_render_s"], 3),
+            "makespan_reduction_pct": round(100 * (1 - missing["makespan_s"] / full["makespan_s"]), 1)
+            if full["makespan_s"] else None,
+        })
+    return {
+        "workers": workers,
+        "frames": frames,
+        "frame_s": frame_s,
+        "failures": failures,
+        "detect_s": detect_s,
+        "trials": trials,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frames re-rendered after worker failures, per reassignment policy")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--frames", type=int, default=240)
+    parser.add_argument("--frame-s", type=float, default=10.0, help="median render time per frame (s)")
+    parser.add_argument("--jitter", type=float, default=0.3, help="log-normal sigma of frame times")
+    parser.add_argument("--speed-spread", type=float, default=0.0, help="workers' speeds vary by up to +/- this fraction")
+    parser.add_argument("--failures", type=int, default=1, help="workers that die at the same moment")
+    parser.add_argument("--fail-at", type=float, nargs="+", default=[0.25, 0.5, 0.75, 0.9],
+                        help="failure time as a fraction of the healthy makespan")
+    parser.add_argument("--detect-s", type=float, default=5.0, help="failure detection delay (s)")
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    results = run_reassign_benchmark(
+        workers=args.workers,
+        frames=args.frames,
+        frame_s=args.frame_s,
+        jitter=args.jitter,
+        speed_spread=args.speed_spread,
+        failures=args.failures,
+        fail_at=args.fail_at,
+        detect_s=args.detect_s,
+        trials=args.trials,
+        seed=args.seed,
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Discovery listener benchmark: one real NetworkDiscoveryService datagram
+handler on a loopback UDP port (an asyncio endpoint on its own event loop),
+fed DISCOVER beacons for N simulated peers from a single sender socket.
+"""
+import random
+import socket
+import time
+from typing import Any, Dict, List, Optional
+
+from backend.services.discovery_service import NetworkDiscoveryService
+from backend.services.event_loop import EventLoopThread
+from backend.services.failure_detector import PhiAccrualFailureDetector
+from backend.services.transport import UdpTransport
+from .cluster import DEFAULT_TIMING, StaticSampler
+from .control_bench import percentile, _ms
+
+
+class _TappedTransport(UdpTransport):
+    """UdpTransport that remembers the last datagram, so the node can read the bench tag."""
+
+    def __init__(self, port: int):
+        super().__init__(port)
+        self.last = b""
+
+    def open(self, on_datagram, control=None) -> "_TappedTransport":
+        def tapped(data, addr):
+            self.last = data
+            on_datagram(data, addr)
+        return super().open(tapped, control)
+
+
+class ListenerUnderTest(NetworkDiscoveryService):
+    """
+    NetworkDiscoveryService with only the listener and the failure detector
+    running. Beacons carry a trailing ":<tag>" field (ignored by the parser)
+    that maps back to the send time.
+    """
+
+    def __init__(self, port: int, timing: Dict[str, Any]):
+        super().__init__(
+            sampler=StaticSampler(10000),
+            transport_factory=_TappedTransport,
+            local_ip="127.0.0.1",
+            pc_name="bench-listener",
+            control=EventLoopThread("bench-listener"),
+        )
+        self.listen_port = port
+        self.timing = timing
+        self.reset_failure_detector()
+        self._stale_check_interval = timing["stale_check_interval"]
+
+        self.sent_at: Dict[int, float] = {}
+        self.latencies: List[float] = []
+        self.processed = 0
+        self.last_processed_at = 0.0
+
+    def reset_failure_detector(self):
+        self.failure_detector = PhiAccrualFailureDetector(
+            threshold=self.timing["phi_threshold"],
+            expected_interval=self.timing["beacon_interval"],
+            min_std_dev=self.timing["min_std_dev"],
+            acceptable_pause=self.timing["acceptable_pause"],
+        )
+
+    def start(self):
+        self.running = True
+        self.socket = self.transport_factory(self.listen_port).open(self.handle_datagram, self._control)
+
+    def start_failure_detection(self):
+        self._tasks.append(self._control.submit(self.check_stale_devices()))
+
+    def stop(self):
+        self.running = False
+        for task in self._tasks:
+            task.cancel()
+        self._probe_pool.shutdown(wait=False)
+        try:
+            self.socket.close()
+        except Exception:
+            pass
+
+    def add_device(self, name, ip, score, role="Undefined"):
+        super().add_device(name, ip, score, role=role)
+        now = time.perf_counter()
+        self.processed += 1
+        self.last_processed_at = now
+        tag = self.socket.last.rsplit(b":", 1)[-1]
+        sent = self.sent_at.pop(int(tag), None) if tag.isdigit() else None
+        if sent is not None:
+            self.latencies.append(now - sent)
+
+    def probe_device(self, ip):
+        # Every simulated peer is alive: any suspicion is a false positive
+        return True
+
+    def _notify_leader_of_disconnection(self, leader_ip, ip, role):
+        pass
+
+    def handle_leader_down(self, leader_ip):
+        pass
+
+
+def run_udp_benchmark(
+    peers: int = 10,
+    rate: float = 0.0,
+    messages: int = 20000,
+    loss: float = 0.0,
+    duration: float = 2.0,
+    timing: Optional[Dict[str, Any]] = None,
+    port: int = 18888,
+    seed: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Two phases against one listener:
+    - throughput: `messages` beacons round-robin over `peers` (at `rate`
+      msg/s, 0 = as fast as possible), counting what the listener processed
+    - liveness: every peer beacons every `beacon_interval` for `duration`
+      seconds with `loss` of its beacons dropped; no peer dies, so every
+      suspicion the phi detector raises is a false positive
+    """
+    timing = dict(DEFAULT_TIMING, **(timing or {}))
+    rng = random.Random(seed)
+    node = ListenerUnderTest(port, timing)
+    node.start()
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    target = ("127.0.0.1", port)
+    ips = [f"10.{i // 62500}.{(i // 250) % 250}.{i % 250 + 1}" for i in range(peers)]
+
+    try:
+        # --- throughput ---
+        interval = 1.0 / rate if rate else 0.0
+        cpu_started = time.process_time()
+        started = time.perf_counter()
+        for i in range(messages):
+            ip = ips[i % peers]
+            node.sent_at[i] = time.perf_counter()
+            sender.sendto(f"DISCOVER:peer-{ip}:{ip}:5000:Worker:{i}".encode(), target)
+            if interval:
+                time.sleep(max(0.0, started + (i + 1) * interval - time.perf_counter()))
+        deadline = time.monotonic() + 2.0
+        while node.processed < messages and time.monotonic() < deadline:
+            time.sleep(0.01)
+        cpu = time.process_time() - cpu_started
+        elapsed = (node.last_processed_at or time.perf_counter()) - started
+        processed = node.processed
+
+        throughput = {
+            "messages": messages,
+            "rate": rate,
+            "processed": processed,
+            "dropped_by_socket": messages - processed,
+            "messages_per_s": round(processed / elapsed, 1) if elapsed else None,
+            "cpu_us_per_message": round(cpu / processed * 1e6, 2) if processed else None,
+            "latency_ms": {
+                "p50": _ms(percentile(node.latencies, 0.50)),
+                "p99": _ms(percentile(node.latencies, 0.99)),
+                "max": _ms(max(node.latencies) if node.latencies else None),
+            },
+        }
+
+        # --- liveness under loss ---
+        # The throughput burst would have taught the detector sub-millisecond intervals
+        node.sent_at.clear()
+        node.reset_failure_detector()
+        node.start_failure_detection()
+        beacon_interval = timing["beacon_interval"]
+        ends = time.monotonic() + duration
+        sent = dropped = 0
+        while time.monotonic() < ends:
+            tick = time.monotonic()
+            for ip in ips:
+                sent += 1
+                if rng.random() < loss:
+                    dropped += 1
+                    continue
+                sender.sendto(f"DISCOVER:peer-{ip}:{ip}:5000:Worker".encode(), target)
+            time.sleep(max(0.0, beacon_interval - (time.monotonic() - tick)))
+        metrics = node.failure_detector.metrics()
+
+        liveness = {
+            "duration_s": duration,
+            "beacon_interval": beacon_interval,
+            "loss": loss,
+            "beacons_sent": sent,
+            "beacons_dropped": dropped,
+            "members_seen": len(node.discovered_devices),
+            "suspicions": metrics["suspicions"],
+            "false_positives": metrics["false_positives"],
+            "removed": peers - len(node.discovered_devices),
+        }
+
+        return {"peers": peers, "throughput": throughput, "liveness": liveness}
+    finally:
+        sender.close()
+        node.stop()
@@ -5,6 +5,11 @@ const NetworkContext = createContext(null);
 
 const API_BASE = "http://localhost:5050/api";
 
+const applyDevice = (device) => ({
+  ...device,
+  timestamp: device.last_seen ? device.last_seen * 1000 : Date.now(),
+});
+
 export const NetworkProvider = ({ children }) => {
   const [devices, setDevices] = useState([]);
   const [isRunning, setIsRunning] = useState(false);
@@ -13,52 +18,82 @@ export const NetworkProvider = ({ children }) => {
 
   const [messageApi, contextHolder] = message.useMessage();
 
-  const fetchStatus = useCallback(async () => {
-    try {
-      const res = await fetch(`${API_BASE}/status`);
-      const data = await res.json();
-      setIsRunning(data.running);
-      setLocalInfo({
-        pcName: data.local_pc_name,
-        ip: data.local_ip,
-      });
-    } catch {
-      messageApi.error("Failed to connect to network service");
-    }
-  }, [messageApi]);
-
-  const fetchDevices = useCallback(async () => {
-    if (!isRunning) return;
-
-    try {
-      const res = await fetch(`${API_BASE}/devices`);
-      const data = await res.json();
-
-      const enriched = (data || []).map(d => ({
-        ...d,
-        timestamp: d.last_seen ? d.last_seen * 1000 : Date.now(),
-      }));
-
-      setDevices(enriched);
-    } catch {
-      console.error("Device polling failed");
-    }
-  }, [isRunning]);
-
-  useEffect(() => {
-    fetchStatus();
-  }, [fetchStatus]);
+  // Role / election state and job summaries, kept current by /api/events
+  const [election, setElection] = useState(null);
+  const [jobs, setJobs] = useState({});
+
+  const applySnapshot = useCallback((data) => {
+    setIsRunning(data.running);
+    setLocalInfo({
+      pcName: data.local_pc_name,
+      ip: data.local_ip,
+    });
+    setDevices((data.devices || []).map(applyDevice));
+    setElection(data.role);
+    setJobs(Object.fromEntries((data.jobs || []).map(job => [job.job_id, job])));
+  }, []);
+
+  const applyMembership = useCallback((delta) => {
+    setDevices(prev => {
+      if (delta.event === "cleared") return [];
+      const others = prev.filter(d => d.ip !== delta.ip);
+      if (delta.event === "removed") return others;
+      return [...others, applyDevice(delta.device)].sort((a, b) => (a.ip < b.ip ? -1 : 1));
+    });
+  }, []);
 
   useEffect(() => {
-    if (!isRunning) {
-      setDevices([]);
-      return;
-    }
+    let source = null;
+    let retryTimer = null;
+    let lastEventId = null;
+    let closed = false;
+    let warned = false;
+
+    const connect = () => {
+      const query = lastEventId ? `?last_event_id=${encodeURIComponent(lastEventId)}` : "";
+      source = new EventSource(`${API_BASE}/events${query}`);
+
+      const handle = (apply) => (e) => {
+        lastEventId = e.lastEventId || lastEventId;
+        apply(JSON.parse(e.data));
+      };
+      source.addEventListener("snapshot", handle(applySnapshot));
+      source.addEventListener("membership", handle(applyMembership));
+      source.addEventListener("role", handle((role) => {
+        setElection(role);
+        setIsRunning(role.running);
+        if (!role.running) setDevices([]);
+      }));
+      source.addEventListener("job", handle((job) => {
+        setJobs(prev => ({ ...prev, [job.job_id]: { ...prev[job.job_id], ...job } }));
+      }));
+      source.addEventListener("frame", handle((frame) => {
+        setJobs(prev => ({
+          ...prev,
+          [frame.job_id]: { ...prev[frame.job_id], job_id: frame.job_id, remaining_frames: frame.remaining_frames, last_frame: frame.filename },
+        }));
+      }));
 
-    fetchDevices();
-    const interval = setInterval(fetchDevices, 2000);
-    return () => clearInterval(interval);
-  }, [isRunning, fetchDevices]);
+      source.onerror = () => {
+        if (!lastEventId && !warned) {
+          warned = true;
+          messageApi.error("Failed to connect to network service");
+        }
+        // EventSource retries network errors itself (sending Last-Event-ID);
+        // an HTTP error (e.g. 503, too many streams) closes it for good
+        if (source.readyState === EventSource.CLOSED && !closed) {
+          retryTimer = setTimeout(connect, 3000);
+        }
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (source) source.close();
+    };
+  }, [applySnapshot, applyMembership, messageApi]);
 
   const enterNetwork = async () => {
     setLoading(true);
@@ -89,6 +124,8 @@ export const NetworkProvider = ({ children }) => {
         devices,
         isRunning,
         localInfo,
+        election,
+        jobs,
         loading,
         enterNetwork,
         leaveNetwork,
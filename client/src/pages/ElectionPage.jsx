@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useCallback } from "react";
+import React, { useMemo, useState } from "react";
 import { Card, Typography, Button, Empty, message } from "antd";
 import { ReloadOutlined } from "@ant-design/icons";
 import { useNetwork } from "../context/NetworkContext";
@@ -7,32 +7,19 @@ import RingTopology from "./RingTopology";
 const { Title, Text } = Typography;
 
 export default function ElectionPage() {
-  const { enterNetwork, isRunning, leaveNetwork } = useNetwork();
+  const { enterNetwork, isRunning, leaveNetwork, election, devices } = useNetwork();
   const API_BASE = "http://localhost:5050/api";
   const [loading, setLoading] = useState(true);
-  const [electionActive, setElectionActive] = useState(false);
-  const [myRole, setMyRole] = useState(null);
-  const [leader, setLeader] = useState(null);
-  const [consensus, setConsensus] = useState(null);
-  const [ring, setRing] = useState([]);
 
-  const checkElectionStatus = useCallback(async () => {
-    try {
-      const response = await fetch(`${API_BASE}/election/status`);
-      const data = await response.json();
-
-      if (data.current_leader) {
-        console.log("Election already completed.");
-        setElectionActive(true);
-        setLeader(data.current_leader);
-        setConsensus(data.leader_consensus);
-        setRing(data.ring_topology);
-        setMyRole(data.my_role);
-      }
-    } catch (error) {
-      console.error("Error checking election status:", error);
-    }
-  }, []);
+  // Pushed over /api/events (role + membership deltas); no polling
+  const leader = election?.current_leader || null;
+  const electionActive = Boolean(leader);
+  const myRole = election?.my_role || null;
+  const consensus = election?.leader_consensus || null;
+  const ring = useMemo(
+    () => devices.map((d, idx) => ({ ...d, position: idx + 1, is_leader: d.ip === leader })),
+    [devices, leader]
+  );
 
   const initialeLeaderElection = async () => {
     try {
@@ -53,18 +40,6 @@ export default function ElectionPage() {
     }
   };
 
-  useEffect(() => {
-    checkElectionStatus();
-
-    if (!isRunning || electionActive) return;
-
-    const electionInterval = setInterval(() => {
-      checkElectionStatus();
-    }, 2000);
-
-    return () => clearInterval(electionInterval);
-  }, [isRunning, electionActive, checkElectionStatus]);
-
   return (
     <Card
       title={<Title level={4}>Leader Election</Title>}
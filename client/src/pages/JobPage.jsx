@@ -12,6 +12,7 @@ import {
   Checkbox,
   Select,
   Alert,
+  Descriptions,
 } from "antd";
 import {
   ReloadOutlined,
@@ -19,13 +20,17 @@ import {
 } from "@ant-design/icons";
 import { useNetwork } from "../context/NetworkContext";
 import LeaderControlPanel from "./components/LeaderControlPanel";
+import JobProgressPanel from "./components/JobProgressPanel";
 
 const { Dragger } = Upload;
 const { Title, Text } = Typography;
 const { Option } = Select;
 
+const formatBytes = (bytes) =>
+  bytes >= 1024 ** 3 ? `${(bytes / 1024 ** 3).toFixed(1)} GB` : `${(bytes / 1024 ** 2).toFixed(0)} MB`;
+
 export default function JobPage() {
-  const { isRunning, localInfo } = useNetwork();
+  const { isRunning, localInfo, election } = useNetwork();
   const [showLeaderPanel, setShowLeaderPanel] = useState(false);
   const API_BASE = "http://localhost:5050/api";
   const [loading, setLoading] = useState(true);
@@ -37,6 +42,7 @@ export default function JobPage() {
   const [form] = Form.useForm();
   const [selectedFile, setSelectedFile] = useState(null);
   const [jobSubmitted, setJobSubmitted] = useState(false);
+  const [submittedJobId, setSubmittedJobId] = useState(null);
 
   /* ---------------- Election Status ---------------- */
   const checkElectionStatus = useCallback(async () => {
@@ -56,9 +62,14 @@ export default function JobPage() {
     }
   }, []);
 
+  // Leader / role changes are pushed over /api/events
   useEffect(() => {
-    checkElectionStatus();
-  }, []);
+    if (election?.current_leader) {
+      setLeader(election.current_leader);
+      setMyRole(election.my_role);
+      setLoading(false);
+    }
+  }, [election]);
 
   /* ---------------- Upload Handler ---------------- */
   const handleUpload = async (file) => {
@@ -113,7 +124,9 @@ export default function JobPage() {
 
       if (!res.ok) throw new Error();
 
+      const data = await res.json();
       messageApi.success("Job successfully submitted to leader 🚀");
+      setSubmittedJobId(data.job_id);
       setJobSubmitted(true);
     } catch {
       messageApi.error("Failed to submit job");
@@ -231,6 +244,37 @@ export default function JobPage() {
             </Form>
           )}
 
+          {/* ---------------- Scene Analysis ---------------- */}
+          {jobDetails?.scene && (
+            <Descriptions title="Scene Analysis" size="small" bordered column={2} style={{ marginTop: 16 }}>
+              <Descriptions.Item label="Resolution">
+                {jobDetails.resolution_x}×{jobDetails.resolution_y} @ {jobDetails.resolution_percentage}%
+              </Descriptions.Item>
+              <Descriptions.Item label="Samples">
+                {jobDetails.samples ?? "—"}{jobDetails.denoiser ? ` (${jobDetails.denoiser})` : ""}
+              </Descriptions.Item>
+              <Descriptions.Item label="Objects / Instances">
+                {jobDetails.scene.objects} / {jobDetails.scene.instances}
+              </Descriptions.Item>
+              <Descriptions.Item label="Polygons">{jobDetails.scene.polygons?.toLocaleString()}</Descriptions.Item>
+              <Descriptions.Item label="Textures">
+                {jobDetails.textures?.images} ({formatBytes(jobDetails.textures?.memory_bytes || 0)})
+                {jobDetails.textures?.missing?.length ? `, ${jobDetails.textures.missing.length} missing` : ""}
+              </Descriptions.Item>
+              <Descriptions.Item label="Linked Libraries">
+                {jobDetails.libraries?.length || 0}
+                {jobDetails.libraries?.some(lib => lib.missing) ? " (some missing)" : ""}
+              </Descriptions.Item>
+              <Descriptions.Item label="Simulation Caches">
+                {jobDetails.caches?.length || 0}
+                {jobDetails.caches?.some(cache => !cache.baked) ? " (not all baked)" : ""}
+              </Descriptions.Item>
+              <Descriptions.Item label="Visibility Changes">
+                {jobDetails.frame_hints?.change_frames?.length || 0} frames
+              </Descriptions.Item>
+            </Descriptions>
+          )}
+
           <Divider />
 
           <Button
@@ -245,12 +289,16 @@ export default function JobPage() {
         </>
       )}
       {jobSubmitted && (
-        <Alert
-          type="success"
-          showIcon
-          message="Job Submitted Successfully"
-          description="Your render job has been sent to the leader node and is now queued for processing."
-        />
+        <>
+          <Alert
+            type="success"
+            showIcon
+            style={{ marginBottom: 16 }}
+            message="Job Submitted Successfully"
+            description="Your render job has been sent to the leader node and is now queued for processing."
+          />
+          {submittedJobId && <JobProgressPanel jobId={submittedJobId} />}
+        </>
       )}
 
     </Card>
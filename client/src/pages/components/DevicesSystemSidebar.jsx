@@ -15,7 +15,9 @@ const DevicesSystemSidebar = ({ collapsed }) => {
   } = theme.useToken();
   const { devices, isRunning, localInfo, stats } = useNetwork();
 
-  const isOnline = (d) => d.timestamp && (Date.now() - d.timestamp) / 1000 < 15;
+  // Devices arrive as membership deltas from /api/events: the failure
+  // detector removes dead ones, so every listed device is online
+  const isOnline = () => isRunning;
 
   const getSecondsSinceLastSeen = (device) => {
     if (!device.timestamp) return 0;
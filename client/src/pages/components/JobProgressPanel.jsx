@@ -0,0 +1,82 @@
+import { useEffect, useState } from "react";
+import { Card, Typography, Progress, Table, Statistic, Row, Col, Tag } from "antd";
+import { useNetwork } from "../../context/NetworkContext";
+
+const { Title, Text } = Typography;
+
+const API_BASE = "http://localhost:5050/api";
+// Only while the job runs; on the leader, frame events also trigger a refetch
+const POLL_INTERVAL = 3000;
+
+const formatSeconds = (s) => {
+    if (s === null || s === undefined) return "—";
+    if (s < 60) return `${s.toFixed(1)} s`;
+    const m = Math.floor(s / 60);
+    if (m < 60) return `${m} min ${Math.round(s % 60)} s`;
+    return `${Math.floor(m / 60)} h ${m % 60} min`;
+};
+
+const workerColumns = [
+    { title: "Worker", dataIndex: "ip", key: "ip" },
+    { title: "Done", key: "done", render: (_, w) => `${w.done}${w.assigned != null ? ` / ${w.assigned}` : ""}` },
+    { title: "Mean frame", dataIndex: "mean_frame_s", key: "mean", render: formatSeconds },
+    { title: "p95 frame", dataIndex: "p95_frame_s", key: "p95", render: formatSeconds },
+    { title: "Rate", dataIndex: "rate_fps", key: "rate", render: (r) => (r ? `${(r * 60).toFixed(1)} frames/min` : "—") },
+    { title: "ETA", dataIndex: "eta_s", key: "eta", render: formatSeconds },
+];
+
+const JobProgressPanel = ({ jobId }) => {
+    const { jobs } = useNetwork();
+    const [progress, setProgress] = useState(null);
+    const jobEvent = jobs[jobId];
+    const finished = progress && progress.frames_remaining === 0;
+
+    useEffect(() => {
+        if (!jobId) return;
+        let cancelled = false;
+        const load = async () => {
+            try {
+                const res = await fetch(`${API_BASE}/jobs/${jobId}/progress`);
+                if (res.ok && !cancelled) setProgress(await res.json());
+            } catch (error) {
+                console.error("Error fetching job progress:", error);
+            }
+        };
+        load();
+        if (finished) return () => { cancelled = true; };
+        const timer = setInterval(load, POLL_INTERVAL);
+        return () => {
+            cancelled = true;
+            clearInterval(timer);
+        };
+    }, [jobId, jobEvent, finished]);
+
+    if (!progress) return null;
+
+    const percent = progress.frames_total
+        ? Math.round((100 * (progress.frames_total - (progress.frames_remaining ?? progress.frames_total))) / progress.frames_total)
+        : 0;
+    const workers = Object.entries(progress.workers || {}).map(([ip, w]) => ({ ip, ...w }));
+
+    return (
+        <Card>
+            <Title level={5} style={{ marginTop: 0 }}>
+                Render Progress {progress.status && <Tag>{progress.status}</Tag>}
+            </Title>
+            <Progress percent={percent} style={{ width: "100%" }} />
+            <Row gutter={16} style={{ margin: "12px 0" }}>
+                <Col span={6}><Statistic title="Frames" value={`${progress.frames_total - (progress.frames_remaining ?? 0)} / ${progress.frames_total ?? "?"}`} /></Col>
+                <Col span={6}><Statistic title="Rate" value={progress.rate_fps ? `${(progress.rate_fps * 60).toFixed(1)} /min` : "—"} /></Col>
+                <Col span={6}><Statistic title="Elapsed" value={formatSeconds(progress.elapsed_s)} /></Col>
+                <Col span={6}><Statistic title="ETA" value={formatSeconds(progress.eta_s)} /></Col>
+            </Row>
+            {workers.length > 0 ? (
+                <Table size="small" rowKey="ip" pagination={false} columns={workerColumns} dataSource={workers} />
+            ) : (
+                <Text type="secondary">No per-worker statistics yet.</Text>
+            )}
+        </Card>
+    );
+};
+
+export default JobProgressPanel;
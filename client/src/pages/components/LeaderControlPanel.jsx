@@ -1,18 +1,27 @@
-import { Card, Typography, Progress } from "antd";
+import { Card, Typography } from "antd";
+import { useNetwork } from "../../context/NetworkContext";
+import JobProgressPanel from "./JobProgressPanel";
 
-const { Title } = Typography;
+const { Title, Text } = Typography;
 
 const LeaderControlPanel = () => {
+    const { jobs } = useNetwork();
+    const active = Object.values(jobs).filter(job => job.status === "in_progress");
+
+    if (active.length === 0) {
+        return (
+            <Card >
+                <Title level={5} style={{ marginTop: 0 }}>Render Progress:</Title>
+                <Text type="secondary">No job is rendering.</Text>
+            </Card>
+        )
+    }
+
     return (
-        <Card >
-            <Title level={5} style={{ marginTop: 0 }}>Render Progress:</Title>
-            <Progress
-                // steps={100}
-                percent={1}
-                style={{ width: "100%" }}
-            />
-        </Card>
+        <>
+            {active.map(job => <JobProgressPanel key={job.job_id} jobId={job.job_id} />)}
+        </>
     )
 }
 
-export default LeaderControlPanel;
\ No newline at end of file
+export default LeaderControlPanel;
@@ -1,9 +1,9 @@
 from backend.app import create_app
+from backend.server import options_from_env, serve
 from dotenv import load_dotenv
 
 load_dotenv('.env')
 app = create_app()
 
 if __name__ == "__main__":
-    print("Server running: http://localhost:5050")
-    app.run(host="0.0.0.0", port=5050, debug=True, use_reloader=False)
\ No newline at end of file
+    serve(app, host="0.0.0.0", port=5050, **options_from_env())
@@ -3,10 +3,11 @@ import time
 import webview
 
 from backend.app import create_app
+from backend.server import options_from_env, serve
 
 def run_server():
    app = create_app()
-   app.run(host="0.0.0.0", port=5050, debug=False, use_reloader=False)
+   serve(app, host="0.0.0.0", port=5050, **options_from_env())
 
 if __name__ == "__main__":
    # Start backend in background thread
@@ -1,16 +1,19 @@
 import time
 import json
 import os
-import shutil
 import requests
 import subprocess
 from threading import Thread
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+from watchdog.events import FileModifiedEvent, FileSystemEventHandler
 from backend.shared.state import discovery
 from dotenv import load_dotenv
 from backend.services.ffmpeg_service import stitch_pngs_to_video
 from backend.shared.state import discovery
+from backend.services import metrics
+from backend.services.tracing import Tracer, ship
+from backend.services.profiler import CONTROL_FILENAME, PROFILE_DIR, profiled, profiler
+from backend.services.storage_manager import link_tree
 
 load_dotenv('.env')
 BLENDER_PATH = os.getenv("BLENDER_PATH") or "blender"
@@ -20,7 +23,33 @@ WATCH_DIR = "jobs"
 JSON_FILENAME = "metadata.json"
 SERVER_URL = "http://localhost:5050/api/jobs/broadcast-to-workers"
 
-processed_blender_jobs = []
+# job -> (leader term, generation) this node finished; a reassignment or a
+# failover changes it and the job is picked up again
+processed_blender_jobs = {}
+# job -> (leader ip, frames that leader acknowledged)
+delivered_frames = {}
+# job -> (leader ip, assignment, monotonic time of the next pass, delay) while
+# frames are undelivered; a new leader or assignment is tried right away
+upload_backoff = {}
+UPLOAD_RETRY_MIN = 1.0
+UPLOAD_RETRY_MAX = 60.0
+
+# upload_frame results
+UPLOAD_OK = "ok"
+UPLOAD_RETRY = "retry"  # leader unreachable or failing (5xx): send again later
+UPLOAD_REFUSED = "refused"  # leader answered 4xx, e.g. the job is no longer in progress there
+
+# Exported to metrics/worker.prom (served by the API's /api/metrics)
+METRICS_EXPORT_INTERVAL = 5.0
+RENDER_SECONDS = metrics.histogram("renderfarm_worker_render_seconds", "Blender subprocess time per rendered frame")
+UPLOAD_SECONDS = metrics.histogram("renderfarm_worker_frame_upload_seconds", "Time to upload one frame to the leader")
+UPLOAD_BYTES = metrics.histogram("renderfarm_worker_frame_upload_bytes", "Size of frames uploaded to the leader", buckets=metrics.SIZE_BUCKETS)
+FRAMES_UPLOADED = metrics.counter("renderfarm_worker_frames_uploaded_total", "Frame uploads by result", ("result",))
+RENDER_SLOTS = metrics.gauge("renderfarm_worker_render_slots_active", "Blender render processes running on this worker")
+FRAMES_PENDING = metrics.gauge("renderfarm_worker_frames_pending", "Frames of the current job still to render on this worker")
+
+# Spans shipped to the job's leader (/api/jobs/<id>/trace)
+tracer = Tracer(node=f"{discovery.local_ip} worker")
 
 # ==========================================
 # WATCHDOG HANDLER
@@ -92,13 +121,11 @@ class FolderHandler(FileSystemEventHandler):
 # RENDERING LOOP
 # ==========================================
 
+@profiled("worker.render_in_progress_jobs")
 def render_in_progress_jobs():
     while True:
         try:
             for job_folder in os.listdir(WATCH_DIR):
-                if job_folder in processed_blender_jobs:
-                    continue
-
                 folder_path = os.path.join(WATCH_DIR, job_folder)
                 json_path = os.path.join(folder_path, JSON_FILENAME)
                 if not os.path.exists(json_path):
@@ -110,35 +137,61 @@ def render_in_progress_jobs():
                 if data.get("status") != "in_progress":
                     continue
 
+                # Leader term and generation: a reassignment or a new leader after a
+                # failover brings the job back for another pass
+                assignment = (data.get("leader_term", 0), data.get("generation", 0))
+                if processed_blender_jobs.get(job_folder) == assignment:
+                    continue
+                backoff = upload_backoff.get(job_folder)
+                if backoff and backoff[:2] == (data.get("leader_ip"), assignment) and backoff[2] > time.monotonic():
+                    continue
+
                 blend_file = data.get("filename")
                 if not blend_file or not os.path.exists(os.path.join(folder_path, blend_file)):
                     print(f"Blend file not found for job {job_folder}")
                     continue
 
-                # Get frames assigned to this node
-                my_id = str(discovery.local_ip)
-                frames = data.get("jobs", {}).get(my_id, [])
-                if not frames:
-                    print(f"No frames assigned to this node for job {job_folder}")
+                if not data.get("leader_ip"):
+                    print(f"No leader IP found for job {job_folder}")
                     continue
+                leader_ip = data.get("leader_ip")
+                leader_url = f"http://{leader_ip}:5050/api/jobs/submit-frames"
 
-                # Prepare output folder
+                # Frames stay in render_output/<job> until the job is released, so a
+                # new leader can be sent all of them again
                 job_output_path = os.path.join(os.getcwd(), "render_output", job_folder)
                 os.makedirs(job_output_path, exist_ok=True)
+                kept = _kept_frames(job_output_path)
+                if job_folder not in delivered_frames or delivered_frames[job_folder][0] != leader_ip:
+                    delivered_frames[job_folder] = (leader_ip, set())
+                delivered = delivered_frames[job_folder][1]
 
-                if not data.get("leader_ip"):
-                    print(f"No leader IP found for job {job_folder}")
+                # Frames assigned to this node that it has not rendered yet, and
+                # rendered ones this leader has not acknowledged
+                my_id = str(discovery.local_ip)
+                assigned = data.get("jobs", {}).get(my_id, [])
+                frames = [frame for frame in assigned if frame not in kept]
+                unsent = sorted(kept - delivered)
+                if not assigned and not unsent:
+                    print(f"No frames assigned to this node for job {job_folder}")
                     continue
-                leader_ip = data.get("leader_ip")
-                leader_url = f"http://{leader_ip}:5050/api/jobs/submit-frames"
 
                 num_frames_sent_leader = 0
+                FRAMES_PENDING.set(len(frames))
+                assignment_started = time.time()
+
+                refused = False
+                for frame_no in unsent:
+                    result = upload_frame(leader_url, job_folder, frame_no, os.path.join(job_output_path, f"{frame_no}.png"))
+                    if result == UPLOAD_OK:
+                        num_frames_sent_leader += 1
+                        delivered.add(frame_no)
+                    elif result == UPLOAD_REFUSED:
+                        refused = True
+                        break
 
                 # --- FRAME-BY-FRAME RENDER & UPLOAD ---
-                for frame_no in frames:
-                    
-                    
-                    
+                for frame_no in ([] if refused else frames):
                     output_template = os.path.join(job_output_path, "#")
                     blender_cmd = [
                         BLENDER_PATH,
@@ -148,7 +201,13 @@ def render_in_progress_jobs():
                         "--render-frame", str(frame_no)
                     ]
                     print(f"[+] Rendering frame {frame_no} for job {job_folder}")
-                    subprocess.run(blender_cmd, check=True)
+                    RENDER_SLOTS.inc()
+                    try:
+                        with RENDER_SECONDS.time(), tracer.span(job_folder, "render_frame", frame=frame_no):
+                            subprocess.run(blender_cmd, check=True)
+                    finally:
+                        RENDER_SLOTS.dec()
+                    FRAMES_PENDING.dec()
 
                     # File Blender created
                     output_file = os.path.join(job_output_path, f"{frame_no}.png")
@@ -161,22 +220,41 @@ def render_in_progress_jobs():
                         break
                     
                     # Send frame immediately
-                    with open(output_file, "rb") as f:
-                        response = requests.post(
-                            leader_url,
-                            data={"uuid": job_folder, "frame_no": frame_no},
-                            files={"image": f},
-                            timeout=10
-                        )
-                        if response.status_code == 200:
-                            print(f"[+] Sent frame {frame_no} successfully")
-                            num_frames_sent_leader += 1
-                        else:
-                            print(f"[!] Failed to send frame {frame_no}: {response.text}")
+                    result = upload_frame(leader_url, job_folder, frame_no, output_file)
+                    if result == UPLOAD_OK:
+                        num_frames_sent_leader += 1
+                        delivered.add(frame_no)
+                    elif result == UPLOAD_REFUSED:
+                        refused = True
+                        break
 
-                print('All frames processed. Deleting temporary folders')
-                if os.path.exists('render_output'):
-                    shutil.rmtree('render_output')
+                FRAMES_PENDING.set(0)
+                tracer.record(job_folder, "render_assignment", assignment_started, time.time(),
+                              frames=len(frames), resent=len(unsent), sent=num_frames_sent_leader)
+                ship(leader_ip, job_folder, tracer.drain(job_folder))
+
+                # A reassignment or a new leader may have landed meanwhile, or the job
+                # was paused: the next pass picks it up from there
+                with open(json_path, 'r') as file:
+                    data = json.load(file)
+                if (data.get("leader_term", 0), data.get("generation", 0)) != assignment or data.get("status") != "in_progress":
+                    continue
+                if refused:
+                    # Retrying cannot help; a reassignment or a new leader brings the job back
+                    print(f"[!] Leader {leader_ip} refused frames of job {job_folder}. Stopping until the job is reassigned or resumed")
+                    upload_backoff.pop(job_folder, None)
+                    processed_blender_jobs[job_folder] = assignment
+                    continue
+                missing = (set(assigned) | _kept_frames(job_output_path)) - delivered
+                if missing:
+                    backoff = upload_backoff.get(job_folder)
+                    delay = UPLOAD_RETRY_MIN
+                    if backoff and backoff[:2] == (leader_ip, assignment):
+                        delay = min(backoff[3] * 2, UPLOAD_RETRY_MAX)
+                    upload_backoff[job_folder] = (leader_ip, assignment, time.monotonic() + delay, delay)
+                    print(f"[!] {len(missing)} frames of job {job_folder} not delivered yet, retrying in {delay:.0f}s")
+                    continue
+                upload_backoff.pop(job_folder, None)
 
                 # if i am not the leader, no need to update status to completed
                 if discovery.local_ip != data.get("leader_ip"):
@@ -186,15 +264,56 @@ def render_in_progress_jobs():
                     # Marking status as completed in local json file
                     with open(json_path, 'w') as file:
                         file.write(json_output)
- 
-                # Finished all frames for this node
-                processed_blender_jobs.append(job_folder)
+
+                # Finished all frames of this assignment for this node
+                print(f"All frames processed for job {job_folder}. Kept in render_output/{job_folder} until the job is released")
+                processed_blender_jobs[job_folder] = assignment
 
         except Exception as e:
             print("[!] Error in render loop:", e)
 
         time.sleep(1)
 
+def _kept_frames(job_output_path):
+    """Frame numbers rendered into render_output/<job> ("<frame>.png")."""
+    return {int(name[:-4]) for name in os.listdir(job_output_path) if name.endswith(".png") and name[:-4].isdigit()}
+
+def upload_frame(leader_url, job_folder, frame_no, output_file):
+    """
+    POST one frame to the leader:
+    - UPLOAD_OK once the leader has stored it (200)
+    - UPLOAD_RETRY if it could not be reached or failed (5xx, 408, 429);
+      the frame is sent on a later pass, possibly to a new leader
+    - UPLOAD_REFUSED for any other answer (e.g. 409: the job is no longer
+      in progress there, 404: the leader no longer has it)
+    """
+    UPLOAD_BYTES.observe(os.path.getsize(output_file))
+    # Spans recorded so far travel with the frame
+    trace = json.dumps(tracer.drain(job_folder))
+    try:
+        with open(output_file, "rb") as f, UPLOAD_SECONDS.time(), \
+                tracer.span(job_folder, "upload_frame", frame=frame_no):
+            response = requests.post(
+                leader_url,
+                data={"uuid": job_folder, "frame_no": frame_no, "trace": trace},
+                files={"image": f},
+                timeout=10
+            )
+    except requests.RequestException as e:
+        print(f"[!] Leader unreachable, keeping frame {frame_no}: {e}")
+        FRAMES_UPLOADED.labels("failed").inc()
+        return UPLOAD_RETRY
+    if response.status_code == 200:
+        print(f"[+] Sent frame {frame_no} successfully")
+        FRAMES_UPLOADED.labels("ok").inc()
+        return UPLOAD_OK
+    print(f"[!] Failed to send frame {frame_no} ({response.status_code}): {response.text}")
+    if response.status_code >= 500 or response.status_code in (408, 429):
+        FRAMES_UPLOADED.labels("failed").inc()
+        return UPLOAD_RETRY
+    FRAMES_UPLOADED.labels("rejected").inc()
+    return UPLOAD_REFUSED
+
 # ==========================================
 # FFMPEG METADATA HANDLER
 # ==========================================
@@ -203,6 +322,12 @@ class MetadataJsonHandler(FileSystemEventHandler):
         # Track last known status per job
         self.last_status = {}
 
+    def on_moved(self, event):
+        # The leader replaces metadata.json atomically (temp file + rename)
+        if not event.is_directory and event.dest_path.endswith(JSON_FILENAME):
+            self.on_modified(FileModifiedEvent(event.dest_path))
+
+    @profiled("worker.metadata_handler")
     def on_modified(self, event):
         if event.is_directory:
             return
@@ -230,8 +355,9 @@ class MetadataJsonHandler(FileSystemEventHandler):
                     old_renders_path = os.path.join(WATCH_DIR, old_job_folder, "renders")
                     new_renders_path = os.path.join(WATCH_DIR, job_folder, "renders")
                     if os.path.exists(old_renders_path):
-                        shutil.copytree(old_renders_path, new_renders_path, dirs_exist_ok=True)
-                        print(f"[+] Copied renders from {old_renders_path} to {new_renders_path} for reassigned job {job_folder}")
+                        # Hard links (or reflinks) instead of copying every frame
+                        linked = link_tree(old_renders_path, new_renders_path)
+                        print(f"[+] Linked renders from {old_renders_path} to {new_renders_path} for reassigned job {job_folder}: {linked}")
                     
                     # self.on_job_completed(job_folder, new_data)
                     # new_data["status"] = "completed_video"
@@ -279,7 +405,8 @@ class MetadataJsonHandler(FileSystemEventHandler):
 
                     video_path = os.path.join("jobs", job_folder, "renders", "output_video.mp4")
 
-                    with open(video_path, "rb") as video_file:
+                    with open(video_path, "rb") as video_file, \
+                            tracer.span(job_folder, "send_video", client=client_ip) as span:
                         response = requests.post(
                             client_url,
                             data={
@@ -292,6 +419,7 @@ class MetadataJsonHandler(FileSystemEventHandler):
                             },
                             timeout=30
                         )
+                        span["status"] = response.status_code
 
                         if response.status_code == 200:
                             print(f"[✅] Sent final video to client {client_ip} for job {job_folder}")
@@ -299,6 +427,8 @@ class MetadataJsonHandler(FileSystemEventHandler):
                             print(f"[!] Failed to send final video to client {client_ip} for job {job_folder}: {response.text}")
                     
                     print(f"[+] Notified leader {client_ip} of status change for job {job_folder}")
+                    if data.get("leader_ip"):
+                        ship(data["leader_ip"], job_folder, tracer.drain(job_folder))
                 
         except Exception as e:
             print(f"[!] Error reading {json_path}: {e}")
@@ -315,7 +445,8 @@ class MetadataJsonHandler(FileSystemEventHandler):
                 discovery.blend_operation_cancelled = False
                 return 
 
-            stitch_pngs_to_video(frames_dir, output_video, fps)
+            with tracer.span(job_folder, "stitch_video", fps=fps):
+                stitch_pngs_to_video(frames_dir, output_video, fps)
 
             print(f"[✅] Video stitched for job {job_folder}: {output_video}")
 
@@ -326,6 +457,20 @@ class MetadataJsonHandler(FileSystemEventHandler):
         # do cleanup, notify server, etc.
 
 
+# ==========================================
+# METRICS EXPORT
+# ==========================================
+
+def export_metrics():
+    """This process' renderfarm_worker_* metrics, for the API to serve."""
+    path = os.path.join(metrics.TEXTFILE_DIR, "worker.prom")
+    while True:
+        try:
+            metrics.REGISTRY.write_textfile(path, prefix="renderfarm_worker_")
+        except OSError as e:
+            print("[!] Failed to export metrics:", e)
+        time.sleep(METRICS_EXPORT_INTERVAL)
+
 # ==========================================
 # MAIN
 # ==========================================
@@ -346,6 +491,10 @@ def main():
     render_thread = Thread(target=render_in_progress_jobs, daemon=True)
     render_thread.start()
 
+    Thread(target=export_metrics, daemon=True).start()
+    # Sampling is switched on and off by the API's /api/admin/profiler
+    profiler.follow(os.path.join(PROFILE_DIR, CONTROL_FILENAME), os.path.join(PROFILE_DIR, "worker.folded"))
+
     try:
         while True:
             time.sleep(1)